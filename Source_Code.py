@@ -1,14 +1,44 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime
+from datetime import datetime, timedelta
+import os
+import threading
 import time
-import re
-from collections import Counter
-import json
+from collections import Counter, deque
 
+import response_archive
+import response_export
+from analysis_cache import AnalysisCache, analysis_key
+from response_quality import DuplicateDetector
+from response_store import CompletionCursor, ResponseStore
+from survey_analysis import SURVEY_TEMPLATES, SURVEY_SCHEMAS, AIAnalyzer, ResponseAggregator
+from survey_metrics import REGISTRY, SamplingProfiler, start_http_server, timed, timer
+from survey_paradata import ANSWER, COMPLETE, EDIT, ENTER, LEAVE, REVISIT, ParadataRecorder, device_type
+from survey_session import SessionResponses
+from survey_sketches import SketchAggregator
+from survey_validation import rule_set, validate_stored
+from theme_discovery import discover_themes
+
+
+EXPORT_MIME_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet"
+}
+# st.download_button holds the whole file in server memory, so larger exports stay on disk
+MAX_DOWNLOAD_BYTES = int(os.environ.get("SURVEY_MAX_DOWNLOAD_MB", "200")) * 1024 * 1024
+MONITOR_REFRESH_SECONDS = int(os.environ.get("SURVEY_MONITOR_REFRESH_SECONDS", "30"))
+MAX_QUALITY_FLAGS = 1000
+QUALITY_PAGE_SIZE = 50
+EXPLORER_ORDERS = {
+    "Newest first": "newest",
+    "Oldest first": "oldest",
+    "Value ascending": "value_asc",
+    "Value descending": "value_desc"
+}
+ROLLUP_COLUMNS = ["survey", "enumerator", "district", "hour", "started", "completed", "answer_seconds", "flagged"]
 
 # Configure page
 st.set_page_config(
@@ -18,203 +48,164 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize session state
-if 'survey_data' not in st.session_state:
-    st.session_state.survey_data = {}
-if 'current_survey' not in st.session_state:
-    st.session_state.current_survey = None
+# Initialize session state (kept small: the survey is referenced by key and answers are a SessionResponses)
 if 'current_question' not in st.session_state:
     st.session_state.current_question = 0
+if 'question_path' not in st.session_state:
+    st.session_state.question_path = [0]
 if 'responses' not in st.session_state:
-    st.session_state.responses = {}
+    st.session_state.responses = None
 if 'survey_completed' not in st.session_state:
     st.session_state.survey_completed = False
-if 'ai_analysis' not in st.session_state:
-    st.session_state.ai_analysis = None
-
-# Survey templates
-SURVEY_TEMPLATES = {
-    "customer_satisfaction": {
-        "title": "Customer Experience Survey",
-        "description": "AI-enhanced survey to understand customer satisfaction patterns",
-        "questions": [
-            {
-                "id": 1,
-                "type": "rating",
-                "text": "How satisfied are you with our service overall?",
-                "scale": 5,
-                "ai_context": "Primary satisfaction metric",
-                "required": True
-            },
-            {
-                "id": 2,
-                "type": "multiple_choice",
-                "text": "What's the primary reason for your rating?",
-                "options": ["Product Quality", "Customer Service", "Pricing", "User Experience", "Other"],
-                "ai_context": "Follow-up based on rating",
-                "required": True
-            },
-            {
-                "id": 3,
-                "type": "text",
-                "text": "What specific improvements would you like to see?",
-                "ai_analysis": True,
-                "ai_context": "Sentiment and theme analysis",
-                "required": False
-            },
-            {
-                "id": 4,
-                "type": "rating",
-                "text": "How likely are you to recommend us to others? (1-10)",
-                "scale": 10,
-                "ai_context": "NPS calculation",
-                "required": True
-            }
-        ]
-    },
-    "employee_feedback": {
-        "title": "Employee Engagement Survey",
-        "description": "Smart survey with adaptive questioning based on responses",
-        "questions": [
-            {
-                "id": 1,
-                "type": "rating",
-                "text": "How engaged do you feel at work?",
-                "scale": 5,
-                "ai_context": "Core engagement metric",
-                "required": True
-            },
-            {
-                "id": 2,
-                "type": "multiple_choice",
-                "text": "What motivates you most at work?",
-                "options": ["Career Growth", "Recognition", "Work-Life Balance", "Compensation", "Team Collaboration"],
-                "ai_context": "Motivation analysis",
-                "required": True
-            },
-            {
-                "id": 3,
-                "type": "text",
-                "text": "What changes would improve your work experience?",
-                "ai_analysis": True,
-                "ai_context": "Theme extraction and categorization",
-                "required": False
-            },
-            {
-                "id": 4,
-                "type": "rating",
-                "text": "How would you rate your work-life balance?",
-                "scale": 5,
-                "ai_context": "Work-life balance assessment",
-                "required": True
-            }
-        ]
-    }
-}
+if 'survey_key' not in st.session_state:
+    st.session_state.survey_key = None
+if 'submission_id' not in st.session_state:
+    st.session_state.submission_id = None
+if 'paradata_visit' not in st.session_state:
+    st.session_state.paradata_visit = None
+if 'paradata_seen' not in st.session_state:
+    st.session_state.paradata_seen = bytearray()
+
+@st.cache_resource
+def get_profiler():
+    """Sampling profiler shared by every session (off until toggled in the sidebar)"""
+    return SamplingProfiler()
+
+
+@st.cache_resource
+def get_metrics_server():
+    """Serve /metrics and /metrics.json when SURVEY_METRICS_PORT is set"""
+    port = os.environ.get("SURVEY_METRICS_PORT")
+    return start_http_server(int(port)) if port else None
 
-# AI Analysis Functions
-class AIAnalyzer:
-    @staticmethod
-    def analyze_sentiment(text):
-        """Simple sentiment analysis based on keywords"""
-        if not text or len(text.strip()) < 3:
-            return "neutral"
-        
-        text = text.lower()
-        positive_words = ['good', 'great', 'excellent', 'amazing', 'fantastic', 'love', 'perfect', 'wonderful', 'outstanding', 'satisfied', 'happy', 'pleased']
-        negative_words = ['bad', 'terrible', 'awful', 'hate', 'horrible', 'disappointing', 'frustrated', 'angry', 'unsatisfied', 'poor', 'worst']
-        
-        positive_count = sum(1 for word in positive_words if word in text)
-        negative_count = sum(1 for word in negative_words if word in text)
-        
-        if positive_count > negative_count:
-            return "positive"
-        elif negative_count > positive_count:
-            return "negative"
-        else:
-            return "neutral"
-    
-    @staticmethod
-    def extract_themes(text_responses):
-        """Extract common themes from text responses"""
-        if not text_responses:
-            return []
-        
-        all_text = " ".join(text_responses).lower()
-        
-        # Common themes and keywords
-        theme_keywords = {
-            "Product Quality": ["quality", "product", "item", "goods", "material"],
-            "Customer Service": ["service", "support", "staff", "help", "representative", "agent"],
-            "Pricing": ["price", "cost", "expensive", "cheap", "value", "money", "fee"],
-            "User Experience": ["experience", "interface", "usability", "easy", "difficult", "navigation"],
-            "Delivery": ["delivery", "shipping", "fast", "slow", "package", "arrive"],
-            "Communication": ["communication", "contact", "response", "email", "phone", "chat"]
-        }
-        
-        themes = []
-        for theme, keywords in theme_keywords.items():
-            mentions = sum(1 for keyword in keywords if keyword in all_text)
-            if mentions > 0:
-                # Analyze sentiment for this theme
-                theme_text = " ".join([resp for resp in text_responses if any(kw in resp.lower() for kw in keywords)])
-                sentiment = AIAnalyzer.analyze_sentiment(theme_text)
-                themes.append({
-                    "theme": theme,
-                    "mentions": mentions,
-                    "sentiment": sentiment
-                })
-        
-        return sorted(themes, key=lambda x: x["mentions"], reverse=True)[:6]
-    
-    @staticmethod
-    def generate_recommendations(responses, survey_type="customer_satisfaction"):
-        """Generate AI-powered recommendations based on responses"""
-        recommendations = []
-        
-        # Analyze ratings
-        ratings = [v for v in responses.values() if isinstance(v, (int, float))]
-        avg_rating = np.mean(ratings) if ratings else 0
-        
-        # Analyze text responses
-        text_responses = [v for v in responses.values() if isinstance(v, str) and len(v.strip()) > 10]
-        themes = AIAnalyzer.extract_themes(text_responses)
-        
-        # Generate recommendations based on analysis
-        if avg_rating < 3:
-            recommendations.append("⚠️ Low satisfaction scores detected. Immediate attention required to address customer concerns.")
-        
-        if themes:
-            negative_themes = [t for t in themes if t["sentiment"] == "negative"]
-            if negative_themes:
-                top_issue = negative_themes[0]["theme"]
-                recommendations.append(f"🔍 Focus on improving {top_issue} - identified as the primary concern area.")
-            
-            positive_themes = [t for t in themes if t["sentiment"] == "positive"]
-            if positive_themes:
-                strength = positive_themes[0]["theme"]
-                recommendations.append(f"✅ Leverage your strength in {strength} for marketing and competitive advantage.")
-        
-        # NPS-specific recommendations
-        if survey_type == "customer_satisfaction":
-            nps_responses = [v for k, v in responses.items() if "recommend" in str(k).lower()]
-            if nps_responses:
-                nps_score = np.mean(nps_responses)
-                if nps_score >= 9:
-                    recommendations.append("🌟 High NPS score! Consider implementing a referral program.")
-                elif nps_score <= 6:
-                    recommendations.append("📉 Low NPS score indicates risk of customer churn. Implement retention strategies.")
-        
-        if not recommendations:
-            recommendations.append("📊 Continue monitoring feedback patterns and maintain current service quality.")
-        
-        return recommendations
 
+@st.cache_resource
+def get_analysis_cache():
+    """Analysis results shared by every session of this server process"""
+    return AnalysisCache(spill_dir=os.environ.get("SURVEY_CACHE_DIR"))
+
+
+@st.cache_resource
+def get_response_store():
+    """Response store shared by every session of this server process"""
+    return ResponseStore()
+
+
+@st.cache_resource
+def get_paradata_recorder():
+    """Paradata ring buffer shared by every session, flushed to the response store in the background"""
+    return ParadataRecorder(get_response_store().save_paradata).start()
+
+
+class SurveyAggregate:
+    """ResponseAggregator over every completed submission of a survey.
+
+    Shared across sessions; each refresh only folds in the submissions
+    completed since the previous one. Started or abandoned submissions are
+    left out, and a completed submission's answers are final, so nothing is
+    ever counted twice.
+    """
+
+    def __init__(self, store, survey_key, aggregator=None):
+        self.store = store
+        self.survey_key = survey_key
+        self.aggregator = aggregator or ResponseAggregator(SURVEY_SCHEMAS[survey_key], editable=False)
+        self.cursor = CompletionCursor(store, survey_key)
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Catch up with the store and return the current analysis"""
+        with self._lock:
+            for _, respondent_id, _, answers in self.cursor.new_submissions():
+                for question_id, value in answers.items():
+                    self.aggregator.update(question_id, value, respondent_id=respondent_id)
+            return self.aggregator.snapshot()
+
+
+@st.cache_resource
+def get_survey_aggregate(survey_key):
+    """Cross-respondent aggregate for one survey template"""
+    return SurveyAggregate(get_response_store(), survey_key)
+
+@st.cache_resource
+def get_survey_sketch(survey_key):
+    """Constant-memory, sketch-based aggregate of one survey's completed submissions"""
+    return SurveyAggregate(get_response_store(), survey_key, SketchAggregator(SURVEY_SCHEMAS[survey_key]))
+
+class QualityMonitor:
+    """Duplicate/fabrication checks over every completed submission of a survey.
+
+    Shared across sessions; each refresh checks only the submissions completed
+    since the previous one against the LSH index of all earlier ones. Every
+    flag is counted, but only the ``MAX_QUALITY_FLAGS`` most recent are kept.
+    """
+
+    def __init__(self, store, survey_key):
+        self.store = store
+        self.survey_key = survey_key
+        self.detector = DuplicateDetector(SURVEY_SCHEMAS[survey_key])
+        self.flags = deque(maxlen=MAX_QUALITY_FLAGS)
+        self.flag_counts = Counter()
+        self.cursor = CompletionCursor(store, survey_key)
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Check newly completed submissions and return the most recent flags, newest first"""
+        with self._lock:
+            flagged = []
+            for submission_id, respondent_id, _, answers in self.cursor.new_submissions():
+                for flag in self.detector.check(submission_id, answers):
+                    flag["respondent_id"] = respondent_id
+                    self.flags.append(flag)
+                    self.flag_counts[flag["code"]] += 1
+                    flagged.append(submission_id)
+            # Counted in the monitoring rollups; the store ignores submissions flagged before
+            self.store.flag_submissions(flagged)
+            return list(reversed(self.flags))
+
+
+@st.cache_resource
+def get_quality_monitor(survey_key):
+    """Cross-respondent quality checks for one survey template"""
+    return QualityMonitor(get_response_store(), survey_key)
+
+@st.cache_data(ttl=MONITOR_REFRESH_SECONDS, show_spinner=False)
+def load_rollups(since):
+    """Hourly monitoring rollups from ``since`` on, shared by every supervisor for one refresh interval"""
+    for survey_key in SURVEY_SCHEMAS:
+        get_quality_monitor(survey_key).refresh()
+    return pd.DataFrame(get_response_store().rollups(since), columns=ROLLUP_COLUMNS)
+
+@timed("page.analyze_archive")
+def analyze_archive(path, survey_key):
+    """Survey metrics and themes from a columnar archive, loading only the columns each needs"""
+    schema = SURVEY_SCHEMAS[survey_key]
+    metrics = response_archive.rating_metrics(path, schema)
+    metrics["themes"] = AIAnalyzer.extract_themes_parallel(
+        response_archive.text_column(path, schema).tolist(), language=schema.language
+    )
+    return metrics
+
+def stored_texts(survey_key):
+    """Re-iterable source of the AI-analysed text answers of a survey's completed submissions"""
+    text_ids = [question.id for question in SURVEY_SCHEMAS[survey_key].analysed_text_questions]
+    return lambda: (
+        answers[question_id]
+        for _, _, _, answers in get_response_store().iter_completed_submissions(survey_key)
+        for question_id in text_ids if isinstance(answers.get(question_id), str)
+    )
+
+@timed("page.create_survey")
 def create_survey_page():
     """Survey creation and selection page"""
     st.title("🧠 AI-Powered Smart Survey Tool")
     st.markdown("### Create intelligent surveys with adaptive questioning and AI-powered analysis")
     
+    with st.expander("🧑‍💼 Field details (optional)"):
+        field_col1, field_col2 = st.columns(2)
+        enumerator = field_col1.text_input("Enumerator ID", max_chars=64).strip()
+        district = field_col2.text_input("District", max_chars=64).strip()
+    
     col1, col2 = st.columns(2)
     
     for idx, (key, template) in enumerate(SURVEY_TEMPLATES.items()):
@@ -227,17 +218,26 @@ def create_survey_page():
                     <h3 style="color: #1f77b4; margin-top: 0;">{template['title']}</h3>
                     <p style="color: #666; margin: 10px 0;">{template['description']}</p>
                     <p style="font-size: 14px; color: #888;">
-                        📝 {len(template['questions'])} questions | 🧠 AI-Enhanced
+                        📝 {len(SURVEY_SCHEMAS[key])} questions | 🧠 AI-Enhanced
                     </p>
                 </div>
                 """, unsafe_allow_html=True)
                 
                 if st.button(f"Start {template['title']}", key=f"start_{key}", type="primary"):
-                    st.session_state.current_survey = template
+                    st.session_state.survey_key = key
+                    st.session_state.submission_id = get_response_store().start_submission(
+                        key, enumerator=enumerator, district=district
+                    )
                     st.session_state.current_question = 0
-                    st.session_state.responses = {}
+                    st.session_state.question_path = [0]
+                    st.session_state.paradata_visit = None
+                    st.session_state.paradata_seen = bytearray(len(SURVEY_SCHEMAS[key]))
+                    user_agent = st.context.headers.get("User-Agent", "")
+                    get_response_store().save_device(
+                        st.session_state.submission_id, device_type(user_agent), user_agent
+                    )
+                    st.session_state.responses = SessionResponses(key)
                     st.session_state.survey_completed = False
-                    st.session_state.ai_analysis = None
                     st.rerun()
     
     # AI Features Section
@@ -267,167 +267,203 @@ def create_survey_page():
         - Visual data representation
         """)
 
+@timed("page.take_survey")
 def take_survey_page():
     """Survey taking interface"""
-    survey = st.session_state.current_survey
+    survey = SURVEY_SCHEMAS[st.session_state.survey_key]
     current_q_idx = st.session_state.current_question
     
-    if current_q_idx >= len(survey["questions"]):
+    if current_q_idx >= len(survey.questions):
         st.session_state.survey_completed = True
         st.rerun()
         return
     
-    question = survey["questions"][current_q_idx]
+    question = survey.questions[current_q_idx]
+    
+    # Paradata: one ENTER/REVISIT per visit, timed from here until the respondent navigates away
+    recorder = get_paradata_recorder()
+    visit = st.session_state.paradata_visit
+    if visit is None or visit[0] != current_q_idx:
+        revisit = bool(st.session_state.paradata_seen[current_q_idx])
+        st.session_state.paradata_seen[current_q_idx] = 1
+        st.session_state.paradata_visit = visit = (current_q_idx, time.monotonic(), revisit)
+        recorder.record(st.session_state.submission_id, question.id, current_q_idx, REVISIT if revisit else ENTER)
     
-    # Progress bar
-    progress = (current_q_idx + 1) / len(survey["questions"])
-    st.progress(progress, text=f"Question {current_q_idx + 1} of {len(survey['questions'])}")
+    # Progress bar (branching may skip questions, so count the ones actually shown)
+    shown = len(st.session_state.question_path)
+    progress = min(shown / len(survey.questions), 1.0)
+    st.progress(progress, text=f"Question {shown} of {len(survey.questions)}")
     
-    st.title(survey["title"])
+    st.title(survey.title)
     
     # Question container
     with st.container():
         st.markdown("---")
-        st.markdown(f"### {question['text']}")
+        st.markdown(f"### {question.text}")
         
         # AI Context indicator
-        if question.get("ai_context"):
-            st.info(f"🧠 AI Context: {question['ai_context']}")
+        if question.ai_context:
+            st.info(f"🧠 AI Context: {question.ai_context}")
         
         response = None
         
         # Different question types
-        if question["type"] == "rating":
+        if question.type == "rating":
             response = st.slider(
                 "Your rating:",
                 min_value=1,
-                max_value=question["scale"],
-                value=st.session_state.responses.get(question["id"], 1),
-                key=f"q_{question['id']}"
+                max_value=question.scale,
+                value=st.session_state.responses.get(question.id, 1),
+                key=f"q_{question.id}",
+                on_change=save_answer,
+                args=(question,)
             )
             
             # Show rating labels
-            if question["scale"] == 5:
+            if question.scale == 5:
                 st.markdown("1 = Very Poor | 2 = Poor | 3 = Average | 4 = Good | 5 = Excellent")
-            elif question["scale"] == 10:
+            elif question.scale == 10:
                 st.markdown("1 = Not at all likely | 10 = Extremely likely")
         
-        elif question["type"] == "multiple_choice":
+        elif question.type == "multiple_choice":
             response = st.radio(
                 "Select your answer:",
-                options=question["options"],
-                index=question["options"].index(st.session_state.responses.get(question["id"], question["options"][0])) if st.session_state.responses.get(question["id"]) in question["options"] else 0,
-                key=f"q_{question['id']}"
+                options=question.options,
+                index=question.option_index.get(st.session_state.responses.get(question.id), 0),
+                key=f"q_{question.id}",
+                on_change=save_answer,
+                args=(question,)
             )
         
-        elif question["type"] == "text":
+        elif question.type == "text":
             response = st.text_area(
                 "Your response:",
-                value=st.session_state.responses.get(question["id"], ""),
+                value=st.session_state.responses.get(question.id, ""),
                 height=100,
-                key=f"q_{question['id']}",
-                placeholder="Share your thoughts..."
+                key=f"q_{question.id}",
+                placeholder="Share your thoughts...",
+                on_change=save_answer,
+                args=(question,)
             )
             
-            if question.get("ai_analysis"):
+            if question.ai_analysis:
                 st.success("🧠 AI will analyze sentiment and themes from this response")
-        
-        # Store response
-        if response is not None:
-            st.session_state.responses[question["id"]] = response
     
-    # Navigation buttons
+    # Answers are stored when the respondent changes a widget (save_answer) or moves on with the
+    # value shown (confirm_answer), never from a widget's default on first render
+    answers = dict(st.session_state.responses)
+    if response not in (None, ""):
+        answers[question.id] = response
+    
+    # Validation rules touching this question; errors block navigation, warnings are only shown
+    violations = rule_set(survey).check(answers, [question.id])
+    errors = [violation for violation in violations if violation['severity'] == "error"]
+    for violation in violations:
+        if violation['severity'] != "error":
+            st.warning(f"⚠️ {violation['message']}")
+    
+    # Navigation buttons: the next question comes from the compiled transition table
+    next_q_idx = survey.next_position(current_q_idx, response)
     col1, col2, col3 = st.columns([1, 2, 1])
     
     with col1:
-        if current_q_idx > 0:
+        if len(st.session_state.question_path) > 1:
             if st.button("⬅️ Previous", type="secondary"):
-                st.session_state.current_question -= 1
+                leave_question(question, current_q_idx)
+                st.session_state.question_path.pop()
+                st.session_state.current_question = st.session_state.question_path[-1]
                 st.rerun()
     
     with col3:
-        if current_q_idx < len(survey["questions"]) - 1:
+        if next_q_idx < survey.end:
             if st.button("Next ➡️", type="primary"):
-                if question.get("required") and not response:
-                    st.error("This question is required!")
+                if errors:
+                    st.error(errors[0]['message'])
                 else:
-                    st.session_state.current_question += 1
+                    confirm_answer(question, response)
+                    drop_unreachable_answers(survey)
+                    leave_question(question, current_q_idx)
+                    st.session_state.question_path.append(next_q_idx)
+                    st.session_state.current_question = next_q_idx
                     st.rerun()
         else:
             if st.button("Complete Survey ✅", type="primary"):
-                if question.get("required") and not response:
-                    st.error("This question is required!")
+                if errors:
+                    st.error(errors[0]['message'])
                 else:
+                    confirm_answer(question, response)
+                    drop_unreachable_answers(survey)
+                    leave_question(question, current_q_idx)
+                    recorder.record(st.session_state.submission_id, question.id, current_q_idx, COMPLETE)
+                    get_response_store().complete_submission(st.session_state.submission_id)
                     st.session_state.survey_completed = True
                     st.rerun()
 
-def analyze_responses():
-    """Perform AI analysis on survey responses"""
-    if st.session_state.ai_analysis is None:
-        with st.spinner("🧠 AI is analyzing responses..."):
-            time.sleep(2)  # Simulate processing time
-            
-            responses = st.session_state.responses
-            survey = st.session_state.current_survey
-            
-            # Extract text responses for analysis
-            text_responses = []
-            for q_id, response in responses.items():
-                question = next((q for q in survey["questions"] if q["id"] == q_id), None)
-                if question and question.get("ai_analysis") and isinstance(response, str):
-                    text_responses.append(response)
-            
-            # Perform analysis
-            themes = AIAnalyzer.extract_themes(text_responses)
-            
-            # Calculate sentiment distribution
-            sentiments = [AIAnalyzer.analyze_sentiment(text) for text in text_responses]
-            sentiment_counts = Counter(sentiments)
-            total_sentiments = len(sentiments) if sentiments else 1
-            
-            sentiment_dist = {
-                "positive": (sentiment_counts.get("positive", 0) / total_sentiments) * 100,
-                "neutral": (sentiment_counts.get("neutral", 0) / total_sentiments) * 100,
-                "negative": (sentiment_counts.get("negative", 0) / total_sentiments) * 100
-            }
-            
-            # Calculate metrics
-            ratings = [v for v in responses.values() if isinstance(v, (int, float))]
-            avg_satisfaction = np.mean(ratings) if ratings else 0
-            
-            # Calculate NPS (assuming last rating question is NPS)
-            nps_responses = []
-            for q_id, response in responses.items():
-                question = next((q for q in survey["questions"] if q["id"] == q_id), None)
-                if question and "recommend" in question["text"].lower() and isinstance(response, (int, float)):
-                    nps_responses.append(response)
-            
-            nps_score = 0
-            if nps_responses:
-                promoters = sum(1 for score in nps_responses if score >= 9)
-                detractors = sum(1 for score in nps_responses if score <= 6)
-                nps_score = ((promoters - detractors) / len(nps_responses)) * 100
-            
-            # Generate recommendations
-            survey_type = "customer_satisfaction" if "customer" in survey["title"].lower() else "employee_feedback"
-            recommendations = AIAnalyzer.generate_recommendations(responses, survey_type)
-            
-            st.session_state.ai_analysis = {
-                "sentiment_distribution": sentiment_dist,
-                "themes": themes,
-                "avg_satisfaction": avg_satisfaction,
-                "nps_score": nps_score,
-                "recommendations": recommendations,
-                "total_responses": len(responses)
-            }
+def store_answer(question, value):
+    """Keep an answer in the session, persist it and record it as an ANSWER (first visit) or EDIT (revisit)"""
+    st.session_state.responses[question.id] = value
+    get_response_store().save_answers(st.session_state.submission_id, st.session_state.survey_key, {question.id: value})
+    visit = st.session_state.paradata_visit
+    revisit = visit[2] if visit is not None and visit[0] == question.position else False
+    get_paradata_recorder().record(
+        st.session_state.submission_id, question.id, question.position, EDIT if revisit else ANSWER
+    )
 
+def save_answer(question):
+    """Widget on_change callback: the respondent set or changed this answer"""
+    store_answer(question, st.session_state[f"q_{question.id}"])
+
+def confirm_answer(question, response):
+    """On Next/Complete, keep the value shown if the respondent moved on without touching the widget"""
+    if response not in (None, "") and question.id not in st.session_state.responses:
+        store_answer(question, response)
+
+def drop_unreachable_answers(survey):
+    """Forget answers on branches the current answers no longer lead to (after Previous and a changed answer)
+
+    They are removed from the session, its widget state and the store, so
+    neither this session's analysis nor the completed submission counts them.
+    """
+    dropped = survey.unreachable(st.session_state.responses)
+    for question_id in dropped:
+        del st.session_state.responses[question_id]
+        st.session_state.pop(f"q_{question_id}", None)
+    get_response_store().delete_answers(st.session_state.submission_id, dropped)
+
+def leave_question(question, position):
+    """Record the LEAVE paradata event, with the visit's duration, of the question on screen"""
+    entered = st.session_state.paradata_visit[1]
+    get_paradata_recorder().record(
+        st.session_state.submission_id, question.id, position, LEAVE, int((time.monotonic() - entered) * 1000)
+    )
+    st.session_state.paradata_visit = None
+
+@timed("page.analyze_responses")
+def analyze_responses(scope="session"):
+    """AI analysis of this session's answers, or of every stored respondent of the survey (exactly or from sketches)"""
+    if scope == "all":
+        return get_survey_aggregate(st.session_state.survey_key).refresh()
+    if scope == "streaming":
+        return get_survey_sketch(st.session_state.survey_key).refresh()
+    # Not kept in the session: the shared cache holds the one copy
+    key = analysis_key(
+        SURVEY_SCHEMAS[st.session_state.survey_key],
+        st.session_state.responses,
+        AIAnalyzer.version(SURVEY_SCHEMAS[st.session_state.survey_key].language)
+    )
+    return get_analysis_cache().get_or_compute(key, st.session_state.responses.snapshot)
+
+@timed("page.analysis")
 def analysis_page():
     """Analysis results page"""
     st.title("📊 AI Analysis Results")
     st.markdown("### Intelligent insights from survey responses")
     
-    analyze_responses()
-    analysis = st.session_state.ai_analysis
+    scopes = {"This response": "session", "All respondents": "all", "All respondents (streaming sketches)": "streaming"}
+    scope = scopes[st.radio("Analysis scope", list(scopes), horizontal=True)]
+    analysis = analyze_responses(scope)
+    cache_stats = get_analysis_cache().stats()
+    st.caption(f"⚡ Analysis cache: {cache_stats['hits'] + cache_stats['disk_hits']} hits | {cache_stats['misses']} misses")
     
     # Key Metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -450,84 +486,82 @@ def analysis_page():
     with chart_col1:
         st.subheader("🧠 Sentiment Analysis")
         if any(analysis['sentiment_distribution'].values()):
-            fig_sentiment = px.pie(
-                values=list(analysis['sentiment_distribution'].values()),
-                names=list(analysis['sentiment_distribution'].keys()),
-                title="Response Sentiment Distribution",
-                color_discrete_map={
-                    'positive': '#28a745',
-                    'neutral': '#6c757d',
-                    'negative': '#dc3545'
-                }
-            )
-            st.plotly_chart(fig_sentiment, use_container_width=True)
+            with timer("chart.sentiment_pie"):
+                fig_sentiment = px.pie(
+                    values=list(analysis['sentiment_distribution'].values()),
+                    names=list(analysis['sentiment_distribution'].keys()),
+                    title="Response Sentiment Distribution",
+                    color_discrete_map={
+                        'positive': '#28a745',
+                        'neutral': '#6c757d',
+                        'negative': '#dc3545'
+                    }
+                )
+            with timer("render.sentiment_pie"):
+                st.plotly_chart(fig_sentiment, use_container_width=True)
         else:
             st.info("No text responses available for sentiment analysis")
     
     with chart_col2:
         st.subheader("💬 Key Themes")
         if analysis['themes']:
-            theme_df = pd.DataFrame(analysis['themes'])
-            fig_themes = px.bar(
-                theme_df,
-                x='mentions',
-                y='theme',
-                color='sentiment',
-                orientation='h',
-                title="Most Mentioned Themes",
-                color_discrete_map={
-                    'positive': '#28a745',
-                    'neutral': '#6c757d',
-                    'negative': '#dc3545'
-                }
-            )
-            st.plotly_chart(fig_themes, use_container_width=True)
+            with timer("dataframe.themes"):
+                theme_df = pd.DataFrame(analysis['themes'])
+            with timer("chart.themes_bar"):
+                fig_themes = px.bar(
+                    theme_df,
+                    x='mentions',
+                    y='theme',
+                    color='sentiment',
+                    orientation='h',
+                    title="Most Mentioned Themes",
+                    color_discrete_map={
+                        'positive': '#28a745',
+                        'neutral': '#6c757d',
+                        'negative': '#dc3545'
+                    }
+                )
+            with timer("render.themes_bar"):
+                st.plotly_chart(fig_themes, use_container_width=True)
         else:
             st.info("No themes identified from responses")
     
+    if scope == "streaming":
+        sketch_panel(analysis)
+    
     # AI Recommendations
     st.subheader("🎯 AI Recommendations")
     for i, recommendation in enumerate(analysis['recommendations'], 1):
         st.info(f"{i}. {recommendation}")
     
     # Raw Data Section
-    with st.expander("📋 View Raw Response Data"):
-        responses_df = pd.DataFrame([
-            {"Question ID": k, "Response": v} 
-            for k, v in st.session_state.responses.items()
-        ])
-        st.dataframe(responses_df, use_container_width=True)
+    raw_data_explorer(st.session_state.survey_key)
+    
+    # Columnar archive of all completed submissions
+    with st.expander("🗄️ Columnar Archive"):
+        if st.button("Archive completed submissions", type="secondary"):
+            path, archived = response_archive.archive_survey(
+                get_response_store(), SURVEY_SCHEMAS[st.session_state.survey_key]
+            )
+            archive_metrics = analyze_archive(path, st.session_state.survey_key)
+            st.success(f"Archived {archived} submissions to {path}")
+            st.metric("Archived Average Satisfaction", f"{archive_metrics['avg_satisfaction']:.1f}")
+            st.metric("Archived NPS Score", f"{archive_metrics['nps_score']:.0f}")
+            if archive_metrics['themes']:
+                st.dataframe(pd.DataFrame(archive_metrics['themes']), use_container_width=True)
+    
+    # Interactive panels are fragments, so their widgets rerun only the panel
+    discovered_themes_panel(st.session_state.survey_key)
+    quality_panel(st.session_state.survey_key)
     
     # Actions
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        if st.button("📊 Export Analysis", type="secondary"):
-            # Create exportable data
-            export_data = {
-                "survey_title": st.session_state.current_survey["title"],
-                "analysis_date": datetime.now().isoformat(),
-                "metrics": {
-                    "avg_satisfaction": analysis['avg_satisfaction'],
-                    "nps_score": analysis['nps_score'],
-                    "total_responses": analysis['total_responses']
-                },
-                "sentiment_distribution": analysis['sentiment_distribution'],
-                "themes": analysis['themes'],
-                "recommendations": analysis['recommendations'],
-                "responses": st.session_state.responses
-            }
-            
-            st.download_button(
-                label="Download JSON Report",
-                data=json.dumps(export_data, indent=2),
-                file_name=f"survey_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                mime="application/json"
-            )
+        export_panel(analysis)
     
     with col2:
         if st.button("🔄 Analyze Again", type="secondary"):
-            st.session_state.ai_analysis = None
             st.rerun()
     
     with col3:
@@ -537,18 +571,335 @@ def analysis_page():
                 del st.session_state[key]
             st.rerun()
 
+@st.fragment
+def raw_data_explorer(survey_key):
+    """Stored answers, one keyset-paginated page per rerun, so the cost depends on the page size only"""
+    schema = SURVEY_SCHEMAS[survey_key]
+    with st.expander("📋 View Raw Response Data"):
+        filter_col1, filter_col2, filter_col3, filter_col4 = st.columns(4)
+        with filter_col1:
+            question_id = st.selectbox(
+                "Question",
+                [None, *(question.id for question in schema.questions)],
+                format_func=lambda qid: "All questions" if qid is None else schema.question(qid).text
+            )
+        question = schema.question(question_id) if question_id is not None else None
+        value = None
+        with filter_col2:
+            if question is not None and question.type != "text":
+                choices = question.options if question.type == "multiple_choice" else list(range(1, question.scale + 1))
+                value = st.selectbox("Answer", [None, *choices], format_func=lambda v: "Any" if v is None else str(v))
+        with filter_col3:
+            # Sorting by value only makes sense within one question
+            orders = list(EXPLORER_ORDERS) if question is not None else list(EXPLORER_ORDERS)[:2]
+            order = EXPLORER_ORDERS[st.selectbox("Sort", orders)]
+        with filter_col4:
+            page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+        submission_id = st.session_state.submission_id if st.checkbox("This submission only") else None
+        
+        # Start of each visited page, so Previous steps back without an OFFSET scan
+        filters = (survey_key, question_id, value, submission_id, order, page_size)
+        if st.session_state.get("explorer_filters") != filters:
+            st.session_state.explorer_filters = filters
+            st.session_state.explorer_cursors = [None]
+        cursors = st.session_state.explorer_cursors
+        
+        with timer("dataframe.raw_responses"):
+            rows, next_cursor = get_response_store().browse_answers(
+                survey_key, question_id=question_id, value=value, submission_id=submission_id,
+                order=order, after=cursors[-1], limit=page_size
+            )
+            for row in rows:
+                row["question"] = schema.by_id[row["question_id"]].text if row["question_id"] in schema.by_id else ""
+        if rows:
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        else:
+            st.info("No stored answers match these filters")
+        
+        nav_col1, nav_col2, nav_col3 = st.columns([1, 2, 1])
+        with nav_col1:
+            if st.button("⬅️ Previous page", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun(scope="fragment")
+        with nav_col2:
+            st.caption(f"Page {len(cursors)}")
+        with nav_col3:
+            if st.button("Next page ➡️", disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun(scope="fragment")
+
+@st.fragment
+def discovered_themes_panel(survey_key):
+    """Data-driven themes beyond the fixed keyword categories"""
+    with st.expander("🔎 Discovered Themes"):
+        n_clusters = st.slider("Number of themes", min_value=2, max_value=20, value=8)
+        if st.button("Discover themes from all stored responses", type="secondary"):
+            with timer("themes.discover"):
+                st.session_state.discovered_themes = discover_themes(
+                    stored_texts(survey_key), n_clusters=n_clusters, language=SURVEY_SCHEMAS[survey_key].language
+                )
+        discovered = st.session_state.get("discovered_themes")
+        if discovered:
+            fig_discovered = px.bar(
+                pd.DataFrame(discovered),
+                x='mentions',
+                y='theme',
+                color='sentiment',
+                orientation='h',
+                title="Discovered Themes (TF-IDF clusters)",
+                color_discrete_map={
+                    'positive': '#28a745',
+                    'neutral': '#6c757d',
+                    'negative': '#dc3545'
+                }
+            )
+            st.plotly_chart(fig_discovered, use_container_width=True)
+        elif discovered is not None:
+            st.info("Not enough text responses to discover themes")
+
+@st.fragment
+def quality_panel(survey_key):
+    """Cross-respondent quality assurance"""
+    with st.expander("🛡️ Quality Assurance"):
+        monitor = get_quality_monitor(survey_key)
+        with timer("qa.refresh"):
+            flags = monitor.refresh()
+        qa_col1, qa_col2, qa_col3 = st.columns(3)
+        counts = monitor.flag_counts
+        qa_col1.metric("Submissions Checked", monitor.detector.indexed)
+        qa_col2.metric("Near-Duplicate Texts", counts["duplicate_text"])
+        qa_col3.metric("Pattern/Straight-Lining Flags", sum(counts.values()) - counts["duplicate_text"])
+        if flags:
+            pages = -(-len(flags) // QUALITY_PAGE_SIZE)
+            page = st.number_input("Page", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+            start = (page - 1) * QUALITY_PAGE_SIZE
+            st.dataframe(pd.DataFrame(flags[start:start + QUALITY_PAGE_SIZE]), use_container_width=True)
+            if sum(counts.values()) > len(flags):
+                st.caption(f"Showing the {len(flags):,} most recent of {sum(counts.values()):,} flags")
+        else:
+            st.success("No near-duplicate or fabricated submissions detected")
+        
+        st.markdown("**Per-question timing (paradata)**")
+        get_paradata_recorder().flush()
+        store = get_response_store()
+        timing = store.paradata_summary(survey_key)
+        if timing:
+            schema = SURVEY_SCHEMAS[survey_key]
+            st.dataframe(pd.DataFrame([
+                {"Question": schema.question(row['question_id']).text, **row} for row in timing
+                if schema.question(row['question_id']) is not None
+            ]).drop(columns="question_id"), use_container_width=True, hide_index=True)
+            st.caption(" | ".join(f"{device}: {count}" for device, count in store.device_counts(survey_key).items()))
+        else:
+            st.info("No paradata recorded yet")
+        
+        if st.button("Validate all completed submissions", type="secondary"):
+            with timer("validation.stored"):
+                checked, summary = validate_stored(get_response_store(), SURVEY_SCHEMAS[survey_key])
+            st.caption(f"Checked {checked:,} submissions against {len(rule_set(SURVEY_SCHEMAS[survey_key]).rules)} rules")
+            if summary:
+                st.dataframe(pd.DataFrame(summary), use_container_width=True)
+            else:
+                st.success("No validation rule violations")
+
+@st.fragment
+def export_panel(analysis):
+    """Streaming export of stored submissions, with this page's analysis as a summary line"""
+    with st.expander("📊 Export Analysis"):
+        survey_keys = list(SURVEY_SCHEMAS)
+        export_survey = st.selectbox(
+            "Survey",
+            survey_keys,
+            index=survey_keys.index(st.session_state.survey_key),
+            format_func=lambda key: SURVEY_SCHEMAS[key].title
+        )
+        export_format = st.selectbox("Format", list(response_export.EXPORT_FORMATS), format_func=str.upper)
+        date_range = st.date_input("Completed between", value=())
+        
+        if st.button("Export", type="secondary"):
+            start = end = None
+            if len(date_range) == 2:
+                start = date_range[0].isoformat()
+                end = (date_range[1] + timedelta(days=1)).isoformat()
+            
+            summary = None
+            if export_survey == st.session_state.survey_key:
+                summary = {
+                    "analysis_date": datetime.now().isoformat(),
+                    "metrics": {
+                        "avg_satisfaction": analysis['avg_satisfaction'],
+                        "nps_score": analysis['nps_score'],
+                        "total_responses": analysis['total_responses']
+                    },
+                    "sentiment_distribution": analysis['sentiment_distribution'],
+                    "themes": analysis['themes'],
+                    "recommendations": analysis['recommendations']
+                }
+            
+            # Streamed to disk so memory stays flat however many submissions match
+            path, exported = response_export.export_submissions(
+                get_response_store(), SURVEY_SCHEMAS[export_survey], export_format, start, end, summary=summary
+            )
+            st.success(f"Exported {exported} submissions")
+            size = os.path.getsize(path)
+            if size > MAX_DOWNLOAD_BYTES:
+                st.info(
+                    f"The export is {size / 1024 / 1024:.0f} MB, over the {MAX_DOWNLOAD_BYTES // 1024 // 1024} MB "
+                    f"browser download limit; it was saved on the server as {path}"
+                )
+            else:
+                with open(path, "rb") as export_file:
+                    st.download_button(
+                        label=f"Download {export_format.upper()}",
+                        data=export_file,
+                        file_name=os.path.basename(path),
+                        mime=EXPORT_MIME_TYPES[export_format]
+                    )
+
+def sketch_panel(analysis):
+    """Sketch-only figures of the streaming analysis scope, with their error bounds"""
+    st.subheader("📡 Streaming Sketches")
+    bounds = analysis['error_bounds']
+    schema = SURVEY_SCHEMAS[st.session_state.survey_key]
+    st.metric(
+        "Distinct Respondents (HyperLogLog)",
+        f"{analysis['distinct_respondents']:,}",
+        help=f"± {bounds['distinct_respondents_relative']:.2%} standard error"
+    )
+    
+    if analysis['rating_quantiles']:
+        st.markdown("**Rating quantiles (t-digest)**")
+        st.dataframe(pd.DataFrame([
+            {"Question": schema.question(question_id).text, **{f"p{int(q * 100)}": value for q, value in quantiles.items()}}
+            for question_id, quantiles in analysis['rating_quantiles'].items()
+        ]), use_container_width=True)
+    
+    count_col1, count_col2 = st.columns(2)
+    with count_col1:
+        st.markdown("**Option frequencies (count-min)**")
+        for question_id, counts in analysis['option_counts'].items():
+            st.caption(schema.question(question_id).text)
+            st.dataframe(pd.DataFrame(counts, columns=["Option", "Count"]), use_container_width=True)
+    with count_col2:
+        st.markdown("**Top keywords (top-k)**")
+        st.dataframe(pd.DataFrame(analysis['top_keywords'], columns=["Keyword", "Count"]), use_container_width=True)
+    st.caption(
+        f"Counts may overestimate by up to {bounds['keyword_count_absolute']:.0f} "
+        f"(themes {bounds['theme_count_absolute']:.0f}) with 99% probability; they never underestimate."
+    )
+
+@timed("page.monitoring")
+def monitoring_page():
+    """Supervisor view of field progress per enumerator and district"""
+    st.title("📡 Supervisor Monitoring")
+    st.markdown(f"### Field progress from hourly rollups, refreshed every {MONITOR_REFRESH_SECONDS}s")
+    
+    filter_col1, filter_col2, filter_col3 = st.columns(3)
+    with filter_col1:
+        surveys = st.multiselect(
+            "Surveys",
+            list(SURVEY_SCHEMAS),
+            default=list(SURVEY_SCHEMAS),
+            format_func=lambda key: SURVEY_SCHEMAS[key].title
+        )
+    with filter_col2:
+        hours = st.slider("Last hours", min_value=1, max_value=168, value=24)
+    with filter_col3:
+        group_by = st.selectbox("Group by", ["enumerator", "district"], format_func=str.title)
+    monitoring_panel(tuple(surveys), hours, group_by)
+
+@st.fragment(run_every=MONITOR_REFRESH_SECONDS)
+@timed("page.monitoring_panel")
+def monitoring_panel(surveys, hours, group_by):
+    """Rollup metrics, tables and charts; reruns on its own timer without rerunning the page"""
+    since = (datetime.now() - timedelta(hours=hours)).isoformat()[:13]
+    with timer("monitor.load_rollups"):
+        rollups = load_rollups(since)
+    rollups = rollups[rollups["survey"].isin(surveys)]
+    if rollups.empty:
+        st.info("No submissions in this period")
+        return
+    
+    started, completed, flagged = (int(rollups[column].sum()) for column in ("started", "completed", "flagged"))
+    answer_seconds = rollups["answer_seconds"].sum()
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Started", f"{started:,}")
+    col2.metric("Completed", f"{completed:,}")
+    col3.metric("Completion Rate", f"{completed / started:.0%}" if started else "–")
+    col4.metric("Mean Answering Time", f"{answer_seconds / completed / 60:.1f} min" if completed else "–")
+    col5.metric("Quality Flags", f"{flagged:,}")
+    
+    with timer("dataframe.monitor_groups"):
+        groups = rollups.assign(**{group_by: rollups[group_by].replace("", "(untagged)")}).groupby(group_by)[
+            ["started", "completed", "answer_seconds", "flagged"]
+        ].sum()
+        groups["completion_rate"] = (groups["completed"] / groups["started"].where(groups["started"] > 0)).round(3)
+        groups["mean_minutes"] = (groups["answer_seconds"] / groups["completed"].where(groups["completed"] > 0) / 60).round(1)
+        groups = groups.drop(columns="answer_seconds").sort_values("started", ascending=False)
+    st.dataframe(groups, use_container_width=True)
+    
+    with timer("chart.monitor_hourly"):
+        hourly = rollups.groupby("hour")[["started", "completed", "flagged"]].sum().reset_index()
+        fig_hourly = px.bar(
+            hourly.melt(id_vars="hour", var_name="count", value_name="submissions"),
+            x="hour",
+            y="submissions",
+            color="count",
+            barmode="group",
+            title="Submissions per Hour"
+        )
+    st.plotly_chart(fig_hourly, use_container_width=True)
+    st.caption(
+        "Starts are counted in the hour they began; completions, answering time and flags in the hour they completed. "
+        f"Updated {datetime.now():%H:%M:%S}"
+    )
+
+def metrics_panel():
+    """Sidebar view of per-stage latency percentiles, exports and the profiler toggle"""
+    with st.expander("⏱️ Performance Metrics"):
+        snapshot = REGISTRY.snapshot()
+        stage_rows = [
+            {
+                "Stage": stage,
+                "Calls": stats["count"],
+                "p50 (ms)": round(stats["p50_seconds"] * 1000, 3),
+                "p99 (ms)": round(stats["p99_seconds"] * 1000, 3)
+            }
+            for stage, stats in snapshot["stages"].items() if stats["count"]
+        ]
+        if stage_rows:
+            st.dataframe(pd.DataFrame(stage_rows), use_container_width=True, hide_index=True)
+        for event, value in snapshot["counters"].items():
+            st.caption(f"{event}: {value}")
+        
+        st.download_button("Metrics JSON", data=REGISTRY.to_json(), file_name="survey_metrics.json", mime="application/json")
+        st.download_button("Prometheus", data=REGISTRY.prometheus_text(), file_name="survey_metrics.prom", mime="text/plain")
+        
+        profiler = get_profiler()
+        if st.toggle("Sampling profiler", value=profiler.running):
+            profiler.start()
+            for function, samples in profiler.top_functions(10):
+                st.caption(f"{samples} × {function}")
+            st.download_button("Collapsed stacks", data=profiler.collapsed(), file_name="survey_profile.txt", mime="text/plain")
+        else:
+            profiler.stop()
+
 def main():
     """Main application logic"""
+    get_metrics_server()
+    
     # Sidebar
     with st.sidebar:
         st.markdown("### 🧠 AI Survey Tool")
+        view = st.radio("View", ["Survey", "Supervisor monitoring"], horizontal=True, label_visibility="collapsed")
         st.markdown("---")
         
-        if st.session_state.current_survey is None:
+        if st.session_state.survey_key is None:
             st.info("Select a survey template to get started")
         elif not st.session_state.survey_completed:
-            st.success(f"Taking: {st.session_state.current_survey['title']}")
-            st.progress((st.session_state.current_question + 1) / len(st.session_state.current_survey['questions']))
+            schema = SURVEY_SCHEMAS[st.session_state.survey_key]
+            st.success(f"Taking: {schema.title}")
+            st.progress((st.session_state.current_question + 1) / len(schema))
         else:
             st.success("Survey completed! Viewing analysis.")
         
@@ -562,13 +913,17 @@ def main():
         - 📈 Visual analytics
         """)
         
+        metrics_panel()
+        
         if st.button("🔄 Reset All", type="secondary"):
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
             st.rerun()
     
     # Main content
-    if st.session_state.current_survey is None:
+    if view == "Supervisor monitoring":
+        monitoring_page()
+    elif st.session_state.survey_key is None:
         create_survey_page()
     elif not st.session_state.survey_completed:
         take_survey_page()
@@ -0,0 +1,170 @@
+"""Content-addressed LRU cache for survey analysis results"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def analysis_key(schema, responses, analyzer_version):
+    """Stable hash of (survey schema, normalized responses, analyzer version)
+
+    The schema counts through its key and ``template_hash``, which is computed
+    once when the schema is compiled rather than on every call.
+    """
+    normalized = sorted((str(question_id), value) for question_id, value in responses.items())
+    payload = json.dumps(
+        {"survey": [schema.key, schema.template_hash], "responses": normalized, "analyzer": analyzer_version},
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """Thread-safe, memory-bounded LRU cache of JSON-serializable analysis results.
+
+    Entries are evicted least-recently-used first once either ``max_entries``
+    or ``max_bytes`` (measured on the serialized value) is exceeded. With a
+    ``spill_dir`` evicted entries are written to disk and reloaded on a later
+    miss; once the spilled files exceed ``max_spill_bytes`` the least recently
+    written or read ones are deleted. Cached values are shared between callers
+    and must not be mutated.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, spill_dir=None,
+                 max_spill_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._spill_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._prune_spilled()
+
+    def get(self, key):
+        """Cached value for a key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        value = self._load_spilled(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        """Store a value, evicting least-recently-used entries as needed"""
+        size = len(json.dumps(value, default=str))
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                old_key, (old_value, old_size) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                self.evictions += 1
+                evicted.append((old_key, old_value))
+        for old_key, old_value in evicted:
+            self._spill(old_key, old_value)
+
+    def get_or_compute(self, key, compute):
+        """Cached value for a key, computing and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop every in-memory entry (spilled files are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, f"{key}.json")
+
+    def _spill(self, key, value):
+        if not self.spill_dir:
+            return
+        path = self._spill_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, default=str)
+            size = f.tell()
+        os.replace(tmp_path, path)
+        with self._lock:
+            # Overwritten files are counted again; pruning recounts from the directory
+            self._spill_bytes += size
+            prune = self._spill_bytes > self.max_spill_bytes
+        if prune:
+            self._prune_spilled()
+
+    def _prune_spilled(self):
+        """Delete the oldest spill files (by mtime) until the directory fits ``max_spill_bytes``"""
+        files = []
+        for entry in os.scandir(self.spill_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_spill_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._spill_bytes = total
+
+    def _load_spilled(self, key):
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+            # Reads count as use for pruning
+            os.utime(path)
+            return value
+        except (OSError, ValueError):
+            return None
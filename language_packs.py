@@ -0,0 +1,293 @@
+"""Memory-mapped multilingual lexicon packs for sentiment and theme scoring
+
+A pack is a sorted string table compiled from ``lexicons/<language>.json``::
+
+    magic "SLPK" | u16 version | u16 lexicons | u32 terms | 16s language | 16s script
+    32s lexicon name * lexicons
+    u32 term offset * (terms + 1)        into the term blob
+    u32 lexicon bitmask * terms          which lexicons each term belongs to
+    term blob                            NFKC-normalised, casefolded UTF-8, sorted bytewise
+
+Packs are opened with ``mmap`` on first use of a language, so every worker
+process shares the same page-cache pages and only the pages touched by
+lookups become resident. Lookups binary-search the offset table; a small
+bounded memo per process keeps frequent tokens fast.
+
+Usage:
+    python language_packs.py build          # compile every lexicons/*.json into LANGUAGE_PACK_DIR
+    python language_packs.py show hi
+"""
+import argparse
+import glob
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import unicodedata
+
+
+LEXICON_DIR = os.environ.get("SURVEY_LEXICON_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicons"))
+LANGUAGE_PACK_DIR = os.environ.get("SURVEY_LANGUAGE_PACK_DIR", "language_packs")
+MAGIC = b"SLPK"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHI16s16s")
+NAME = struct.Struct("<32s")
+MAX_MEMO_TOKENS = 65536
+
+# Joiners change rendering, not meaning, in Indic scripts; they would split otherwise equal words
+_JOINERS = dict.fromkeys([0x200B, 0x200C, 0x200D, 0xFEFF])
+
+# Word characters plus the combining vowel signs, viramas and nuktas that \w leaves out,
+# so Indic and Arabic-script words are not cut at every matra
+TOKEN_PATTERNS = {
+    "latin": re.compile(r"\w+"),
+    "indic": re.compile(r"[\w\u0900-\u0963\u0966-\u0dff]+"),
+    "arabic": re.compile(r"[\w\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed]+"),
+}
+
+
+def normalize(text):
+    """Unicode NFKC, casefolding and joiner removal, applied to lexicons and responses alike"""
+    return unicodedata.normalize("NFKC", text).casefold().translate(_JOINERS)
+
+
+def tokenize(text, script="latin"):
+    """Normalised tokens of a text with the tokenizer of its script"""
+    return TOKEN_PATTERNS[script].findall(normalize(text))
+
+
+def build_pack(source_path, pack_path):
+    """Compile a JSON lexicon source into a binary pack
+
+    The source holds ``language``, ``script`` and ``lexicons`` (name -> words);
+    ``positive`` and ``negative`` drive sentiment, every other lexicon is a
+    theme named as in ``AIAnalyzer.THEME_KEYWORDS``.
+    """
+    with open(source_path, encoding="utf-8") as f:
+        source = json.load(f)
+    script = source.get("script", "latin")
+    names = list(source["lexicons"])
+    if len(names) > 32:
+        raise ValueError("A pack holds at most 32 lexicons")
+
+    term_lexicons = {}
+    for lexicon_idx, name in enumerate(names):
+        for word in source["lexicons"][name]:
+            for token in tokenize(word, script):
+                term_lexicons[token.encode("utf-8")] = term_lexicons.get(token.encode("utf-8"), 0) | (1 << lexicon_idx)
+    terms = sorted(term_lexicons)
+
+    offsets = [0]
+    for term in terms:
+        offsets.append(offsets[-1] + len(term))
+
+    directory = os.path.dirname(pack_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{pack_path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(names), len(terms),
+                            source["language"].encode("utf-8"), script.encode("utf-8")))
+        for name in names:
+            f.write(NAME.pack(name.encode("utf-8")))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(struct.pack(f"<{len(terms)}I", *(term_lexicons[term] for term in terms)))
+        f.write(b"".join(terms))
+    # Atomic so processes racing to build the same pack never map a half-written file
+    os.replace(tmp_path, pack_path)
+    return pack_path
+
+
+class _Masks(dict):
+    # Themes a pack has no words for simply never match
+    def __missing__(self, lexicon):
+        return 0
+
+
+class _Terms:
+    """Read-only sequence view of a pack's terms (index -> str)"""
+
+    def __init__(self, pack):
+        self._pack = pack
+
+    def __len__(self):
+        return self._pack.n_terms
+
+    def __getitem__(self, idx):
+        return self._pack.term(idx)
+
+
+class LanguagePack:
+    """A memory-mapped pack; also usable wherever a KeywordMatcher is expected.
+
+    Every term owns one hit-vector bit, so ``hits``/``count``/``masks`` have
+    the same meaning as on KeywordMatcher.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_lexicons, n_terms, language, script = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} language pack")
+        self.language = language.rstrip(b"\0").decode("utf-8")
+        self.script = script.rstrip(b"\0").decode("utf-8")
+        self.n_terms = n_terms
+        self.token_pattern = TOKEN_PATTERNS[self.script]
+
+        position = HEADER.size
+        self.lexicons = [
+            NAME.unpack_from(self._mmap, position + i * NAME.size)[0].rstrip(b"\0").decode("utf-8")
+            for i in range(n_lexicons)
+        ]
+        position += n_lexicons * NAME.size
+        view = memoryview(self._mmap)
+        self._offsets = view[position:position + 4 * (n_terms + 1)].cast("I")
+        position += 4 * (n_terms + 1)
+        self._term_lexicons = view[position:position + 4 * n_terms].cast("I")
+        self._blob = position + 4 * n_terms
+        self._memo = {}
+        self._masks = None
+        self._content_hash = None
+        self.keywords = _Terms(self)
+
+    @property
+    def content_hash(self):
+        """Hash of the whole pack file, so analysis cache keys change when its lexicons do"""
+        if self._content_hash is None:
+            self._content_hash = hashlib.sha256(self._mmap).hexdigest()[:16]
+        return self._content_hash
+
+    def term(self, idx):
+        start = self._blob + self._offsets[idx]
+        return self._mmap[start:self._blob + self._offsets[idx + 1]].decode("utf-8")
+
+    def lookup(self, token):
+        """Term index of a normalised token, or -1"""
+        idx = self._memo.get(token)
+        if idx is not None:
+            return idx
+        key = token.encode("utf-8")
+        lo, hi = 0, self.n_terms
+        offsets, data, blob = self._offsets, self._mmap, self._blob
+        idx = -1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            term = data[blob + offsets[mid]:blob + offsets[mid + 1]]
+            if term < key:
+                lo = mid + 1
+            elif term > key:
+                hi = mid
+            else:
+                idx = mid
+                break
+        if len(self._memo) >= MAX_MEMO_TOKENS:
+            self._memo.clear()
+        self._memo[token] = idx
+        return idx
+
+    @property
+    def masks(self):
+        """Lexicon name -> bitmask of its terms (built on first use)"""
+        if self._masks is None:
+            masks = _Masks.fromkeys(self.lexicons, 0)
+            bits = [1 << i for i in range(len(self.lexicons))]
+            for term_idx, lexicon_bits in enumerate(self._term_lexicons):
+                for lexicon_idx, bit in enumerate(bits):
+                    if lexicon_bits & bit:
+                        masks[self.lexicons[lexicon_idx]] |= 1 << term_idx
+            self._masks = masks
+        return self._masks
+
+    def hits(self, text):
+        """Hit vector (bitmask of matched terms) for one text"""
+        if not text:
+            return 0
+        vector = 0
+        for token in self.token_pattern.findall(normalize(text)):
+            idx = self.lookup(token)
+            if idx >= 0:
+                vector |= 1 << idx
+        return vector
+
+    def hit_vectors(self, texts):
+        return [self.hits(text) for text in texts]
+
+    def count(self, vector, lexicon):
+        """Number of distinct terms of ``lexicon`` present in a hit vector"""
+        return bin(vector & self.masks[lexicon]).count("1")
+
+    def matched(self, vector, lexicon):
+        """Matched terms of ``lexicon`` in a hit vector"""
+        vector &= self.masks[lexicon]
+        matched = []
+        while vector:
+            bit = vector & -vector
+            vector ^= bit
+            matched.append(self.term(bit.bit_length() - 1))
+        return matched
+
+
+_PACKS = {}
+_PACKS_LOCK = threading.Lock()
+
+
+def pack_path(language):
+    return os.path.join(LANGUAGE_PACK_DIR, f"{language}.slp")
+
+
+def load_pack(language):
+    """The process-wide pack of a language, mapped on first use (and compiled if missing or stale)"""
+    pack = _PACKS.get(language)
+    if pack is not None:
+        return pack
+    with _PACKS_LOCK:
+        pack = _PACKS.get(language)
+        if pack is None:
+            path = pack_path(language)
+            source = os.path.join(LEXICON_DIR, f"{language}.json")
+            if os.path.exists(source) and (
+                not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(source)
+            ):
+                build_pack(source, path)
+            if not os.path.exists(path):
+                raise LookupError(f"No language pack for {language!r}")
+            pack = _PACKS[language] = LanguagePack(path)
+    return pack
+
+
+def available_languages():
+    """Languages with a lexicon source or a compiled pack"""
+    sources = glob.glob(os.path.join(LEXICON_DIR, "*.json")) + glob.glob(os.path.join(LANGUAGE_PACK_DIR, "*.slp"))
+    return sorted({os.path.splitext(os.path.basename(path))[0] for path in sources})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect multilingual lexicon packs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Compile lexicon sources into packs")
+    build.add_argument("languages", nargs="*", help="Default: every lexicons/*.json")
+    show = subparsers.add_parser("show", help="Print a pack's lexicons and term counts")
+    show.add_argument("language")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        for language in args.languages or [
+            os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(LEXICON_DIR, "*.json"))
+        ]:
+            print(build_pack(os.path.join(LEXICON_DIR, f"{language}.json"), pack_path(language)))
+    else:
+        pack = load_pack(args.language)
+        print(f"{pack.language} ({pack.script}): {pack.n_terms} terms")
+        for lexicon in pack.lexicons:
+            print(f"  {lexicon}: {pack.count(pack.masks[lexicon], lexicon)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
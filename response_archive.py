@@ -0,0 +1,199 @@
+"""Columnar Parquet/Arrow archive of completed survey submissions"""
+import json
+import os
+from datetime import datetime
+
+
+ARCHIVE_DIR = os.environ.get("SURVEY_ARCHIVE_DIR", "archives")
+# Dictionary of the sentiment analysis columns
+SENTIMENTS = ["positive", "negative", "neutral"]
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError("The response archive requires pyarrow (pip install pyarrow)") from exc
+    return pa, pc, pq
+
+
+def question_column(question):
+    """Archive column name for a question (matches the survey widget keys)"""
+    return f"q_{question.id}"
+
+
+def _rating_type(pa, scale):
+    return pa.uint8() if scale <= 255 else pa.uint16()
+
+
+def analysis_columns(question):
+    """Sentiment and themes column names of an AI-analysed text question"""
+    return f"{question_column(question)}_sentiment", f"{question_column(question)}_themes"
+
+
+def archive_schema(survey, analysis=False, metadata=None):
+    """Arrow schema with one column per question of a compiled survey schema.
+
+    Ratings are compact unsigned integers, multiple-choice answers are
+    dictionary-encoded against the template's options and free text is a
+    plain string column. With ``analysis`` every AI-analysed text column is
+    followed by its sentiment (dictionary-encoded) and themes (list) columns,
+    as in the CSV export. ``metadata`` is merged into the schema metadata.
+    """
+    pa, _, _ = _pyarrow()
+    fields = [
+        pa.field("submission_id", pa.int64(), nullable=False),
+        pa.field("respondent_id", pa.string()),
+        pa.field("completed_at", pa.timestamp("us")),
+    ]
+    for question in survey.questions:
+        if question.type == "rating":
+            column_type = _rating_type(pa, question.scale)
+        elif question.type == "multiple_choice":
+            column_type = pa.dictionary(pa.int8() if len(question.options) < 128 else pa.int32(), pa.string())
+        else:
+            column_type = pa.string()
+        fields.append(pa.field(question_column(question), column_type, metadata={"text": question.text}))
+        if analysis and question.is_analysed_text:
+            sentiment_column, themes_column = analysis_columns(question)
+            fields.append(pa.field(sentiment_column, pa.dictionary(pa.int8(), pa.string())))
+            fields.append(pa.field(themes_column, pa.list_(pa.string())))
+    return pa.schema(fields, metadata={"title": survey.title, **(metadata or {})})
+
+
+def _record_batch(pa, schema, survey, rows, analyze=None):
+    submission_ids, respondent_ids, completed_at = [], [], []
+    for submission_id, respondent_id, completed, _ in rows:
+        submission_ids.append(submission_id)
+        respondent_ids.append(respondent_id)
+        completed_at.append(datetime.fromisoformat(completed) if completed else None)
+
+    arrays = [
+        pa.array(submission_ids, type=pa.int64()),
+        pa.array(respondent_ids, type=pa.string()),
+        pa.array(completed_at, type=pa.timestamp("us")),
+    ]
+    analyses = [analyze(answers) for _, _, _, answers in rows] if analyze is not None else None
+    for question in survey.questions:
+        field = schema.field(question_column(question))
+        values = [answers.get(question.id) for _, _, _, answers in rows]
+        if question.type == "rating":
+            arrays.append(pa.array([v if isinstance(v, int) else None for v in values], type=field.type))
+        elif question.type == "multiple_choice":
+            indices = pa.array([question.option_index.get(v) for v in values], type=field.type.index_type)
+            arrays.append(pa.DictionaryArray.from_arrays(indices, pa.array(question.options, type=pa.string())))
+        else:
+            arrays.append(pa.array([v if isinstance(v, str) else None for v in values], type=pa.string()))
+        if analyses is not None and question.is_analysed_text:
+            text_analyses = [analysis.get(question.id) for analysis in analyses]
+            indices = pa.array(
+                [SENTIMENTS.index(a["sentiment"]) if a else None for a in text_analyses], type=pa.int8()
+            )
+            arrays.append(pa.DictionaryArray.from_arrays(indices, pa.array(SENTIMENTS, type=pa.string())))
+            arrays.append(pa.array([a["themes"] if a else None for a in text_analyses], type=pa.list_(pa.string())))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_archive(submissions, survey, path, batch_size=65536, analyze=None, summary=None):
+    """Write ``(submission_id, respondent_id, completed_at, answers)`` rows to a columnar archive.
+
+    ``submissions`` is consumed lazily in batches of ``batch_size`` rows (one
+    Parquet row group or Arrow record batch each). A ``.arrow`` path writes an
+    uncompressed Arrow IPC file for zero-copy memory-mapped reads; anything
+    else is written as Parquet. ``analyze`` (answers -> per-question analysis,
+    see ``response_export.submission_analysis``) adds the analysis columns and
+    ``summary`` is stored as JSON under the ``analysis`` schema metadata key.
+    The file is written under a temporary name and renamed over ``path`` when
+    complete, so readers never map a half-written archive. Returns the number
+    of submissions written.
+    """
+    pa, _, pq = _pyarrow()
+    metadata = {"analysis": json.dumps(summary, default=str)} if summary is not None else None
+    schema = archive_schema(survey, analysis=analyze is not None, metadata=metadata)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    if path.endswith(".arrow"):
+        writer = pa.ipc.new_file(tmp_path, schema)
+    else:
+        writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+
+    total = 0
+    rows = []
+    try:
+        try:
+            for row in submissions:
+                rows.append(row)
+                if len(rows) >= batch_size:
+                    writer.write_batch(_record_batch(pa, schema, survey, rows, analyze))
+                    total += len(rows)
+                    rows = []
+            if rows:
+                writer.write_batch(_record_batch(pa, schema, survey, rows, analyze))
+                total += len(rows)
+        finally:
+            writer.close()
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return total
+
+
+def archive_survey(store, survey, path=None, batch_size=65536):
+    """Archive every completed submission of a survey from the response store"""
+    path = path or os.path.join(ARCHIVE_DIR, f"{survey.key}.parquet")
+    return path, write_archive(store.iter_completed_submissions(survey.key), survey, path, batch_size)
+
+
+def read_archive(path, columns=None):
+    """Memory-mapped read of only the requested archive columns as a pyarrow Table"""
+    pa, _, pq = _pyarrow()
+    if path.endswith(".arrow"):
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        return table.select(columns) if columns is not None else table
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+
+def rating_metrics(path, survey):
+    """Average satisfaction and NPS over an archive, reading only the rating columns"""
+    _, pc, _ = _pyarrow()
+    if not survey.rating_questions:
+        return {"avg_satisfaction": 0, "nps_score": 0}
+    table = read_archive(path, [question_column(q) for q in survey.rating_questions])
+
+    rating_sum = 0
+    rating_count = 0
+    for column in table.columns:
+        rating_count += len(column) - column.null_count
+        rating_sum += (pc.sum(column).as_py() or 0)
+
+    promoters = detractors = nps_count = 0
+    for question in survey.nps_questions:
+        column = table.column(question_column(question))
+        nps_count += len(column) - column.null_count
+        promoters += pc.sum(pc.greater_equal(column, 9)).as_py() or 0
+        detractors += pc.sum(pc.less_equal(column, 6)).as_py() or 0
+
+    return {
+        "avg_satisfaction": rating_sum / rating_count if rating_count else 0,
+        "nps_score": ((promoters - detractors) / nps_count) * 100 if nps_count else 0,
+    }
+
+
+def text_column(path, survey, ai_analysis_only=True):
+    """All free-text answers of an archive as one pandas Series, reading only the text columns"""
+    import pandas as pd
+
+    if ai_analysis_only:
+        questions = survey.analysed_text_questions
+    else:
+        questions = [q for q in survey.questions if q.type == "text"]
+    if not questions:
+        return pd.Series([], dtype=object)
+    table = read_archive(path, [question_column(q) for q in questions])
+    return pd.concat([column.to_pandas() for column in table.columns], ignore_index=True).dropna()
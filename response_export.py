@@ -0,0 +1,138 @@
+"""Streaming NDJSON/CSV/Parquet export of stored submissions and their analysis"""
+import csv
+import io
+import json
+import os
+import uuid
+from datetime import datetime
+
+import response_archive
+from survey_analysis import AIAnalyzer
+
+
+EXPORT_DIR = os.environ.get("SURVEY_EXPORT_DIR", "exports")
+EXPORT_FORMATS = {"ndjson": ".ndjson", "csv": ".csv", "parquet": ".parquet"}
+SUMMARY_COMMENT = "# "
+
+
+def submission_analysis(survey, answers):
+    """Sentiment and matched themes of each AI-analysed text answer of one submission"""
+    matcher = AIAnalyzer.matcher(survey.language)
+    analysis = {}
+    for question in survey.analysed_text_questions:
+        text = answers.get(question.id)
+        if not isinstance(text, str):
+            continue
+        hits = matcher.hits(text)
+        analysis[question.id] = {
+            "sentiment": AIAnalyzer.analyze_sentiment(text, hits, survey.language),
+            "themes": [theme for theme in AIAnalyzer.THEME_KEYWORDS if hits & matcher.masks[theme]],
+        }
+    return analysis
+
+
+def iter_ndjson(submissions, survey, summary=None):
+    """Yield one JSON line per submission (preceded by an optional analysis summary line)"""
+    if summary is not None:
+        yield json.dumps({"type": "analysis", "survey": survey.key, **summary}, default=str) + "\n"
+    for submission_id, respondent_id, completed_at, answers in submissions:
+        yield json.dumps({
+            "type": "submission",
+            "survey": survey.key,
+            "submission_id": submission_id,
+            "respondent_id": respondent_id,
+            "completed_at": completed_at,
+            "answers": answers,
+            "analysis": submission_analysis(survey, answers),
+        }, default=str) + "\n"
+
+
+def csv_header(survey):
+    """CSV columns: submission metadata, one column per question and per-text analysis columns"""
+    header = ["submission_id", "respondent_id", "completed_at"]
+    for question in survey.questions:
+        header.append(response_archive.question_column(question))
+        if question.is_analysed_text:
+            header.extend(response_archive.analysis_columns(question))
+    return header
+
+
+def iter_csv(submissions, survey, summary=None, chunk_rows=1000):
+    """Yield the CSV export in text chunks of ``chunk_rows`` rows
+
+    An optional analysis summary comes first as one ``#``-prefixed JSON line
+    (``pandas.read_csv(path, skiprows=1)`` reads past it).
+    """
+    buffer = io.StringIO()
+    if summary is not None:
+        buffer.write(SUMMARY_COMMENT + json.dumps({"type": "analysis", "survey": survey.key, **summary}, default=str) + "\n")
+    writer = csv.writer(buffer)
+    writer.writerow(csv_header(survey))
+    rows = 0
+    for submission_id, respondent_id, completed_at, answers in submissions:
+        analysis = submission_analysis(survey, answers)
+        row = [submission_id, respondent_id, completed_at]
+        for question in survey.questions:
+            row.append(answers.get(question.id, ""))
+            if question.is_analysed_text:
+                text_analysis = analysis.get(question.id, {})
+                row.append(text_analysis.get("sentiment", ""))
+                row.append(";".join(text_analysis.get("themes", [])))
+        writer.writerow(row)
+        rows += 1
+        if rows % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_submissions(store, survey, fmt="ndjson", start=None, end=None, path=None, summary=None, batch_size=65536):
+    """Stream completed submissions of a survey (optionally within a date range) to an export file
+
+    Peak memory is bounded by one chunk (CSV), one line (NDJSON) or one row
+    group (Parquet) regardless of how many submissions are exported. Every
+    format carries the per-answer analysis and the optional ``summary``
+    (NDJSON as its first line, CSV as a leading comment line, Parquet in the
+    file metadata). The file is written under a
+    temporary name and renamed when complete; default paths are unique per
+    export. Returns ``(path, submissions_written)``.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if path is None:
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(EXPORT_DIR, f"{survey.key}_{stamp}_{uuid.uuid4().hex[:8]}{EXPORT_FORMATS[fmt]}")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    count = 0
+
+    def counted(submissions):
+        nonlocal count
+        for submission in submissions:
+            count += 1
+            yield submission
+
+    submissions = counted(store.iter_completed_submissions(survey.key, start, end))
+    if fmt == "parquet":
+        # write_archive renames its own temporary file into place
+        response_archive.write_archive(
+            submissions, survey, path, batch_size,
+            analyze=lambda answers: submission_analysis(survey, answers), summary=summary
+        )
+        return path, count
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    try:
+        chunks = iter_ndjson(submissions, survey, summary) if fmt == "ndjson" else iter_csv(submissions, survey, summary)
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path, count
@@ -0,0 +1,395 @@
+"""Asynchronous high-concurrency response ingestion with group-committed writes
+
+Channels such as WhatsApp or IVR gateways POST answer payloads::
+
+    {"survey": "customer_satisfaction", "respondent_id": "+91...", "submission_id": null,
+     "answers": {"1": 4, "2": "Pricing", "3": "Faster delivery please"}, "complete": true,
+     "enumerator": "E-104", "district": "Pune"}
+
+Each payload is validated against the compiled survey schema, queued on a
+bounded asyncio queue (full queue = backpressure) and written by a single
+writer that group-commits micro-batches to the response store.
+
+Usage:
+    python response_ingest.py --port 8080 --db survey_responses.db
+"""
+import argparse
+import asyncio
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from response_store import DEFAULT_DB_PATH, ResponseStore, SubmissionClosedError
+from survey_analysis import SURVEY_SCHEMAS
+from survey_metrics import REGISTRY, timer
+from survey_validation import MAX_TEXT_LENGTH
+
+
+MAX_TAG_LENGTH = 64
+MAX_RESPONDENT_ID_LENGTH = 128
+MAX_BODY_BYTES = 8 * 1024 * 1024
+HTTP_REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 409: "Conflict",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"
+}
+
+
+class ValidationError(ValueError):
+    """Payload rejected by schema validation; ``code`` is machine-readable"""
+
+    def __init__(self, code, message, question_id=None):
+        super().__init__(message)
+        self.code = code
+        self.question_id = question_id
+
+    def to_dict(self):
+        return {"error": self.code, "message": str(self), "question_id": self.question_id}
+
+
+def validate_answer(question, value):
+    """Return the answer coerced to the type the survey widgets produce, or raise ValidationError
+
+    Scalar fast path of survey_validation's per-question rules, with the same codes.
+    """
+    if question.type == "rating":
+        if isinstance(value, bool):
+            raise ValidationError("invalid_type", "Rating must be an integer", question.id)
+        if isinstance(value, str) and value.strip().isdigit():
+            value = int(value)
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if not isinstance(value, int):
+            raise ValidationError("invalid_type", "Rating must be an integer", question.id)
+        if not 1 <= value <= question.scale:
+            raise ValidationError("out_of_range", f"Rating must be between 1 and {question.scale}", question.id)
+        return value
+
+    if not isinstance(value, str):
+        raise ValidationError("invalid_type", "Answer must be a string", question.id)
+    if question.type == "multiple_choice":
+        if value not in question.option_index:
+            raise ValidationError("invalid_option", f"Unknown option: {value!r}", question.id)
+        return value
+    if len(value) > MAX_TEXT_LENGTH:
+        raise ValidationError("too_long", f"Text answers are limited to {MAX_TEXT_LENGTH} characters", question.id)
+    return value
+
+
+def validate_payload(payload):
+    """Validate one payload; returns a ``write_batch`` record"""
+    if not isinstance(payload, dict):
+        raise ValidationError("invalid_payload", "Payload must be a JSON object")
+    schema = SURVEY_SCHEMAS.get(payload.get("survey"))
+    if schema is None:
+        raise ValidationError("unknown_survey", f"Unknown survey: {payload.get('survey')!r}")
+    raw_answers = payload.get("answers") or {}
+    if not isinstance(raw_answers, dict):
+        raise ValidationError("invalid_payload", "answers must be an object keyed by question id")
+
+    answers = {}
+    for raw_id, value in raw_answers.items():
+        try:
+            question = schema.question(int(raw_id))
+        except (TypeError, ValueError):
+            question = None
+        if question is None:
+            raise ValidationError("unknown_question", f"Unknown question id: {raw_id!r}", raw_id)
+        answers[question.id] = validate_answer(question, value)
+
+    complete = bool(payload.get("complete"))
+    submission_id = payload.get("submission_id")
+    if submission_id is not None and (isinstance(submission_id, bool) or not isinstance(submission_id, int)
+                                      or submission_id < 1):
+        raise ValidationError("invalid_payload", "submission_id must be a positive integer")
+    respondent_id = payload.get("respondent_id")
+    if respondent_id is not None and (not isinstance(respondent_id, str) or not respondent_id
+                                      or len(respondent_id) > MAX_RESPONDENT_ID_LENGTH):
+        raise ValidationError(
+            "invalid_payload", f"respondent_id must be a non-empty string of at most {MAX_RESPONDENT_ID_LENGTH} characters"
+        )
+    if complete and submission_id is None:
+        # A one-shot submission must answer every required question on its branch, and only those
+        for question in schema.path(answers):
+            if question.required and not answers.get(question.id):
+                raise ValidationError("missing_required", "This question is required!", question.id)
+        for question_id in schema.unreachable(answers):
+            del answers[question_id]
+
+    tags = []
+    for field in ("enumerator", "district"):
+        tag = payload.get(field) or ""
+        if not isinstance(tag, str) or len(tag) > MAX_TAG_LENGTH:
+            raise ValidationError("invalid_payload", f"{field} must be a string of at most {MAX_TAG_LENGTH} characters")
+        tags.append(tag)
+
+    return (schema.key, respondent_id, submission_id, answers, complete, *tags)
+
+
+def check_submission(store, record):
+    """Reject a record that continues a submission which is unknown, of another survey or respondent, or closed
+
+    This is the early check before queueing; ``write_batch`` re-checks that the
+    submission is open inside its transaction, so racing payloads cannot both complete it.
+    """
+    survey, respondent_id, submission_id = record[:3]
+    if submission_id is None:
+        return
+    submission = store.submission(submission_id)
+    if submission is None:
+        raise ValidationError("unknown_submission", f"Unknown submission: {submission_id}")
+    if submission["survey"] != survey:
+        raise ValidationError("submission_mismatch", f"Submission {submission_id} belongs to another survey")
+    if respondent_id is not None and submission["respondent_id"] != respondent_id:
+        raise ValidationError("submission_mismatch", f"Submission {submission_id} belongs to another respondent")
+    if submission["completed_at"] is not None:
+        raise ValidationError("submission_closed", f"Submission {submission_id} is already completed")
+
+
+class IngestionService:
+    """Bounded queue in front of a single group-committing store writer.
+
+    ``submit`` waits while the queue is full (up to ``enqueue_timeout``
+    seconds, then raises ``asyncio.QueueFull``) so producers feel
+    backpressure instead of growing memory. The writer drains up to
+    ``max_batch`` payloads or waits at most ``max_delay`` seconds before
+    committing them in one transaction on a dedicated thread. If a batch
+    fails, its submissions are retried one by one so only the offending ones
+    are rejected. ``submit_many`` queues its payloads as one submission, so a
+    list commits or is rejected as a whole.
+    """
+
+    def __init__(self, store, max_queue=50000, max_batch=2000, max_delay=0.005, enqueue_timeout=1.0):
+        self.store = store
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="survey-ingest-writer")
+        self._writer_task = None
+
+    @property
+    def queued(self):
+        return self._queue.qsize()
+
+    async def start(self):
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer())
+
+    async def stop(self):
+        """Flush everything queued, then stop the writer"""
+        if self._writer_task is not None:
+            await self._queue.put(None)
+            await self._writer_task
+            self._writer_task = None
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def prepare(self, payload):
+        """Validate a payload against the schema and the stored submission it continues"""
+        record = validate_payload(payload)
+        check_submission(self.store, record)
+        return record
+
+    async def submit(self, payload):
+        """Validate and enqueue one payload; resolves to its submission id once committed"""
+        submission_id, = await self._enqueue([self.prepare(payload)])
+        return submission_id
+
+    async def submit_many(self, payloads):
+        """Validate every payload, then enqueue them together; they commit in the same transaction or not at all"""
+        records = [self.prepare(payload) for payload in payloads]
+        return await self._enqueue(records) if records else []
+
+    async def _enqueue(self, records):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self._queue.put((records, future)), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            REGISTRY.increment("ingest_rejected_backpressure")
+            raise asyncio.QueueFull() from None
+        return await future
+
+    async def _writer(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            size = len(item[0])
+            deadline = loop.time() + self.max_delay
+            while size < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                size += len(item[0])
+            await self._commit(batch)
+
+    async def _commit(self, batch):
+        loop = asyncio.get_running_loop()
+        records = [record for group, _ in batch for record in group]
+        try:
+            with timer("ingest.commit"):
+                submission_ids = await loop.run_in_executor(self._executor, self.store.write_batch, records)
+        except Exception as exc:
+            if len(batch) == 1:
+                self._reject(batch[0][1], exc)
+                return
+            # Isolate the offending submissions: everything else still commits
+            REGISTRY.increment("ingest_batch_retries")
+            for item in batch:
+                await self._commit_one(item)
+            return
+        REGISTRY.increment("ingest_payloads", len(records))
+        start = 0
+        for group, future in batch:
+            if not future.done():
+                future.set_result(submission_ids[start:start + len(group)])
+            start += len(group)
+
+    @staticmethod
+    def _reject(future, exc):
+        if isinstance(exc, SubmissionClosedError):
+            exc = ValidationError("submission_closed", str(exc))
+        elif isinstance(exc, sqlite3.IntegrityError):
+            REGISTRY.increment("ingest_rejected_storage")
+            exc = ValidationError("rejected", f"Payload rejected by the store: {exc}")
+        if not future.done():
+            future.set_exception(exc)
+
+    async def _commit_one(self, item):
+        records, future = item
+        try:
+            submission_ids = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.store.write_batch, records
+            )
+        except Exception as exc:
+            self._reject(future, exc)
+        else:
+            REGISTRY.increment("ingest_payloads", len(records))
+            if not future.done():
+                future.set_result(submission_ids)
+
+
+class IngestionHTTPServer:
+    """Minimal HTTP/1.1 (keep-alive) front end: POST /submissions, GET /health"""
+
+    def __init__(self, service, host="0.0.0.0", port=8080):
+        self.service = service
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        return self._server
+
+    async def serve_forever(self):
+        server = self._server or await self.start()
+        async with server:
+            await server.serve_forever()
+
+    async def _route(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok", "queued": self.service.queued}
+        if method != "POST" or path != "/submissions":
+            return 404, {"error": "not_found"}
+        try:
+            payload = json.loads(body or b"null")
+            if isinstance(payload, list):
+                submission_ids = await self.service.submit_many(payload)
+            else:
+                submission_ids = [await self.service.submit(payload)]
+        except ValidationError as exc:
+            return (409 if exc.code == "submission_closed" else 400), exc.to_dict()
+        except ValueError:
+            return 400, {"error": "invalid_json", "message": "Body must be JSON"}
+        except asyncio.QueueFull:
+            return 503, {"error": "overloaded", "message": "Ingestion queue is full, retry later"}
+        except sqlite3.OperationalError:
+            return 503, {"error": "storage_busy", "message": "Response store is unavailable, retry later"}
+        except sqlite3.Error:
+            return 500, {"error": "storage_error", "message": "Response store error"}
+        return 202, {"submission_ids": submission_ids}
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                keep_alive = headers.get("connection", "").lower() != "close"
+                if length < 0:
+                    status, response, keep_alive = 400, {"error": "invalid_request", "message": "Bad Content-Length"}, False
+                elif length > MAX_BODY_BYTES:
+                    # The body is not read, so the connection cannot be reused
+                    status, response, keep_alive = 413, {
+                        "error": "too_large", "message": f"Bodies are limited to {MAX_BODY_BYTES} bytes"
+                    }, False
+                else:
+                    body = await reader.readexactly(length)
+                    status, response = await self._route(method, path, body)
+                data = json.dumps(response).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(db_path=DEFAULT_DB_PATH, host="0.0.0.0", port=8080):
+    async with IngestionService(ResponseStore(db_path)) as service:
+        await IngestionHTTPServer(service, host, port).serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the asynchronous survey response ingestion service.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite response store path")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.db, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,248 @@
+"""Near-duplicate and fabricated-response detection across submissions
+
+Free-text answers are tokenised like the keyword matcher of the survey's
+language, shingled into word 3-grams and summarised by MinHash signatures;
+rating/choice answers form an answer-pattern vector. Both are indexed with
+banded LSH, so checking a new submission only compares it with
+the submissions sharing a band bucket instead of every earlier one.
+
+Flag codes:
+
+* ``duplicate_text``: a text answer is a near copy (estimated Jaccard
+  similarity of its shingles >= ``text_threshold``) of an earlier submission's
+  answer to the same question.
+* ``duplicate_pattern``: the rating/choice answers match an earlier
+  submission's on at least ``pattern_threshold`` of the questions.
+* ``straight_lining``: every rating question got the same answer.
+
+Structured-pattern checks need enough answer combinations to tell copying
+from coincidence, so by default they only run when a respondent answering at
+random would match a given pattern with probability at most
+``MAX_PATTERN_CHANCE`` (straight-lining: would give every rating question the
+same answer with probability at most ``MAX_STRAIGHT_LINE_CHANCE``). Either
+check can be switched on or off per survey instead.
+
+Only the ``max_indexed`` most recently indexed submissions are kept; older
+ones are evicted from the signature tables and the LSH buckets together.
+"""
+import zlib
+from collections import deque
+from math import prod
+
+from language_packs import tokenize
+from survey_analysis import AIAnalyzer
+
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+SHINGLE_SIZE = 3
+MIN_TEXT_TOKENS = 8
+MAX_PATTERN_CHANCE = 0.01
+MAX_STRAIGHT_LINE_CHANCE = 0.2
+
+
+def shingles(tokens, size=SHINGLE_SIZE):
+    """CRC32 hashes of the distinct word ``size``-grams of a token list"""
+    return {
+        zlib.crc32(" ".join(tokens[i:i + size]).encode("utf-8"))
+        for i in range(len(tokens) - size + 1)
+    }
+
+
+class MinHasher:
+    """``num_perm`` universal hash permutations applied to a set of shingle hashes"""
+
+    def __init__(self, num_perm=64, seed=1):
+        import numpy as np
+
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_hashes):
+        """MinHash signature (uint32 array); equal positions estimate Jaccard similarity"""
+        import numpy as np
+
+        hashes = np.fromiter(shingle_hashes, dtype=np.uint64, count=len(shingle_hashes))
+        # uint64 wrap-around is part of the hash family, as in the usual MinHash implementations
+        values = (np.outer(hashes, self.a) + self.b) % np.uint64(MERSENNE_PRIME)
+        return (values.min(axis=0) & np.uint64(MAX_HASH)).astype(np.uint32)
+
+    @staticmethod
+    def similarity(signature, other):
+        import numpy as np
+
+        return float(np.count_nonzero(signature == other)) / len(signature)
+
+
+class LSHIndex:
+    """Banded locality-sensitive hash buckets over fixed-length signatures.
+
+    Keys whose signatures agree on every row of at least one band become
+    candidates. Buckets keep the ``max_bucket`` most recent keys, which bounds
+    the cost of a query however common a band value is.
+    """
+
+    def __init__(self, bands, rows, max_bucket=1000):
+        self.bands = bands
+        self.rows = rows
+        self.max_bucket = max_bucket
+        self.buckets = [{} for _ in range(bands)]
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            yield band, chunk.tobytes() if hasattr(chunk, "tobytes") else tuple(chunk)
+
+    def query(self, signature):
+        candidates = set()
+        for band, key in self._band_keys(signature):
+            candidates.update(self.buckets[band].get(key, ()))
+        return candidates
+
+    def add(self, key, signature):
+        for band, band_key in self._band_keys(signature):
+            bucket = self.buckets[band].setdefault(band_key, [])
+            bucket.append(key)
+            if len(bucket) > self.max_bucket:
+                del bucket[0]
+
+    def remove(self, key, signature):
+        """Drop a key from the buckets it was added to, and any bucket left empty"""
+        for band, band_key in self._band_keys(signature):
+            bucket = self.buckets[band].get(band_key)
+            if bucket is None:
+                continue
+            if key in bucket:
+                bucket.remove(key)
+            if not bucket:
+                del self.buckets[band][band_key]
+
+
+def pattern_chance(questions):
+    """Probability that a uniformly random respondent gives one particular rating/choice pattern"""
+    return 1 / prod(q.scale if q.type == "rating" else len(q.options) for q in questions)
+
+
+def straight_line_chance(questions):
+    """Probability that a uniformly random respondent gives every rating question the same value"""
+    if len(questions) < 2:
+        return 1.0
+    return min(q.scale for q in questions) / prod(q.scale for q in questions)
+
+
+class DuplicateDetector:
+    """Checks each incoming submission of one survey against everything indexed so far"""
+
+    def __init__(self, schema, num_perm=64, bands=16, text_threshold=0.8, pattern_rows=4,
+                 pattern_threshold=0.9, max_bucket=1000, max_indexed=100000,
+                 check_patterns=None, check_straight_lining=None):
+        self.schema = schema
+        self.text_threshold = text_threshold
+        self.pattern_threshold = pattern_threshold
+        self.minhasher = MinHasher(num_perm)
+        self.script = AIAnalyzer.matcher(schema.language).script
+        self.text_questions = tuple(q for q in schema.questions if q.type == "text")
+        self.text_indexes = {q.id: LSHIndex(bands, num_perm // bands, max_bucket) for q in self.text_questions}
+        self.text_signatures = {q.id: {} for q in self.text_questions}
+
+        self.pattern_questions = tuple(q for q in schema.questions if q.type in ("rating", "multiple_choice"))
+        if check_patterns is None:
+            check_patterns = bool(self.pattern_questions) and pattern_chance(self.pattern_questions) <= MAX_PATTERN_CHANCE
+        self.check_patterns = check_patterns
+        pattern_bands = -(-len(self.pattern_questions) // pattern_rows) if self.check_patterns else 0
+        self.pattern_index = LSHIndex(pattern_bands, pattern_rows, max_bucket)
+        self.patterns = {}
+        if check_straight_lining is None:
+            check_straight_lining = straight_line_chance(schema.rating_questions) <= MAX_STRAIGHT_LINE_CHANCE
+        self.check_straight_lining = check_straight_lining
+        self.max_indexed = max_indexed
+        self._indexed_order = deque()
+        self.indexed = 0
+
+    def pattern(self, answers):
+        """Answer-pattern vector: rating value or option number per question, 0 if unanswered"""
+        vector = []
+        for question in self.pattern_questions:
+            value = answers.get(question.id)
+            if question.type == "rating":
+                vector.append(value if isinstance(value, int) else 0)
+            else:
+                vector.append(question.option_index.get(value, -1) + 1)
+        # Pad to whole bands so the last band has the same width as the others
+        vector.extend([0] * (self.pattern_index.bands * self.pattern_index.rows - len(vector)))
+        return tuple(vector)
+
+    def check(self, submission_id, answers, add=True):
+        """Flags for one submission (see the module docstring for codes); indexes it unless ``add=False``"""
+        flags = []
+        for question in self.text_questions:
+            text = answers.get(question.id)
+            if not isinstance(text, str):
+                continue
+            tokens = tokenize(text, self.script)
+            if len(tokens) < MIN_TEXT_TOKENS:
+                continue
+            signature = self.minhasher.signature(shingles(tokens))
+            signatures = self.text_signatures[question.id]
+            best = None
+            for candidate in self.text_indexes[question.id].query(signature):
+                if candidate == submission_id:
+                    continue
+                similarity = MinHasher.similarity(signature, signatures[candidate])
+                if similarity >= self.text_threshold and (best is None or similarity > best[1]):
+                    best = (candidate, similarity)
+            if best is not None:
+                flags.append(self._flag(submission_id, "duplicate_text", question.id, *best))
+            if add:
+                signatures[submission_id] = signature
+                self.text_indexes[question.id].add(submission_id, signature)
+
+        if self.check_patterns:
+            vector = self.pattern(answers)
+            questions = len(self.pattern_questions)
+            best = None
+            for candidate in self.pattern_index.query(vector):
+                if candidate == submission_id:
+                    continue
+                other = self.patterns[candidate]
+                similarity = sum(a == b for a, b in zip(vector[:questions], other)) / questions
+                if similarity >= self.pattern_threshold and (best is None or similarity > best[1]):
+                    best = (candidate, similarity)
+            if best is not None:
+                flags.append(self._flag(submission_id, "duplicate_pattern", None, *best))
+            if add:
+                self.patterns[submission_id] = vector
+                self.pattern_index.add(submission_id, vector)
+
+        if self.check_straight_lining:
+            ratings = [answers.get(q.id) for q in self.schema.rating_questions]
+            if None not in ratings and len(set(ratings)) == 1:
+                flags.append(self._flag(submission_id, "straight_lining", None, None, 1.0))
+
+        if add:
+            self.indexed += 1
+            self._indexed_order.append(submission_id)
+            while len(self._indexed_order) > self.max_indexed:
+                self._evict(self._indexed_order.popleft())
+        return flags
+
+    def _evict(self, submission_id):
+        for question_id, signatures in self.text_signatures.items():
+            signature = signatures.pop(submission_id, None)
+            if signature is not None:
+                self.text_indexes[question_id].remove(submission_id, signature)
+        vector = self.patterns.pop(submission_id, None)
+        if vector is not None:
+            self.pattern_index.remove(submission_id, vector)
+
+    @staticmethod
+    def _flag(submission_id, code, question_id, match, similarity):
+        return {
+            "submission_id": submission_id,
+            "code": code,
+            "question_id": question_id,
+            "matches_submission": match,
+            "similarity": similarity,
+        }
@@ -0,0 +1,590 @@
+"""Persistent SQLite response store for the AI-Powered Smart Survey Tool"""
+import os
+import queue
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from survey_metrics import REGISTRY, timed
+
+
+DEFAULT_DB_PATH = os.environ.get("SURVEY_DB_PATH", "survey_responses.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS respondents (
+    respondent_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS submissions (
+    submission_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    respondent_id TEXT NOT NULL REFERENCES respondents(respondent_id),
+    survey TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    completed_at TEXT,
+    enumerator TEXT NOT NULL DEFAULT '',
+    district TEXT NOT NULL DEFAULT '',
+    flagged INTEGER NOT NULL DEFAULT 0,
+    -- Per-survey completion counter, assigned inside the completing transaction:
+    -- unlike completed_at (taken before the write lock) it follows commit order
+    completion_seq INTEGER
+);
+
+-- answer_seq only ever grows (AUTOINCREMENT), so an edited answer is re-inserted
+-- with a new sequence number and readers can follow changes with a high-water mark.
+-- value has no declared type so ratings stay integers and text stays text.
+CREATE TABLE IF NOT EXISTS answers (
+    answer_seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    submission_id INTEGER NOT NULL REFERENCES submissions(submission_id),
+    survey TEXT NOT NULL,
+    question_id INTEGER NOT NULL,
+    value,
+    answered_at TEXT NOT NULL,
+    UNIQUE (submission_id, question_id)
+);
+
+-- Hourly rollups per survey, enumerator and district, maintained in the same
+-- transactions that start, complete and flag submissions. Starts are bucketed by
+-- start hour; completions, answering time and quality flags by completion hour.
+CREATE TABLE IF NOT EXISTS submission_rollups (
+    survey TEXT NOT NULL,
+    enumerator TEXT NOT NULL,
+    district TEXT NOT NULL,
+    hour TEXT NOT NULL,
+    started INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    answer_seconds REAL NOT NULL DEFAULT 0,
+    flagged INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (survey, enumerator, district, hour)
+);
+
+-- Per-question paradata events (see survey_paradata for the event codes)
+CREATE TABLE IF NOT EXISTS paradata (
+    submission_id INTEGER NOT NULL REFERENCES submissions(submission_id),
+    recorded_at REAL NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    question_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    event INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS devices (
+    submission_id INTEGER PRIMARY KEY REFERENCES submissions(submission_id),
+    device_type TEXT NOT NULL,
+    user_agent TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_submissions_survey ON submissions(survey, completed_at);
+CREATE INDEX IF NOT EXISTS idx_submissions_completion ON submissions(survey, completion_seq);
+CREATE INDEX IF NOT EXISTS idx_paradata_submission ON paradata(submission_id, question_id);
+CREATE INDEX IF NOT EXISTS idx_rollups_hour ON submission_rollups(hour);
+CREATE INDEX IF NOT EXISTS idx_answers_survey_question ON answers(survey, question_id, value);
+CREATE INDEX IF NOT EXISTS idx_answers_survey_seq ON answers(survey, answer_seq);
+CREATE INDEX IF NOT EXISTS idx_answers_survey_question_seq ON answers(survey, question_id, answer_seq);
+"""
+
+# Statements are kept as constants so sqlite3's per-connection statement cache
+# reuses the compiled (prepared) form on every call.
+INSERT_RESPONDENT = "INSERT OR IGNORE INTO respondents (respondent_id, created_at) VALUES (?, ?)"
+INSERT_SUBMISSION = (
+    "INSERT INTO submissions (respondent_id, survey, started_at, enumerator, district) VALUES (?, ?, ?, ?, ?)"
+)
+COMPLETE_SUBMISSION = (
+    "UPDATE submissions SET completed_at = ?1, completion_seq = ("
+    "SELECT COALESCE(MAX(s.completion_seq), 0) + 1 FROM submissions s WHERE s.survey = submissions.survey"
+    ") WHERE submission_id = ?2 AND completed_at IS NULL"
+)
+FLAG_SUBMISSION = "UPDATE submissions SET flagged = 1 WHERE submission_id = ? AND flagged = 0"
+UPSERT_ANSWER = (
+    "INSERT OR REPLACE INTO answers (submission_id, survey, question_id, value, answered_at) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+DELETE_ANSWER = "DELETE FROM answers WHERE submission_id = ? AND question_id = ?"
+SELECT_SUBMISSION_ANSWERS = "SELECT question_id, value FROM answers WHERE submission_id = ? ORDER BY question_id"
+SELECT_ANSWERS_SINCE = (
+    "SELECT answer_seq, submission_id, question_id, value FROM answers "
+    "WHERE survey = ? AND answer_seq > ? ORDER BY answer_seq"
+)
+SELECT_QUESTION_SUMMARY = (
+    "SELECT question_id, COUNT(*), AVG(CASE WHEN typeof(value) IN ('integer', 'real') THEN value END) "
+    "FROM answers WHERE survey = ? GROUP BY question_id ORDER BY question_id"
+)
+# Ordered along idx_submissions_survey so rows stream without a sort and each
+# submission's answers arrive contiguously
+SELECT_COMPLETED_ANSWERS = (
+    "SELECT s.submission_id, s.respondent_id, s.completed_at, a.question_id, a.value "
+    "FROM submissions s JOIN answers a ON a.submission_id = s.submission_id "
+    "WHERE s.survey = ? AND s.completed_at >= ? AND s.completed_at < ? "
+    "ORDER BY s.completed_at, s.submission_id"
+)
+# Same along idx_submissions_completion, for readers following completions in commit order
+SELECT_COMPLETED_SINCE = (
+    "SELECT s.completion_seq, s.submission_id, s.respondent_id, s.completed_at, a.question_id, a.value "
+    "FROM submissions s JOIN answers a ON a.submission_id = s.submission_id "
+    "WHERE s.survey = ? AND s.completion_seq > ? "
+    "ORDER BY s.completion_seq"
+)
+SELECT_UNSEQUENCED = (
+    "SELECT survey, submission_id FROM submissions WHERE completed_at IS NOT NULL "
+    "ORDER BY survey, completed_at, submission_id"
+)
+SET_COMPLETION_SEQ = "UPDATE submissions SET completion_seq = ? WHERE submission_id = ?"
+# Raw-answer explorer: every filter and sort maps onto one of the answers indexes,
+# and pages continue from the previous page's last key instead of an OFFSET
+SELECT_ANSWER_PAGE = (
+    "SELECT a.answer_seq, a.submission_id, a.question_id, a.value, a.answered_at, s.completed_at "
+    "FROM answers a JOIN submissions s ON s.submission_id = a.submission_id "
+    "WHERE a.survey = ?{filters} ORDER BY {order} LIMIT ?"
+)
+# name -> (ORDER BY, cursor columns, keyset steps). Each step is a condition on the
+# cursor values (by position) that one index range seek can serve; a page is filled
+# from the steps in turn. SQLite cannot seek on the (value, answer_seq) row value
+# directly, so value orders first finish the cursor's value, then move past it.
+BROWSE_ORDERS = {
+    "newest": ("a.answer_seq DESC", ("answer_seq",), (("a.answer_seq < ?", (0,)),)),
+    "oldest": ("a.answer_seq", ("answer_seq",), (("a.answer_seq > ?", (0,)),)),
+    "value_asc": ("a.value, a.answer_seq", ("value", "answer_seq"), (
+        ("a.value = ? AND a.answer_seq > ?", (0, 1)),
+        ("a.value > ?", (0,)),
+    )),
+    "value_desc": ("a.value DESC, a.answer_seq DESC", ("value", "answer_seq"), (
+        ("a.value = ? AND a.answer_seq < ?", (0, 1)),
+        ("a.value < ?", (0,)),
+    )),
+}
+ANSWER_PAGE_COLUMNS = ("answer_seq", "submission_id", "question_id", "value", "answered_at", "completed_at")
+MIN_TIMESTAMP = ""
+MAX_TIMESTAMP = "9999-12-31T23:59:59"
+SELECT_SUBMISSION = "SELECT survey, respondent_id, completed_at FROM submissions WHERE submission_id = ?"
+SELECT_SUBMISSION_COUNTS = (
+    "SELECT COUNT(*), COUNT(completed_at) FROM submissions WHERE survey = ?"
+)
+INSERT_PARADATA = (
+    "INSERT INTO paradata (submission_id, recorded_at, duration_ms, question_id, position, event) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+UPSERT_DEVICE = "INSERT OR REPLACE INTO devices (submission_id, device_type, user_agent) VALUES (?, ?, ?)"
+# Time per question is summed over a respondent's visits before averaging across respondents
+SELECT_PARADATA_SUMMARY = (
+    "SELECT question_id, COUNT(*), AVG(total_ms), SUM(revisits), SUM(edits) FROM ("
+    "SELECT p.submission_id, p.question_id, SUM(CASE WHEN p.event = 3 THEN p.duration_ms ELSE 0 END) AS total_ms, "
+    "SUM(p.event = 2) AS revisits, SUM(p.event = 5) AS edits "
+    "FROM paradata p JOIN submissions s ON s.submission_id = p.submission_id "
+    "WHERE s.survey = ? GROUP BY p.submission_id, p.question_id"
+    ") GROUP BY question_id ORDER BY question_id"
+)
+SELECT_DEVICE_COUNTS = (
+    "SELECT d.device_type, COUNT(*) FROM devices d JOIN submissions s ON s.submission_id = d.submission_id "
+    "WHERE s.survey = ? GROUP BY d.device_type ORDER BY COUNT(*) DESC"
+)
+# Rollup statements run before the submission row changes, so each submission
+# is counted once however often it is re-completed or re-flagged
+ROLLUP_STARTED = (
+    "INSERT INTO submission_rollups (survey, enumerator, district, hour, started) VALUES (?, ?, ?, substr(?, 1, 13), 1) "
+    "ON CONFLICT (survey, enumerator, district, hour) DO UPDATE SET started = started + 1"
+)
+ROLLUP_COMPLETED = (
+    "INSERT INTO submission_rollups (survey, enumerator, district, hour, completed, answer_seconds) "
+    "SELECT survey, enumerator, district, substr(?1, 1, 13), 1, (julianday(?1) - julianday(started_at)) * 86400 "
+    "FROM submissions WHERE submission_id = ?2 AND completed_at IS NULL "
+    "ON CONFLICT (survey, enumerator, district, hour) DO UPDATE SET "
+    "completed = completed + 1, answer_seconds = answer_seconds + excluded.answer_seconds"
+)
+ROLLUP_FLAGGED = (
+    "INSERT INTO submission_rollups (survey, enumerator, district, hour, flagged) "
+    "SELECT survey, enumerator, district, substr(completed_at, 1, 13), 1 "
+    "FROM submissions WHERE submission_id = ? AND flagged = 0 AND completed_at IS NOT NULL "
+    "ON CONFLICT (survey, enumerator, district, hour) DO UPDATE SET flagged = flagged + 1"
+)
+REBUILD_ROLLUPS = (
+    "DELETE FROM submission_rollups",
+    "INSERT INTO submission_rollups (survey, enumerator, district, hour, started) "
+    "SELECT survey, enumerator, district, substr(started_at, 1, 13), COUNT(*) FROM submissions "
+    "GROUP BY 1, 2, 3, 4",
+    "INSERT INTO submission_rollups (survey, enumerator, district, hour, completed, answer_seconds, flagged) "
+    "SELECT survey, enumerator, district, substr(completed_at, 1, 13), COUNT(*), "
+    "SUM((julianday(completed_at) - julianday(started_at)) * 86400), SUM(flagged) "
+    "FROM submissions WHERE completed_at IS NOT NULL GROUP BY 1, 2, 3, 4 "
+    "ON CONFLICT (survey, enumerator, district, hour) DO UPDATE SET "
+    "completed = excluded.completed, answer_seconds = excluded.answer_seconds, flagged = excluded.flagged",
+)
+SELECT_ROLLUPS = (
+    "SELECT survey, enumerator, district, hour, started, completed, answer_seconds, flagged "
+    "FROM submission_rollups WHERE hour >= ? ORDER BY hour"
+)
+# Columns added after the first release, with the DDL that adds them to older databases
+MIGRATIONS = (
+    ("submissions", "enumerator", "ALTER TABLE submissions ADD COLUMN enumerator TEXT NOT NULL DEFAULT ''"),
+    ("submissions", "district", "ALTER TABLE submissions ADD COLUMN district TEXT NOT NULL DEFAULT ''"),
+    ("submissions", "flagged", "ALTER TABLE submissions ADD COLUMN flagged INTEGER NOT NULL DEFAULT 0"),
+    ("submissions", "completion_seq", "ALTER TABLE submissions ADD COLUMN completion_seq INTEGER"),
+)
+
+
+class SubmissionClosedError(ValueError):
+    """Answers or a completion arrived for a submission that is already completed"""
+
+    def __init__(self, submission_id):
+        super().__init__(f"Submission {submission_id} is already completed")
+        self.submission_id = submission_id
+
+
+class ResponseStore:
+    """Respondents, submissions and answers in an embedded SQLite database (WAL mode).
+
+    Every call borrows a connection from a small pool and returns it when
+    done, so short-lived threads (Streamlit runs each rerun on a new one) do
+    not leave connections behind: at most ``pool_size`` idle connections are
+    kept, and ``close`` closes them. WAL lets any number of readers run
+    alongside the single writer, and writes are short ``BEGIN IMMEDIATE``
+    transactions so concurrent enumerators queue on the busy timeout instead of
+    failing.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, busy_timeout_ms=5000, pool_size=8):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._migrate()
+
+    def _migrate(self):
+        """Create missing tables and columns; backfill the rollups and completion sequence when new"""
+        with self._connection() as conn:
+            had_rollups = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'submission_rollups'"
+            ).fetchone()
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(submissions)")}
+            if existing:
+                for table, column, ddl in MIGRATIONS:
+                    if column not in existing:
+                        conn.execute(ddl)
+            conn.executescript(SCHEMA)
+        if not had_rollups:
+            self.rebuild_rollups()
+        if existing and "completion_seq" not in existing:
+            self._backfill_completion_seq()
+
+    def _backfill_completion_seq(self):
+        """Number the submissions completed before the column existed, in completion order"""
+        with self._transaction() as conn:
+            rows, survey, seq = [], None, 0
+            for row_survey, submission_id in conn.execute(SELECT_UNSEQUENCED).fetchall():
+                seq = seq + 1 if row_survey == survey else 1
+                survey = row_survey
+                rows.append((seq, submission_id))
+            conn.executemany(SET_COMPLETION_SEQ, rows)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, cached_statements=256, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Borrow an idle connection (or open one); it goes back to the pool, or is closed if the pool is full"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _query(self, sql, params=()):
+        """All rows of a read, on a borrowed connection"""
+        with self._connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _stream(self, sql, params=()):
+        """Stream the rows of a read; the connection is held until the rows are exhausted or the generator closed"""
+        with self._connection() as conn:
+            cursor = conn.execute(sql, params)
+            try:
+                yield from cursor
+            finally:
+                # Ends the read transaction before the connection is reused
+                cursor.close()
+
+    def close(self):
+        """Close the idle connections; connections still borrowed are closed when returned to a full pool"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    @timed("store.start_submission")
+    def start_submission(self, survey, respondent_id=None, enumerator="", district=""):
+        """Register a respondent (a new one by default) and open a submission for them
+
+        ``enumerator`` and ``district`` tag the submission for the monitoring rollups.
+        """
+        respondent_id = respondent_id or uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.execute(INSERT_RESPONDENT, (respondent_id, now))
+            cursor = conn.execute(INSERT_SUBMISSION, (respondent_id, survey, now, enumerator, district))
+            conn.execute(ROLLUP_STARTED, (survey, enumerator, district, now))
+        return cursor.lastrowid
+
+    @timed("store.save_answers")
+    def save_answers(self, submission_id, survey, answers):
+        """Insert or replace a batch of ``{question_id: value}`` answers in one transaction"""
+        if not answers:
+            return
+        now = datetime.now().isoformat()
+        rows = [(submission_id, survey, question_id, value, now) for question_id, value in answers.items()]
+        with self._transaction() as conn:
+            conn.executemany(UPSERT_ANSWER, rows)
+        REGISTRY.increment("answers_saved", len(rows))
+
+    @timed("store.delete_answers")
+    def delete_answers(self, submission_id, question_ids):
+        """Remove answers of a submission, e.g. to questions its branching no longer reaches"""
+        rows = [(submission_id, question_id) for question_id in question_ids]
+        if not rows:
+            return
+        with self._transaction() as conn:
+            conn.executemany(DELETE_ANSWER, rows)
+        REGISTRY.increment("answers_deleted", len(rows))
+
+    @timed("store.write_batch")
+    def write_batch(self, submissions):
+        """Group-commit many submissions in a single transaction
+
+        ``submissions`` yields ``(survey, respondent_id, submission_id, answers, complete,
+        enumerator, district)``; a ``submission_id`` of None opens a new submission
+        (and respondent) tagged with ``enumerator`` and ``district``.
+        Returns the submission id of every item, in order.
+
+        Whether a continued submission is still open is checked inside the
+        write transaction, so of two payloads racing to add to or complete the
+        same submission only the first commits; the batch then raises
+        ``SubmissionClosedError`` and rolls back.
+        """
+        now = datetime.now().isoformat()
+        submission_ids = []
+        answer_rows = []
+        completed = {}
+        with self._transaction() as conn:
+            for survey, respondent_id, submission_id, answers, complete, enumerator, district in submissions:
+                if submission_id is None:
+                    respondent_id = respondent_id or uuid.uuid4().hex
+                    conn.execute(INSERT_RESPONDENT, (respondent_id, now))
+                    submission_id = conn.execute(
+                        INSERT_SUBMISSION, (respondent_id, survey, now, enumerator, district)
+                    ).lastrowid
+                    conn.execute(ROLLUP_STARTED, (survey, enumerator, district, now))
+                elif submission_id in completed or _completed_at(conn, submission_id) is not None:
+                    raise SubmissionClosedError(submission_id)
+                submission_ids.append(submission_id)
+                answer_rows.extend((submission_id, survey, question_id, value, now) for question_id, value in answers.items())
+                if complete:
+                    completed[submission_id] = (now, submission_id)
+            conn.executemany(UPSERT_ANSWER, answer_rows)
+            for row in completed.values():
+                _complete(conn, row)
+        REGISTRY.increment("answers_saved", len(answer_rows))
+        return submission_ids
+
+    @timed("store.complete_submission")
+    def complete_submission(self, submission_id):
+        """Mark a submission as completed; raises ``SubmissionClosedError`` if it already is"""
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            _complete(conn, (now, submission_id))
+
+    @timed("store.flag_submissions")
+    def flag_submissions(self, submission_ids):
+        """Mark completed submissions as quality-flagged; each counts once in the rollups"""
+        rows = [(submission_id,) for submission_id in dict.fromkeys(submission_ids)]
+        if not rows:
+            return
+        with self._transaction() as conn:
+            conn.executemany(ROLLUP_FLAGGED, rows)
+            conn.executemany(FLAG_SUBMISSION, rows)
+
+    @timed("store.save_paradata")
+    def save_paradata(self, rows):
+        """Append a batch of ``survey_paradata.RECORD`` tuples in one transaction"""
+        with self._transaction() as conn:
+            conn.executemany(INSERT_PARADATA, rows)
+
+    def save_device(self, submission_id, device_type, user_agent):
+        """Record the device a submission is answered on"""
+        with self._transaction() as conn:
+            conn.execute(UPSERT_DEVICE, (submission_id, device_type, user_agent))
+
+    def paradata_summary(self, survey):
+        """Per question: respondents with paradata, mean seconds spent per respondent, revisits and edits"""
+        return [
+            {
+                "question_id": question_id,
+                "respondents": respondents,
+                "mean_seconds": (mean_ms or 0) / 1000,
+                "revisits": revisits,
+                "edits": edits,
+            }
+            for question_id, respondents, mean_ms, revisits, edits in self._query(SELECT_PARADATA_SUMMARY, (survey,))
+        ]
+
+    def device_counts(self, survey):
+        """Number of submissions per device type"""
+        return dict(self._query(SELECT_DEVICE_COUNTS, (survey,)))
+
+    def rebuild_rollups(self):
+        """Recompute every rollup from the submissions table"""
+        with self._transaction() as conn:
+            for statement in REBUILD_ROLLUPS:
+                conn.execute(statement)
+
+    def rollups(self, since=None):
+        """Hourly rollup rows with ``hour`` (``YYYY-MM-DDTHH``) at or after the ISO timestamp ``since``"""
+        columns = ("survey", "enumerator", "district", "hour", "started", "completed", "answer_seconds", "flagged")
+        return [
+            dict(zip(columns, row))
+            for row in self._query(SELECT_ROLLUPS, ((since or MIN_TIMESTAMP)[:13],))
+        ]
+
+    def load_answers(self, submission_id):
+        """All answers of one submission as ``{question_id: value}``"""
+        return dict(self._query(SELECT_SUBMISSION_ANSWERS, (submission_id,)))
+
+    def answers_since(self, survey, after_seq=0):
+        """Yield ``(answer_seq, submission_id, question_id, value)`` for answers newer than ``after_seq``"""
+        yield from self._stream(SELECT_ANSWERS_SINCE, (survey, after_seq))
+
+    def iter_completed_submissions(self, survey, start=None, end=None):
+        """Yield ``(submission_id, respondent_id, completed_at, {question_id: value})`` per completed submission
+
+        ``start``/``end`` are optional ISO timestamps bounding ``completed_at``
+        (inclusive/exclusive). Rows are streamed from the cursor, one
+        submission at a time.
+        """
+        bounds = (survey, start or MIN_TIMESTAMP, end or MAX_TIMESTAMP)
+        yield from _group_answers(self._stream(SELECT_COMPLETED_ANSWERS, bounds))
+
+    def completed_since(self, survey, after_seq=0):
+        """Yield ``(completion_seq, submission_id, respondent_id, completed_at, {question_id: value})``
+
+        Covers the submissions completed after ``after_seq``, in commit order.
+        """
+        yield from _group_answers(self._stream(SELECT_COMPLETED_SINCE, (survey, after_seq)))
+
+    @timed("store.browse_answers")
+    def browse_answers(self, survey, question_id=None, value=None, submission_id=None, order="newest",
+                       after=None, limit=50):
+        """One page of raw answers and the cursor of the next page (None on the last page)
+
+        Filters are equality tests on indexed columns; ``value`` and the
+        ``value_*`` orders need a ``question_id``. ``after`` is the cursor
+        returned with the previous page, so every page costs ``limit`` rows
+        however deep into the survey it is.
+        """
+        order_by, cursor_columns, keyset_steps = BROWSE_ORDERS[order]
+        if question_id is None and (value is not None or order.startswith("value")):
+            raise ValueError("Filtering or sorting by value needs a question_id")
+        filters, params = [], [survey]
+        for column, wanted in (("a.question_id", question_id), ("a.value", value), ("a.submission_id", submission_id)):
+            if wanted is not None:
+                filters.append(f"{column} = ?")
+                params.append(wanted)
+        steps = [(None, ())] if after is None else keyset_steps
+        rows = []
+        for condition, cursor_positions in steps:
+            step_filters = filters if condition is None else [*filters, condition]
+            sql = SELECT_ANSWER_PAGE.format(filters="".join(f" AND {f}" for f in step_filters), order=order_by)
+            step_params = (*params, *(after[position] for position in cursor_positions), limit + 1 - len(rows))
+            rows.extend(dict(zip(ANSWER_PAGE_COLUMNS, row)) for row in self._query(sql, step_params))
+            if len(rows) > limit:
+                break
+        next_cursor = None
+        if len(rows) > limit:
+            del rows[limit:]
+            next_cursor = tuple(rows[-1][column] for column in cursor_columns)
+        return rows, next_cursor
+
+    def question_summary(self, survey):
+        """Per-question answer count and numeric mean, served from the (survey, question) index"""
+        return [
+            {"question_id": question_id, "answers": count, "mean": mean}
+            for question_id, count, mean in self._query(SELECT_QUESTION_SUMMARY, (survey,))
+        ]
+
+    def submission(self, submission_id):
+        """``{"survey", "respondent_id", "completed_at"}`` of one submission, or None if it does not exist"""
+        rows = self._query(SELECT_SUBMISSION, (submission_id,))
+        return dict(zip(("survey", "respondent_id", "completed_at"), rows[0])) if rows else None
+
+    def submission_counts(self, survey):
+        """Number of started and completed submissions for a survey"""
+        (started, completed), = self._query(SELECT_SUBMISSION_COUNTS, (survey,))
+        return {"started": started, "completed": completed}
+
+
+def _group_answers(rows):
+    """Fold ``(*submission columns, question_id, value)`` rows, contiguous per submission, into answer dicts"""
+    current, answers = None, {}
+    for *submission, question_id, value in rows:
+        if current is not None and current != submission:
+            yield (*current, answers)
+            answers = {}
+        current = submission
+        answers[question_id] = value
+    if current is not None:
+        yield (*current, answers)
+
+
+def _completed_at(conn, submission_id):
+    row = conn.execute(SELECT_SUBMISSION, (submission_id,)).fetchone()
+    return row[2] if row is not None else None
+
+
+def _complete(conn, row):
+    """Close one submission inside a write transaction; the rollup counts it only if this call closed it"""
+    conn.execute(ROLLUP_COMPLETED, row)
+    if conn.execute(COMPLETE_SUBMISSION, row).rowcount == 0:
+        raise SubmissionClosedError(row[1])
+
+
+class CompletionCursor:
+    """High-water mark over the completed submissions of one survey
+
+    ``new_submissions`` yields each completed submission exactly once, in
+    completion order, across calls. Completed submissions no longer change,
+    so consumers can fold them in without ever retracting anything. The mark
+    is the completion sequence, which follows commit order; ``completed_at``
+    does not, so a timestamp mark could skip a slower writer's completion.
+    """
+
+    def __init__(self, store, survey):
+        self.store = store
+        self.survey = survey
+        self.last_seq = 0
+
+    def new_submissions(self):
+        """Yield ``(submission_id, respondent_id, completed_at, answers)`` completed since the previous call"""
+        for seq, submission_id, respondent_id, completed_at, answers in self.store.completed_since(
+            self.survey, self.last_seq
+        ):
+            self.last_seq = seq
+            yield submission_id, respondent_id, completed_at, answers
@@ -0,0 +1,974 @@
+"""Streamlit-free survey templates and AI analysis core
+
+NumPy, pandas and multiprocessing are imported inside the functions that need
+them so headless workers and the CLI start quickly.
+"""
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from functools import reduce
+from types import MappingProxyType
+
+from survey_metrics import timed
+
+
+DEFAULT_WORKERS = int(os.environ.get("SURVEY_ANALYSIS_WORKERS", "0")) or os.cpu_count() or 1
+
+# Survey templates
+#
+# Questions run in template order unless they declare branching:
+#     "logic": [{"when": {"max": 2}, "goto": 5}, {"when": {"answered": False}, "goto": "end"}],
+#     "next": 7
+# The first rule whose condition matches the answer picks the next question
+# (a question id, or "end"); otherwise "next" does, else the following question.
+# A "goto" to an earlier question loops back as a plain revisit: each question
+# has one answer slot, so a later pass shows the current answer and a new answer
+# replaces it (loop iterations are not recorded separately). Answers to questions
+# the current answers no longer route through are dropped. Conditions are "equals", "in",
+# "min"/"max" (ratings) and "answered"; text questions can only branch on
+# "answered".
+#
+# A survey's "validation" list declares cross-question consistency rules
+# (see survey_validation): every condition in "when" must hold for the rule to fire.
+#
+# "language" (default "en") selects the sentiment/theme lexicons used for its
+# free-text answers: any other code loads lexicons/<language>.json as a
+# memory-mapped pack (see language_packs).
+SURVEY_TEMPLATES = {
+    "customer_satisfaction": {
+        "title": "Customer Experience Survey",
+        "description": "AI-enhanced survey to understand customer satisfaction patterns",
+        "questions": [
+            {
+                "id": 1,
+                "type": "rating",
+                "text": "How satisfied are you with our service overall?",
+                "scale": 5,
+                "ai_context": "Primary satisfaction metric",
+                "required": True
+            },
+            {
+                "id": 2,
+                "type": "multiple_choice",
+                "text": "What's the primary reason for your rating?",
+                "options": ["Product Quality", "Customer Service", "Pricing", "User Experience", "Other"],
+                "ai_context": "Follow-up based on rating",
+                "required": True
+            },
+            {
+                "id": 3,
+                "type": "text",
+                "text": "What specific improvements would you like to see?",
+                "ai_analysis": True,
+                "ai_context": "Sentiment and theme analysis",
+                "required": False
+            },
+            {
+                "id": 4,
+                "type": "rating",
+                "text": "How likely are you to recommend us to others? (1-10)",
+                "scale": 10,
+                "ai_context": "NPS calculation",
+                "required": True
+            }
+        ],
+        "validation": [
+            {
+                "code": "inconsistent_satisfaction_nps",
+                "severity": "warning",
+                "message": "Very low satisfaction but a 10/10 likelihood to recommend",
+                "when": [{"question": 1, "max": 2}, {"question": 4, "min": 10}]
+            }
+        ]
+    },
+    "employee_feedback": {
+        "title": "Employee Engagement Survey",
+        "description": "Smart survey with adaptive questioning based on responses",
+        "questions": [
+            {
+                "id": 1,
+                "type": "rating",
+                "text": "How engaged do you feel at work?",
+                "scale": 5,
+                "ai_context": "Core engagement metric",
+                "required": True
+            },
+            {
+                "id": 2,
+                "type": "multiple_choice",
+                "text": "What motivates you most at work?",
+                "options": ["Career Growth", "Recognition", "Work-Life Balance", "Compensation", "Team Collaboration"],
+                "ai_context": "Motivation analysis",
+                "required": True
+            },
+            {
+                "id": 3,
+                "type": "text",
+                "text": "What changes would improve your work experience?",
+                "ai_analysis": True,
+                "ai_context": "Theme extraction and categorization",
+                "required": False
+            },
+            {
+                "id": 4,
+                "type": "rating",
+                "text": "How would you rate your work-life balance?",
+                "scale": 5,
+                "ai_context": "Work-life balance assessment",
+                "required": True
+            }
+        ]
+    }
+}
+
+# Compiled survey schemas
+# Answer-domain placeholder for "some free text", which branching can only test for presence
+TEXT_ANSWERED = object()
+
+
+class Question:
+    """Compact, read-only question record compiled from a template question dict"""
+    __slots__ = (
+        "id", "position", "type", "text", "scale", "options", "option_index",
+        "ai_context", "ai_analysis", "required", "is_rating", "is_nps", "is_analysed_text"
+    )
+
+    def __init__(self, spec, position):
+        options = tuple(spec.get("options", ()))
+        values = {
+            "id": spec["id"],
+            "position": position,
+            "type": spec["type"],
+            "text": spec["text"],
+            "scale": spec.get("scale"),
+            "options": options,
+            "option_index": MappingProxyType({option: idx for idx, option in enumerate(options)}),
+            "ai_context": spec.get("ai_context"),
+            "ai_analysis": bool(spec.get("ai_analysis")),
+            "required": bool(spec.get("required")),
+            "is_rating": spec["type"] == "rating",
+            # NPS questions are the rating questions asking about recommending us
+            "is_nps": spec["type"] == "rating" and "recommend" in spec["text"].lower(),
+            "is_analysed_text": spec["type"] == "text" and bool(spec.get("ai_analysis")),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self):
+        return f"Question(id={self.id!r}, type={self.type!r})"
+
+    def answer_domain(self):
+        """Answer value of each transition-table slot; slot 0 is "unanswered"
+
+        Ratings have one slot per value and multiple choice one per option;
+        free text only distinguishes answered from unanswered.
+        """
+        if self.type == "rating":
+            return (None,) + tuple(range(1, self.scale + 1))
+        if self.type == "multiple_choice":
+            return (None,) + self.options
+        return (None, TEXT_ANSWERED)
+
+    def answer_slot(self, response):
+        """Transition-table slot of a response (0 when unanswered or invalid)"""
+        if response is None or response == "":
+            return 0
+        if self.type == "rating":
+            return response if 1 <= response <= self.scale else 0
+        if self.type == "multiple_choice":
+            return self.option_index.get(response, -1) + 1
+        return 1
+
+
+def _condition_matches(condition, question, value):
+    """Evaluate one declarative branching condition against one answer value"""
+    unknown = set(condition) - {"answered", "equals", "in", "min", "max"}
+    if unknown:
+        raise ValueError(f"Question {question.id}: unknown branching condition {sorted(unknown)}")
+    if question.type == "text" and set(condition) != {"answered"}:
+        raise ValueError(f"Question {question.id}: text questions can only branch on 'answered'")
+    if "answered" in condition and (value is not None) != condition["answered"]:
+        return False
+    if value is None:
+        return "answered" in condition
+    if "equals" in condition and value != condition["equals"]:
+        return False
+    if "in" in condition and value not in condition["in"]:
+        return False
+    if "min" in condition and value < condition["min"]:
+        return False
+    if "max" in condition and value > condition["max"]:
+        return False
+    return True
+
+
+def compile_transitions(questions, specs):
+    """Compile each question's branching rules into a row of next positions.
+
+    ``transitions[position][question.answer_slot(response)]`` is the position
+    of the next question, or ``len(questions)`` at the end of the survey, so
+    navigation is a table lookup whatever the number of rules or questions.
+    """
+    end = len(questions)
+    positions = {question.id: question.position for question in questions}
+
+    def target(question, goto):
+        if goto == "end":
+            return end
+        if goto not in positions:
+            raise ValueError(f"Question {question.id}: branch target {goto!r} does not exist")
+        return positions[goto]
+
+    transitions = []
+    for question, spec in zip(questions, specs):
+        default = target(question, spec["next"]) if "next" in spec else question.position + 1
+        rules = [(rule["when"], target(question, rule["goto"])) for rule in spec.get("logic", ())]
+        row = []
+        for value in question.answer_domain():
+            for condition, position in rules:
+                if _condition_matches(condition, question, value):
+                    row.append(position)
+                    break
+            else:
+                row.append(default)
+        transitions.append(tuple(row))
+    return tuple(transitions)
+
+
+class SurveySchema:
+    """Immutable, compiled form of a SURVEY_TEMPLATES entry.
+
+    Built once per template: questions are indexed by id and the rating, NPS
+    and AI-analysed text questions are precomputed so consumers never re-scan
+    the template. Branching rules are compiled into a transition table, and
+    ``template_hash`` fingerprints the template for cache keys.
+    """
+    __slots__ = (
+        "key", "title", "description", "survey_type", "questions", "by_id",
+        "rating_questions", "nps_questions", "analysed_text_questions", "transitions",
+        "consistency_rules", "language", "template_hash"
+    )
+
+    def __init__(self, key, template):
+        questions = tuple(Question(spec, position) for position, spec in enumerate(template["questions"]))
+        values = {
+            "key": key,
+            "title": template["title"],
+            "description": template["description"],
+            "survey_type": "customer_satisfaction" if "customer" in template["title"].lower() else "employee_feedback",
+            "questions": questions,
+            "by_id": MappingProxyType({q.id: q for q in questions}),
+            "rating_questions": tuple(q for q in questions if q.is_rating),
+            "nps_questions": tuple(q for q in questions if q.is_nps),
+            "analysed_text_questions": tuple(q for q in questions if q.is_analysed_text),
+            "transitions": compile_transitions(questions, template["questions"]),
+            "consistency_rules": tuple(MappingProxyType(dict(rule)) for rule in template.get("validation", ())),
+            "language": template.get("language", "en"),
+            "template_hash": hashlib.sha256(
+                json.dumps(template, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+            ).hexdigest()[:16],
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __len__(self):
+        return len(self.questions)
+
+    def question(self, question_id):
+        """Question record for an id, or None"""
+        return self.by_id.get(question_id)
+
+    @property
+    def end(self):
+        """Position past the last question, meaning the survey is finished"""
+        return len(self.questions)
+
+    def next_position(self, position, response):
+        """Position of the question to show after answering ``position`` with ``response``"""
+        return self.transitions[position][self.questions[position].answer_slot(response)]
+
+    def unreachable(self, answers):
+        """Ids of answered questions that ``answers`` no longer route through (branch changed)"""
+        reachable = {question.id for question in self.path(answers)}
+        return [question_id for question_id in answers if question_id not in reachable]
+
+    def path(self, answers):
+        """Questions a respondent with these answers is routed through, in order
+
+        Stops at the end of the survey or when a loop revisits a question,
+        since a static set of answers would repeat the loop forever.
+        Unanswered questions are routed as unanswered.
+        """
+        position = 0
+        seen = set()
+        while position < self.end and position not in seen:
+            seen.add(position)
+            question = self.questions[position]
+            yield question
+            position = self.next_position(position, answers.get(question.id))
+
+
+SURVEY_SCHEMAS = MappingProxyType({key: SurveySchema(key, template) for key, template in SURVEY_TEMPLATES.items()})
+
+# Token between the texts of a joined batch: a non-word character (the ASCII unit separator)
+# that NumPy does not strip from strings the way it strips NUL
+BATCH_SEPARATOR = "\x1f"
+BATCH_JOINER = f" {BATCH_SEPARATOR} "
+# Maps every ASCII non-word byte except the separator to a space, so bytes.split() yields the word tokens
+ASCII_TOKEN_TABLE = bytes(
+    byte if chr(byte) == BATCH_SEPARATOR or re.fullmatch(r"\w", chr(byte)) else ord(" ") for byte in range(256)
+)
+
+
+# AI Analysis Functions
+class KeywordMatcher:
+    """Compiled word-boundary matcher over a set of named keyword lexicons.
+
+    Every keyword gets one bit; a response's hit vector is an int bitmask of the
+    keywords it contains, found in a single pass over its tokens.
+    """
+    # Tokenizer for language_packs.tokenize, shared with the language packs' matchers
+    script = "latin"
+    TOKEN_PATTERN = re.compile(r"\w+")
+    BATCH_TOKEN_PATTERN = re.compile(r"\w+|" + re.escape(BATCH_SEPARATOR))
+
+    def __init__(self, lexicons):
+        self.keywords = []
+        self.lexicons = list(lexicons)
+        self.masks = {}
+        self._index = {}
+        self._keyword_ids = {}
+        self._keyword_lexicon_ids = []
+        for lexicon_idx, (name, words) in enumerate(lexicons.items()):
+            mask = 0
+            for word in words:
+                word = word.lower()
+                keyword_id = len(self.keywords)
+                bit = 1 << keyword_id
+                self.keywords.append(word)
+                self._keyword_lexicon_ids.append(lexicon_idx)
+                self._index[word] = self._index.get(word, 0) | bit
+                self._keyword_ids.setdefault(word, []).append(keyword_id)
+                mask |= bit
+            self.masks[name] = mask
+        self._keyword_lexicon_array = None
+
+    def hits(self, text):
+        """Return the hit vector (bitmask of matched keywords) for one text"""
+        if not text:
+            return 0
+        index = self._index
+        vector = 0
+        for token in self.TOKEN_PATTERN.findall(text.lower()):
+            vector |= index.get(token, 0)
+        return vector
+
+    def hit_vectors(self, texts):
+        """Return one hit vector per text"""
+        return [self.hits(text) for text in texts]
+
+    def count(self, vector, lexicon):
+        """Number of distinct keywords of a lexicon present in a hit vector"""
+        return (vector & self.masks[lexicon]).bit_count()
+
+    def matched(self, vector, lexicon):
+        """Keywords of a lexicon present in a hit vector"""
+        vector &= self.masks[lexicon]
+        return [word for bit, word in enumerate(self.keywords) if vector >> bit & 1]
+
+    @property
+    def _keyword_lexicon(self):
+        # Lexicon index of every keyword id, built on first batch use
+        if self._keyword_lexicon_array is None:
+            import numpy as np
+            self._keyword_lexicon_array = np.array(self._keyword_lexicon_ids, dtype=np.int64)
+        return self._keyword_lexicon_array
+
+    @staticmethod
+    def text_series(texts):
+        """Positional object Series of texts with non-string entries replaced by empty strings"""
+        import pandas as pd
+        
+        return pd.Series([value if isinstance(value, str) else "" for value in texts], dtype=object)
+
+    def batch_tokens(self, texts):
+        """Tokens of a list of strings, lowercased, with ``BATCH_SEPARATOR`` between texts
+
+        The batch is joined and lowercased as one string. ASCII batches are split
+        with a byte translation table instead of the token regex (bytes tokens);
+        either way the tokens of each text are exactly those of ``hits()``.
+        """
+        corpus = BATCH_JOINER.join(texts)
+        if corpus.count(BATCH_SEPARATOR) != len(texts) - 1:
+            # The separator is a non-word character, so dropping it from a text changes no tokens
+            corpus = BATCH_JOINER.join(text.replace(BATCH_SEPARATOR, " ") for text in texts)
+        corpus = corpus.lower()
+        if corpus.isascii():
+            return corpus.encode("ascii").translate(ASCII_TOKEN_TABLE).split(), BATCH_SEPARATOR.encode("ascii")
+        return self.BATCH_TOKEN_PATTERN.findall(corpus), BATCH_SEPARATOR
+
+    def hit_matrix(self, texts):
+        """Sparse hit matrix for a batch of texts as unique (row, keyword id) coordinate arrays
+
+        Rows follow the positional order of ``texts``; non-string entries have no hits.
+        Tokens are mapped to keyword ids once per distinct token, not once per occurrence.
+        """
+        import numpy as np
+        import pandas as pd
+        
+        texts = self.text_series(texts).tolist()
+        empty = np.empty(0, dtype=np.int64)
+        if not texts:
+            return empty, empty
+        tokens, separator = self.batch_tokens(texts)
+        codes, distinct = pd.factorize(np.array(tokens, dtype=object))
+        
+        # Keyword ids of every distinct token, as offsets into one flat id array
+        id_lists = []
+        separator_code = -1
+        for code, token in enumerate(distinct):
+            if token == separator:
+                separator_code = code
+            id_lists.append(self._keyword_ids.get(token.decode("ascii") if isinstance(token, bytes) else token, ()))
+        id_counts = np.fromiter(map(len, id_lists), dtype=np.int64, count=len(id_lists))
+        flat_ids = np.fromiter((keyword_id for ids in id_lists for keyword_id in ids), dtype=np.int64)
+        id_starts = np.cumsum(id_counts) - id_counts
+        
+        token_rows = np.cumsum(codes == separator_code)
+        matched = id_counts[codes] > 0
+        codes, token_rows = codes[matched], token_rows[matched]
+        if not len(codes):
+            return empty, empty
+        repeats = id_counts[codes]
+        within = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        keyword_ids = flat_ids[np.repeat(id_starts[codes], repeats) + within]
+        
+        # Keep each (row, keyword) pair once, matching the presence semantics of hits()
+        n_keywords = len(self.keywords)
+        keys = np.repeat(token_rows, repeats) * n_keywords + keyword_ids
+        keys.sort()
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        return keys // n_keywords, keys % n_keywords
+
+    def lexicon_counts(self, rows, cols, n_rows):
+        """Dense (n_rows x lexicons) matrix of distinct keyword counts from a sparse hit matrix"""
+        import numpy as np
+        
+        n_lexicons = len(self.lexicons)
+        flat = rows * n_lexicons + self._keyword_lexicon[cols]
+        return np.bincount(flat, minlength=n_rows * n_lexicons).reshape(n_rows, n_lexicons)
+
+    def lexicon_keywords(self, cols, lexicon):
+        """Distinct keyword ids from ``cols`` that belong to a lexicon"""
+        import numpy as np
+        
+        cols = np.unique(cols)
+        return cols[self._keyword_lexicon[cols] == self.lexicons.index(lexicon)]
+
+
+class AIAnalyzer:
+    POSITIVE_WORDS = ['good', 'great', 'excellent', 'amazing', 'fantastic', 'love', 'perfect', 'wonderful', 'outstanding', 'satisfied', 'happy', 'pleased']
+    NEGATIVE_WORDS = ['bad', 'terrible', 'awful', 'hate', 'horrible', 'disappointing', 'frustrated', 'angry', 'unsatisfied', 'poor', 'worst']
+
+    # Common themes and keywords
+    THEME_KEYWORDS = {
+        "Product Quality": ["quality", "product", "item", "goods", "material"],
+        "Customer Service": ["service", "support", "staff", "help", "representative", "agent"],
+        "Pricing": ["price", "cost", "expensive", "cheap", "value", "money", "fee"],
+        "User Experience": ["experience", "interface", "usability", "easy", "difficult", "navigation"],
+        "Delivery": ["delivery", "shipping", "fast", "slow", "package", "arrive"],
+        "Communication": ["communication", "contact", "response", "email", "phone", "chat"]
+    }
+
+    # Sentiment and theme lexicons compiled once into a single matcher
+    MATCHER = KeywordMatcher({
+        "positive": POSITIVE_WORDS,
+        "negative": NEGATIVE_WORDS,
+        **THEME_KEYWORDS
+    })
+
+    # Bump LOGIC_VERSION when the scoring rules change; VERSION also changes with the lexicons
+    LOGIC_VERSION = 1
+    VERSION = hashlib.sha256(
+        json.dumps([LOGIC_VERSION, POSITIVE_WORDS, NEGATIVE_WORDS, THEME_KEYWORDS], sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+
+    @staticmethod
+    def matcher(language=None):
+        """Matcher for a response language: the built-in English lexicons or a memory-mapped language pack"""
+        if language in (None, "en"):
+            return AIAnalyzer.MATCHER
+        from language_packs import load_pack
+        return load_pack(language)
+
+    @staticmethod
+    def version(language=None):
+        """Analyzer version for a response language: VERSION combined with the language pack's content hash"""
+        if language in (None, "en"):
+            return AIAnalyzer.VERSION
+        content_hash = AIAnalyzer.matcher(language).content_hash
+        return hashlib.sha256(f"{AIAnalyzer.VERSION}:{language}:{content_hash}".encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def sentiment_from_hits(hits, matcher=None):
+        """Sentiment label from a precomputed hit vector"""
+        matcher = matcher or AIAnalyzer.MATCHER
+        positive_count = matcher.count(hits, "positive")
+        negative_count = matcher.count(hits, "negative")
+        
+        if positive_count > negative_count:
+            return "positive"
+        elif negative_count > positive_count:
+            return "negative"
+        else:
+            return "neutral"
+
+    @staticmethod
+    def analyze_sentiment(text, hits=None, language=None):
+        """Simple sentiment analysis based on keywords"""
+        if not text or len(text.strip()) < 3:
+            return "neutral"
+        
+        matcher = AIAnalyzer.matcher(language)
+        if hits is None:
+            hits = matcher.hits(text)
+        return AIAnalyzer.sentiment_from_hits(hits, matcher)
+    
+    @staticmethod
+    @timed("analyzer.extract_themes")
+    def extract_themes(text_responses, hit_vectors=None, language=None):
+        """Extract common themes from text responses"""
+        if not text_responses:
+            return []
+        
+        matcher = AIAnalyzer.matcher(language)
+        if hit_vectors is None:
+            hit_vectors = matcher.hit_vectors(text_responses)
+        
+        all_hits = 0
+        theme_hits = dict.fromkeys(AIAnalyzer.THEME_KEYWORDS, 0)
+        for hits in hit_vectors:
+            all_hits |= hits
+            for theme in theme_hits:
+                if hits & matcher.masks[theme]:
+                    theme_hits[theme] |= hits
+        
+        return AIAnalyzer.themes_from_hits(all_hits, theme_hits, matcher)
+    
+    @staticmethod
+    def themes_from_hits(all_hits, theme_hits, matcher=None):
+        """Theme list from the union of all hit vectors and, per theme, of the responses mentioning it"""
+        matcher = matcher or AIAnalyzer.MATCHER
+        themes = []
+        for theme in AIAnalyzer.THEME_KEYWORDS:
+            mentions = matcher.count(all_hits, theme)
+            if mentions > 0:
+                # Analyze sentiment over the responses mentioning this theme
+                sentiment = AIAnalyzer.sentiment_from_hits(theme_hits[theme], matcher)
+                themes.append({
+                    "theme": theme,
+                    "mentions": mentions,
+                    "sentiment": sentiment
+                })
+        
+        return sorted(themes, key=lambda x: x["mentions"], reverse=True)[:6]
+    
+    @staticmethod
+    @timed("analyzer.analyze_parallel")
+    def analyze_parallel(text_responses, workers=None, chunk_size=20000, language=None):
+        """Score sentiment and themes in chunks across a process pool and merge the partial counts
+
+        Returns an AnalysisPartial; the result is identical to the serial path
+        for any worker count and chunk size.
+        """
+        text_responses = list(text_responses)
+        chunks = [text_responses[i:i + chunk_size] for i in range(0, len(text_responses), chunk_size)]
+        languages = [language] * len(chunks)
+        workers = workers or DEFAULT_WORKERS
+        if workers <= 1 or len(chunks) <= 1:
+            partials = map(_score_chunk, chunks, languages)
+            return reduce(AnalysisPartial.merge, partials, AnalysisPartial(language=language))
+        
+        from concurrent.futures import ProcessPoolExecutor
+        
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            partials = executor.map(_score_chunk, chunks, languages)
+            return reduce(AnalysisPartial.merge, partials, AnalysisPartial(language=language))
+    
+    @staticmethod
+    @timed("analyzer.extract_themes_parallel")
+    def extract_themes_parallel(text_responses, workers=None, chunk_size=20000, language=None):
+        """Parallel equivalent of extract_themes"""
+        return AIAnalyzer.analyze_parallel(text_responses, workers, chunk_size, language).extract_themes()
+    
+    @staticmethod
+    @timed("analyzer.keyword_counts_batch")
+    def keyword_counts_batch(texts, hit_matrix=None, language=None):
+        """Per-response distinct keyword counts for every lexicon as a DataFrame
+
+        Language packs have no sparse hit matrix, so other languages are
+        counted one text at a time with the pack.
+        """
+        import pandas as pd
+        
+        texts = pd.Series(texts, dtype=object)
+        matcher = AIAnalyzer.matcher(language)
+        if matcher is not AIAnalyzer.MATCHER:
+            vectors = [matcher.hits(text) if isinstance(text, str) else 0 for text in texts]
+            return pd.DataFrame(
+                [[matcher.count(hits, lexicon) for lexicon in matcher.lexicons] for hits in vectors],
+                index=texts.index, columns=matcher.lexicons, dtype="int64"
+            )
+        rows, cols = hit_matrix if hit_matrix is not None else matcher.hit_matrix(texts)
+        counts = matcher.lexicon_counts(rows, cols, len(texts))
+        return pd.DataFrame(counts, index=texts.index, columns=matcher.lexicons)
+    
+    @staticmethod
+    @timed("analyzer.analyze_sentiment_batch")
+    def analyze_sentiment_batch(texts, hit_matrix=None, language=None):
+        """Vectorized analyze_sentiment over a pandas Series or NumPy array of texts"""
+        import numpy as np
+        
+        texts = KeywordMatcher.text_series(texts)
+        counts = AIAnalyzer.keyword_counts_batch(texts, hit_matrix, language)
+        positive_count = counts["positive"].to_numpy()
+        negative_count = counts["negative"].to_numpy()
+        
+        labels = np.select(
+            [positive_count > negative_count, negative_count > positive_count],
+            ["positive", "negative"],
+            default="neutral"
+        ).astype(object)
+        
+        # Same short-text rule as analyze_sentiment
+        labels[(texts.str.strip().str.len() < 3).to_numpy()] = "neutral"
+        return labels
+    
+    @staticmethod
+    @timed("analyzer.extract_themes_batch")
+    def extract_themes_batch(texts, hit_matrix=None, language=None):
+        """Vectorized extract_themes over a pandas Series or NumPy array of texts"""
+        texts = KeywordMatcher.text_series(texts)
+        if texts.empty:
+            return []
+        
+        matcher = AIAnalyzer.matcher(language)
+        if matcher is not AIAnalyzer.MATCHER:
+            # Language packs score one text at a time
+            return AIAnalyzer.extract_themes(texts.tolist(), language=language)
+        rows, cols = hit_matrix if hit_matrix is not None else matcher.hit_matrix(texts)
+        counts = matcher.lexicon_counts(rows, cols, len(texts))
+        
+        themes = []
+        for theme in AIAnalyzer.THEME_KEYWORDS:
+            mentions = len(matcher.lexicon_keywords(cols, theme))
+            if mentions > 0:
+                # Keywords found in any response that mentions this theme
+                theme_rows = counts[:, matcher.lexicons.index(theme)] > 0
+                theme_cols = cols[theme_rows[rows]]
+                positive_count = len(matcher.lexicon_keywords(theme_cols, "positive"))
+                negative_count = len(matcher.lexicon_keywords(theme_cols, "negative"))
+                if positive_count > negative_count:
+                    sentiment = "positive"
+                elif negative_count > positive_count:
+                    sentiment = "negative"
+                else:
+                    sentiment = "neutral"
+                themes.append({
+                    "theme": theme,
+                    "mentions": mentions,
+                    "sentiment": sentiment
+                })
+        
+        return sorted(themes, key=lambda x: x["mentions"], reverse=True)[:6]
+    
+    @staticmethod
+    @timed("analyzer.generate_recommendations")
+    def generate_recommendations(responses, schema):
+        """Generate AI-powered recommendations based on one respondent's answers to a compiled survey"""
+        import numpy as np
+        
+        # Analyze ratings
+        ratings = [v for v in responses.values() if isinstance(v, (int, float))]
+        avg_rating = np.mean(ratings) if ratings else 0
+        
+        # Analyze text responses
+        text_responses = [v for v in responses.values() if isinstance(v, str) and len(v.strip()) > 10]
+        themes = AIAnalyzer.extract_themes(text_responses, language=schema.language)
+        
+        # NPS responses
+        nps_responses = [
+            responses[q.id] for q in schema.nps_questions if isinstance(responses.get(q.id), (int, float))
+        ]
+        nps_mean = np.mean(nps_responses) if nps_responses else None
+        
+        return AIAnalyzer.recommendations_from_metrics(avg_rating, themes, nps_mean, schema.survey_type)
+    
+    @staticmethod
+    @timed("analyzer.recommendations_from_metrics")
+    def recommendations_from_metrics(avg_rating, themes, nps_mean=None, survey_type="customer_satisfaction"):
+        """Generate recommendations from already aggregated metrics"""
+        recommendations = []
+        
+        # Generate recommendations based on analysis
+        if avg_rating < 3:
+            recommendations.append("⚠️ Low satisfaction scores detected. Immediate attention required to address customer concerns.")
+        
+        if themes:
+            negative_themes = [t for t in themes if t["sentiment"] == "negative"]
+            if negative_themes:
+                top_issue = negative_themes[0]["theme"]
+                recommendations.append(f"🔍 Focus on improving {top_issue} - identified as the primary concern area.")
+            
+            positive_themes = [t for t in themes if t["sentiment"] == "positive"]
+            if positive_themes:
+                strength = positive_themes[0]["theme"]
+                recommendations.append(f"✅ Leverage your strength in {strength} for marketing and competitive advantage.")
+        
+        # NPS-specific recommendations
+        if survey_type == "customer_satisfaction" and nps_mean is not None:
+            if nps_mean >= 9:
+                recommendations.append("🌟 High NPS score! Consider implementing a referral program.")
+            elif nps_mean <= 6:
+                recommendations.append("📉 Low NPS score indicates risk of customer churn. Implement retention strategies.")
+        
+        if not recommendations:
+            recommendations.append("📊 Continue monitoring feedback patterns and maintain current service quality.")
+        
+        return recommendations
+
+
+class ThemeTally:
+    """Reference-counted keyword hits over a changing set of text responses.
+
+    Keeps, per keyword, how many responses contain it (overall and among the
+    responses mentioning each theme), so adding or removing a response only
+    touches the keywords in its hit vector.
+    """
+
+    def __init__(self, matcher, themes):
+        self.matcher = matcher
+        self.themes = list(themes)
+        self.present = 0
+        self.keyword_counts = Counter()
+        self.theme_present = {theme: 0 for theme in self.themes}
+        self.theme_keyword_counts = {theme: Counter() for theme in self.themes}
+
+    def add(self, hits, sign=1):
+        """Add (sign=1) or remove (sign=-1) one response's hit vector"""
+        if not hits:
+            return
+        self.present = self._update(self.keyword_counts, self.present, hits, sign)
+        for theme in self.themes:
+            if hits & self.matcher.masks[theme]:
+                self.theme_present[theme] = self._update(
+                    self.theme_keyword_counts[theme], self.theme_present[theme], hits, sign
+                )
+
+    @staticmethod
+    def _update(counts, present, hits, sign):
+        while hits:
+            bit = hits & -hits
+            hits ^= bit
+            counts[bit] += sign
+            if counts[bit] > 0:
+                present |= bit
+            else:
+                del counts[bit]
+                present &= ~bit
+        return present
+
+    def extract_themes(self):
+        """Same result as AIAnalyzer.extract_themes over the tallied responses"""
+        return AIAnalyzer.themes_from_hits(self.present, self.theme_present, self.matcher)
+
+
+class AnalysisPartial:
+    """Mergeable sentiment and theme counts for a chunk of text responses.
+
+    Merging sums the sentiment counters and ORs the hit-vector unions, so it is
+    associative and commutative and chunks can be scored on any worker in any
+    order.
+    """
+
+    def __init__(self, sentiment_counts=None, hits=0, theme_hits=None, language=None):
+        self.sentiment_counts = Counter(sentiment_counts or {})
+        self.hits = hits
+        self.theme_hits = dict.fromkeys(AIAnalyzer.THEME_KEYWORDS, 0)
+        self.theme_hits.update(theme_hits or {})
+        # Hit vectors are only comparable between partials scored with the same language's lexicons
+        self.language = language
+
+    @classmethod
+    def from_texts(cls, text_responses, language=None):
+        """Score one chunk of text responses, through one sparse hit matrix for the built-in lexicons"""
+        matcher = AIAnalyzer.matcher(language)
+        partial = cls(language=language)
+        if matcher is not AIAnalyzer.MATCHER:
+            # Language packs score one text at a time
+            for text in text_responses:
+                hits = matcher.hits(text)
+                partial.sentiment_counts[AIAnalyzer.analyze_sentiment(text, hits, language)] += 1
+                partial.hits |= hits
+                for theme in partial.theme_hits:
+                    if hits & matcher.masks[theme]:
+                        partial.theme_hits[theme] |= hits
+            return partial
+
+        texts = KeywordMatcher.text_series(text_responses)
+        hit_matrix = matcher.hit_matrix(texts)
+        rows, cols = hit_matrix
+        partial.sentiment_counts.update(AIAnalyzer.analyze_sentiment_batch(texts, hit_matrix).tolist())
+        partial.hits = _hit_vector(cols)
+        counts = matcher.lexicon_counts(rows, cols, len(texts))
+        for theme in partial.theme_hits:
+            # Keywords of every response that mentions the theme
+            theme_rows = counts[:, matcher.lexicons.index(theme)] > 0
+            partial.theme_hits[theme] = _hit_vector(cols[theme_rows[rows]])
+        return partial
+
+    def merge(self, other):
+        """Combine two partials into a new one"""
+        if self.language != other.language:
+            raise ValueError(f"Cannot merge {self.language!r} and {other.language!r} partials")
+        return AnalysisPartial(
+            self.sentiment_counts + other.sentiment_counts,
+            self.hits | other.hits,
+            {theme: hits | other.theme_hits[theme] for theme, hits in self.theme_hits.items()},
+            self.language
+        )
+
+    def extract_themes(self):
+        """Same result as AIAnalyzer.extract_themes over all merged responses"""
+        return AIAnalyzer.themes_from_hits(self.hits, self.theme_hits, AIAnalyzer.matcher(self.language))
+
+
+def _hit_vector(keyword_ids):
+    """Hit vector (int bitmask) with the bits of the given keyword ids set"""
+    import numpy as np
+
+    vector = 0
+    for keyword_id in np.unique(keyword_ids).tolist():
+        vector |= 1 << keyword_id
+    return vector
+
+
+def _score_chunk(text_responses, language=None):
+    # Module-level so process pool workers can unpickle it
+    return AnalysisPartial.from_texts(text_responses, language)
+
+
+class ResponseAggregator:
+    """Running analysis counters for a survey, updated one response at a time.
+
+    Produces the same ``ai_analysis`` dict as a full recomputation, but each new
+    or edited response costs O(1) and reading the analysis costs O(themes).
+    With ``editable=False`` previous answers are not kept, so streaming a
+    response file through it runs in constant memory (edits and removals are
+    then not supported).
+    """
+
+    def __init__(self, schema, editable=True):
+        self.survey_type = schema.survey_type
+        self._questions = schema.by_id
+        self._entries = {} if editable else None
+        self._total_responses = 0
+        self.language = schema.language
+        self.matcher = AIAnalyzer.matcher(schema.language)
+        
+        self.sentiment_counts = Counter()
+        self.rating_sum = 0
+        self.rating_count = 0
+        self.nps_counts = Counter()
+        self.themes = ThemeTally(self.matcher, AIAnalyzer.THEME_KEYWORDS)
+        
+        # Inputs to AIAnalyzer.generate_recommendations
+        self._recommendation_themes = ThemeTally(self.matcher, AIAnalyzer.THEME_KEYWORDS)
+
+    @property
+    def total_responses(self):
+        return self._total_responses
+
+    def update(self, question_id, response, respondent_id=None):
+        """Record a new or edited response, replacing any previous answer to the same question"""
+        previous = None
+        if self._entries is not None:
+            key = (respondent_id, question_id)
+            previous = self._entries.get(key)
+            if previous is not None:
+                if type(previous[0]) is type(response) and previous[0] == response:
+                    return
+                self._apply(question_id, previous, -1)
+        if previous is None:
+            self._total_responses += 1
+        
+        entry = (response, self.matcher.hits(response) if isinstance(response, str) else 0)
+        if self._entries is not None:
+            self._entries[key] = entry
+        self._apply(question_id, entry, 1)
+
+    def remove(self, question_id, respondent_id=None):
+        """Forget a previously recorded response"""
+        entry = self._entries.pop((respondent_id, question_id), None)
+        if entry is not None:
+            self._total_responses -= 1
+            self._apply(question_id, entry, -1)
+
+    def _apply(self, question_id, entry, sign):
+        response, hits = entry
+        question = self._questions.get(question_id)
+        
+        if isinstance(response, (int, float)):
+            self.rating_sum += sign * response
+            self.rating_count += sign
+            if question and question.is_nps:
+                if response >= 9:
+                    self.nps_counts["promoters"] += sign
+                elif response <= 6:
+                    self.nps_counts["detractors"] += sign
+                self.nps_counts["total"] += sign
+                self.nps_counts["sum"] += sign * response
+        
+        elif isinstance(response, str):
+            if question and question.ai_analysis:
+                self.sentiment_counts[AIAnalyzer.analyze_sentiment(response, hits, self.language)] += sign
+                self.themes.add(hits, sign)
+            if len(response.strip()) > 10:
+                self._recommendation_themes.add(hits, sign)
+
+    def snapshot(self):
+        """Current analysis in the ``ai_analysis`` format"""
+        total_sentiments = sum(self.sentiment_counts.values()) or 1
+        sentiment_dist = {
+            "positive": (self.sentiment_counts.get("positive", 0) / total_sentiments) * 100,
+            "neutral": (self.sentiment_counts.get("neutral", 0) / total_sentiments) * 100,
+            "negative": (self.sentiment_counts.get("negative", 0) / total_sentiments) * 100
+        }
+        
+        avg_satisfaction = self.rating_sum / self.rating_count if self.rating_count else 0
+        
+        nps_score = 0
+        if self.nps_counts["total"]:
+            nps_score = ((self.nps_counts["promoters"] - self.nps_counts["detractors"]) / self.nps_counts["total"]) * 100
+        
+        nps_mean = self.nps_counts["sum"] / self.nps_counts["total"] if self.nps_counts["total"] else None
+        recommendations = AIAnalyzer.recommendations_from_metrics(
+            avg_satisfaction, self._recommendation_themes.extract_themes(), nps_mean, self.survey_type
+        )
+        
+        return {
+            "sentiment_distribution": sentiment_dist,
+            "themes": self.themes.extract_themes(),
+            "avg_satisfaction": avg_satisfaction,
+            "nps_score": nps_score,
+            "recommendations": recommendations,
+            "total_responses": self.total_responses
+        }
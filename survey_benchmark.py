@@ -0,0 +1,362 @@
+"""Benchmarks and seeded synthetic corpus generator for the survey analysis pipeline
+
+Usage:
+    python survey_benchmark.py --sizes 1000 10000 -o baseline.json
+    python survey_benchmark.py --sizes 1000 10000 --compare baseline.json
+    python survey_benchmark.py --write-corpus corpus.csv --survey customer_satisfaction --sizes 1000000
+
+Each stage is timed over the whole corpus (throughput and per-call latency
+percentiles) ``--repeats`` times, each repeat running for at least
+``--min-time`` seconds, and the median throughput is kept; it is then re-run
+under tracemalloc for peak memory. Results are
+saved as JSON; ``--compare`` flags stages that got slower or hungrier than a
+saved baseline by more than ``--tolerance``. A run also fails if a vectorized
+stage is not faster than the per-item stage it replaces (``FASTER_THAN``).
+"""
+import argparse
+import csv
+import json
+import math
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from survey_analysis import SURVEY_SCHEMAS, AIAnalyzer, ResponseAggregator
+
+
+# Rating weights per scale, skewed positive like real satisfaction data
+RATING_WEIGHTS = {
+    5: [0.06, 0.09, 0.2, 0.37, 0.28],
+    10: [0.03, 0.02, 0.03, 0.04, 0.06, 0.08, 0.12, 0.2, 0.2, 0.22],
+}
+FILLER_WORDS = (
+    "the a and to of it is was we our your more would like could be with for on "
+    "very really just also please better make need want when about time more"
+).split()
+TEXT_EMPTY_RATE = 0.15
+TEXT_MEAN_WORDS = 14
+KEYWORD_RATE = 0.25
+MAX_LATENCY_SAMPLES = 100000
+# Timing repeats per stage (the median is reported) and the minimum timed run per repeat
+DEFAULT_REPEATS = 5
+DEFAULT_MIN_SECONDS = 0.2
+
+
+def _rating(rng, scale):
+    weights = RATING_WEIGHTS.get(scale) or [1] * scale
+    return rng.choices(range(1, scale + 1), weights)[0]
+
+
+def _text(rng, mood):
+    """Free-text answer whose length is log-normal and whose sentiment follows ``mood`` (-1..1)"""
+    if rng.random() < TEXT_EMPTY_RATE:
+        return ""
+    n_words = max(1, int(rng.lognormvariate(math.log(TEXT_MEAN_WORDS), 0.6)))
+    theme_words = [word for words in AIAnalyzer.THEME_KEYWORDS.values() for word in words]
+    words = []
+    for _ in range(n_words):
+        roll = rng.random()
+        if roll < KEYWORD_RATE / 2:
+            words.append(rng.choice(theme_words))
+        elif roll < KEYWORD_RATE:
+            positive = rng.random() < (mood + 1) / 2
+            words.append(rng.choice(AIAnalyzer.POSITIVE_WORDS if positive else AIAnalyzer.NEGATIVE_WORDS))
+        else:
+            words.append(rng.choice(FILLER_WORDS))
+    return " ".join(words).capitalize() + "."
+
+
+def generate_submissions(schema, n, seed=0):
+    """Yield ``(respondent_id, {question_id: value})`` for ``n`` synthetic respondents
+
+    Deterministic for a given seed. Text sentiment is correlated with the
+    respondent's first rating and multiple-choice options follow a Zipf-like
+    popularity curve. Nothing is held in memory between respondents.
+    """
+    rng = random.Random(seed)
+    for respondent_id in range(1, n + 1):
+        answers = {}
+        mood = 0.0
+        for question in schema.questions:
+            if question.type == "rating":
+                value = _rating(rng, question.scale)
+                if not answers:
+                    mood = (value - 1) / max(question.scale - 1, 1) * 2 - 1
+                answers[question.id] = value
+            elif question.type == "multiple_choice":
+                weights = [1 / (rank + 1) for rank in range(len(question.options))]
+                answers[question.id] = rng.choices(question.options, weights)[0]
+            else:
+                answers[question.id] = _text(rng, mood)
+        yield respondent_id, answers
+
+
+def generate_texts(schema, n, seed=0):
+    """Yield the AI-analysed free-text answers of ``n`` synthetic respondents"""
+    for _, answers in generate_submissions(schema, n, seed):
+        for question in schema.analysed_text_questions:
+            yield answers[question.id]
+
+
+def write_corpus(path, schema, n, seed=0):
+    """Write a synthetic corpus as CSV in the export/CLI column layout"""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["submission_id"] + [f"q_{question.id}" for question in schema.questions])
+        for respondent_id, answers in generate_submissions(schema, n, seed):
+            writer.writerow([respondent_id] + [answers[question.id] for question in schema.questions])
+
+
+# Stages: each returns an iterable of zero-argument calls; one call is one latency sample
+def _stage_analyze_sentiment(schema, n, seed):
+    analyze = AIAnalyzer.analyze_sentiment
+    for text in generate_texts(schema, n, seed):
+        yield lambda text=text: analyze(text)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _stage_analyze_sentiment_batch(schema, n, seed):
+    for chunk in _chunks(generate_texts(schema, n, seed), 100000):
+        yield lambda chunk=chunk: AIAnalyzer.analyze_sentiment_batch(chunk)
+
+
+def _stage_extract_themes(schema, n, seed):
+    for chunk in _chunks(generate_texts(schema, n, seed), 1000):
+        yield lambda chunk=chunk: AIAnalyzer.extract_themes(chunk)
+
+
+def _stage_generate_recommendations(schema, n, seed):
+    for _, answers in generate_submissions(schema, n, seed):
+        yield lambda answers=answers: AIAnalyzer.generate_recommendations(answers, schema)
+
+
+def _stage_aggregate(schema, n, seed):
+    # The analyze_responses path: incremental updates, then one dashboard read
+    aggregator = ResponseAggregator(schema, editable=False)
+    for respondent_id, answers in generate_submissions(schema, n, seed):
+        def submit(respondent_id=respondent_id, answers=answers):
+            for question_id, value in answers.items():
+                aggregator.update(question_id, value, respondent_id)
+        yield submit
+    yield aggregator.snapshot
+
+
+STAGES = {
+    "analyze_sentiment": (_stage_analyze_sentiment, "texts"),
+    "analyze_sentiment_batch": (_stage_analyze_sentiment_batch, "texts"),
+    "extract_themes": (_stage_extract_themes, "texts"),
+    "generate_recommendations": (_stage_generate_recommendations, "respondents"),
+    "aggregate": (_stage_aggregate, "respondents"),
+}
+
+# Vectorized stages and the per-item stage each must beat on throughput
+FASTER_THAN = {
+    "analyze_sentiment_batch": "analyze_sentiment",
+}
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def _timed_pass(make_calls, schema, n, seed, latencies, stride):
+    """Run every call of a stage once; returns (nanoseconds spent in the calls, calls made)"""
+    calls = 0
+    elapsed_ns = 0
+    for call in make_calls(schema, n, seed):
+        start = time.perf_counter_ns()
+        call()
+        duration = time.perf_counter_ns() - start
+        elapsed_ns += duration
+        if calls % stride == 0:
+            latencies.append(duration)
+        calls += 1
+    return elapsed_ns, calls
+
+
+def run_stage(name, schema, n, seed=0, repeats=DEFAULT_REPEATS, min_seconds=DEFAULT_MIN_SECONDS):
+    """Time one stage over ``n`` respondents and measure its peak traced memory
+
+    The stage is timed ``repeats`` times. Each repeat runs the whole stage as
+    many times as it takes to fill ``min_seconds``, so small sizes are not
+    timed from a single short pass. The reported throughput is the median
+    over the repeats; latency percentiles pool the samples of all repeats.
+    """
+    make_calls, unit = STAGES[name]
+    items = n * len(schema.analysed_text_questions) if unit == "texts" else n
+    stride = max(1, items // MAX_LATENCY_SAMPLES)
+
+    # Warm-up so lazy imports and first-call caches are not timed
+    for call in make_calls(schema, min(n, 10), seed):
+        call()
+
+    latencies = []
+    throughputs = []
+    pass_seconds = []
+    calls = 0
+    for _ in range(max(1, repeats)):
+        elapsed_ns = 0
+        passes = 0
+        while passes == 0 or elapsed_ns < min_seconds * 1e9:
+            pass_ns, calls = _timed_pass(make_calls, schema, n, seed, latencies, stride)
+            elapsed_ns += pass_ns
+            passes += 1
+        elapsed = elapsed_ns / 1e9
+        throughputs.append(items * passes / elapsed if elapsed else 0.0)
+        pass_seconds.append(elapsed / passes)
+    latencies.sort()
+
+    # Separate pass under tracemalloc so its overhead does not skew the timings
+    tracemalloc.start()
+    for call in make_calls(schema, n, seed):
+        call()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "items": items,
+        "unit": unit,
+        "calls": calls,
+        "repeats": len(throughputs),
+        "seconds": statistics.median(pass_seconds),
+        "throughput": statistics.median(throughputs),
+        "throughput_min": min(throughputs),
+        "throughput_max": max(throughputs),
+        "latency_us": {
+            "p50": _percentile(latencies, 0.5) / 1e3,
+            "p90": _percentile(latencies, 0.9) / 1e3,
+            "p99": _percentile(latencies, 0.99) / 1e3,
+            "max": (latencies[-1] if latencies else 0) / 1e3,
+        },
+        "peak_memory_bytes": peak_bytes,
+    }
+
+
+def run_suite(sizes, surveys=None, stages=None, seed=0, log=None, repeats=DEFAULT_REPEATS, min_seconds=DEFAULT_MIN_SECONDS):
+    """Run every stage for every survey and size; returns a baseline-format dict"""
+    results = {}
+    for survey_key in surveys or SURVEY_SCHEMAS:
+        schema = SURVEY_SCHEMAS[survey_key]
+        for n in sizes:
+            for stage in stages or STAGES:
+                key = f"{survey_key}/{n}/{stage}"
+                results[key] = run_stage(stage, schema, n, seed, repeats, min_seconds)
+                if log:
+                    result = results[key]
+                    log(f"{key}: {result['throughput']:,.0f} {result['unit']}/s "
+                        f"({result['throughput_min']:,.0f}-{result['throughput_max']:,.0f} over {result['repeats']}), "
+                        f"p99 {result['latency_us']['p99']:.1f} us, "
+                        f"peak {result['peak_memory_bytes'] / 1e6:.1f} MB")
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "analyzer_version": AIAnalyzer.VERSION,
+            "seed": seed,
+            "repeats": repeats,
+            "min_seconds": min_seconds,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance=0.2):
+    """Regressions of ``current`` against ``baseline`` beyond a relative tolerance
+
+    Throughput only counts as regressed when even the fastest current repeat
+    is below the baseline median by more than the tolerance.
+    """
+    regressions = []
+    for key, result in current["results"].items():
+        previous = baseline.get("results", {}).get(key)
+        if previous is None:
+            continue
+        best = result.get("throughput_max", result["throughput"])
+        checks = [
+            ("throughput", previous["throughput"], result["throughput"], previous["throughput"] * (1 - tolerance) > best),
+            ("p99 latency", previous["latency_us"]["p99"], result["latency_us"]["p99"], result["latency_us"]["p99"] > previous["latency_us"]["p99"] * (1 + tolerance)),
+            ("peak memory", previous["peak_memory_bytes"], result["peak_memory_bytes"], result["peak_memory_bytes"] > previous["peak_memory_bytes"] * (1 + tolerance)),
+        ]
+        for metric, before, after, regressed in checks:
+            if regressed:
+                regressions.append({"benchmark": key, "metric": metric, "baseline": before, "current": after})
+    return regressions
+
+
+def slower_batches(current):
+    """Vectorized stages that did not beat their per-item stage in the same run"""
+    failures = []
+    for key, result in current["results"].items():
+        prefix, _, stage = key.rpartition("/")
+        loop = current["results"].get(f"{prefix}/{FASTER_THAN.get(stage)}")
+        if loop is not None and result["throughput"] <= loop["throughput"]:
+            failures.append({"benchmark": key, "loop": loop["throughput"], "batch": result["throughput"]})
+    return failures
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the survey analysis pipeline on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Respondents per run (1e3 to 1e7)")
+    parser.add_argument("--survey", action="append", choices=sorted(SURVEY_SCHEMAS), help="Limit to these surveys")
+    parser.add_argument("--stage", action="append", choices=list(STAGES), help="Limit to these stages")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="Timing repeats per stage; the median is kept")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_SECONDS,
+                        help="Minimum seconds of timed calls per repeat (default %(default)s)")
+    parser.add_argument("-o", "--output", help="Save results as a JSON baseline")
+    parser.add_argument("--compare", help="Baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown (default 0.2)")
+    parser.add_argument("--write-corpus", help="Only write a synthetic CSV corpus for the first survey and size")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.write_corpus:
+        survey_key = (args.survey or list(SURVEY_SCHEMAS))[0]
+        write_corpus(args.write_corpus, SURVEY_SCHEMAS[survey_key], args.sizes[0], args.seed)
+        return 0
+
+    current = run_suite(
+        args.sizes, args.survey, args.stage, args.seed,
+        log=lambda line: print(line, file=sys.stderr), repeats=args.repeats, min_seconds=args.min_time
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+
+    failures = slower_batches(current)
+    for failure in failures:
+        print(f"SLOWER THAN LOOP {failure['benchmark']}: "
+              f"{failure['batch']:.4g} vs {failure['loop']:.4g} items/s", file=sys.stderr)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(current, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['benchmark']} {regression['metric']}: "
+                  f"{regression['baseline']:.4g} -> {regression['current']:.4g}", file=sys.stderr)
+    return 1 if failures or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
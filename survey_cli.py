@@ -0,0 +1,156 @@
+"""Headless batch analysis of survey response files
+
+Usage:
+    python survey_cli.py responses.csv --survey customer_satisfaction
+    python survey_cli.py export.ndjson --survey employee_feedback -o analysis.json --per-response rows.ndjson
+    python survey_cli.py responses.csv --survey customer_satisfaction --discover-themes 8
+
+CSV input has one ``q_<id>`` (or ``<id>``) column per question, as written by
+the CSV export (whose leading summary comment line is skipped); NDJSON input is the NDJSON export format. Rows are streamed, so
+files of any size run in constant memory. Streamlit, Plotly and pandas are
+never imported.
+"""
+import argparse
+import csv
+import itertools
+import json
+import sys
+
+from survey_analysis import SURVEY_SCHEMAS, ResponseAggregator
+
+
+def _coerce(question, raw):
+    """Convert a raw file value to the type the survey widgets produce, or None if unanswered"""
+    if raw is None or raw == "":
+        return None
+    if question.type == "rating":
+        try:
+            return int(float(raw))
+        except (TypeError, ValueError):
+            return None
+    return raw if isinstance(raw, str) else str(raw)
+
+
+def iter_csv_submissions(f, schema):
+    """Yield ``(respondent_id, {question_id: value})`` from a CSV response file"""
+    # Exports may start with a "#"-prefixed analysis summary line
+    first = f.readline()
+    reader = csv.DictReader(itertools.chain(() if first.startswith("#") else (first,), f))
+    for row_number, row in enumerate(reader, 1):
+        answers = {}
+        for question in schema.questions:
+            raw = row.get(f"q_{question.id}", row.get(str(question.id)))
+            value = _coerce(question, raw)
+            if value is not None:
+                answers[question.id] = value
+        yield row.get("submission_id") or row_number, answers
+
+
+def iter_ndjson_submissions(f, schema):
+    """Yield ``(respondent_id, {question_id: value})`` from an NDJSON response file"""
+    for line_number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if record.get("type", "submission") != "submission":
+            continue
+        raw_answers = record.get("answers", {})
+        answers = {}
+        for question in schema.questions:
+            value = _coerce(question, raw_answers.get(str(question.id), raw_answers.get(question.id)))
+            if value is not None:
+                answers[question.id] = value
+        yield record.get("submission_id") or line_number, answers
+
+
+def analyze_file(f, schema, input_format, per_response=None):
+    """Stream a response file through the aggregator and return the analysis dict"""
+    reader = iter_ndjson_submissions if input_format == "ndjson" else iter_csv_submissions
+    aggregator = ResponseAggregator(schema, editable=False)
+    respondents = 0
+    if per_response is not None:
+        from response_export import submission_analysis
+
+    for respondent_id, answers in reader(f, schema):
+        respondents += 1
+        for question_id, value in answers.items():
+            aggregator.update(question_id, value, respondent_id=respondent_id)
+        if per_response is not None:
+            per_response.write(json.dumps({
+                "respondent_id": respondent_id,
+                "analysis": submission_analysis(schema, answers)
+            }) + "\n")
+
+    analysis = aggregator.snapshot()
+    analysis["survey"] = schema.key
+    analysis["respondents"] = respondents
+    return analysis
+
+
+def discover_file_themes(path, schema, input_format, n_clusters):
+    """TF-IDF/k-means themes over the AI-analysed text answers of a response file"""
+    from theme_discovery import discover_themes
+
+    reader = iter_ndjson_submissions if input_format == "ndjson" else iter_csv_submissions
+
+    def texts():
+        with open(path, encoding="utf-8", newline="") as f:
+            for _, answers in reader(f, schema):
+                for question in schema.analysed_text_questions:
+                    if isinstance(answers.get(question.id), str):
+                        yield answers[question.id]
+
+    return discover_themes(texts, n_clusters, language=schema.language)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="survey-analyze",
+        description="Run sentiment, theme, NPS and recommendation analysis over a survey response file."
+    )
+    parser.add_argument("responses", help="CSV or NDJSON response file ('-' for stdin)")
+    parser.add_argument("--survey", required=True, choices=sorted(SURVEY_SCHEMAS), help="Survey template key")
+    parser.add_argument("--input-format", choices=["csv", "ndjson"], help="Defaults to the file extension")
+    parser.add_argument("-o", "--output", help="Write the analysis JSON here instead of stdout")
+    parser.add_argument("--per-response", help="Also write per-respondent sentiment and themes as NDJSON")
+    parser.add_argument("--discover-themes", type=int, metavar="K",
+                        help="Also cluster the text answers into K data-driven themes (re-reads the file)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # Checked before the analysis pass, which could take long on a large file
+    if args.discover_themes and args.responses == "-":
+        parser.error("--discover-themes needs a file, since the responses are read several times")
+    schema = SURVEY_SCHEMAS[args.survey]
+    input_format = args.input_format or (
+        "ndjson" if args.responses.endswith((".ndjson", ".jsonl")) else "csv"
+    )
+
+    source = sys.stdin if args.responses == "-" else open(args.responses, encoding="utf-8", newline="")
+    per_response = open(args.per_response, "w", encoding="utf-8") if args.per_response else None
+    try:
+        analysis = analyze_file(source, schema, input_format, per_response)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if per_response is not None:
+            per_response.close()
+
+    if args.discover_themes:
+        analysis["discovered_themes"] = discover_file_themes(args.responses, schema, input_format, args.discover_themes)
+
+    report = json.dumps(analysis, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""In-process timing histograms, counters and an optional sampling profiler
+
+Hot paths are wrapped with ``timed(stage)`` / ``timer(stage)``; every stage
+feeds a fixed-bucket latency histogram. The registry can be exported as a JSON
+snapshot (with p50/p90/p99 estimates) or in Prometheus text format, and
+optionally served over HTTP with ``start_http_server``.
+"""
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+
+# Histogram upper bounds in seconds: 1-2.5-5 steps from 1 us to 10 s
+BUCKETS = tuple(
+    round(mantissa * 10.0 ** exponent, 9)
+    for exponent in range(-6, 1)
+    for mantissa in (1, 2.5, 5)
+) + (10.0,)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (cumulative counts are built on export)"""
+    __slots__ = ("counts", "total", "count", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        idx = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[idx] += 1
+            self.total += seconds
+            self.count += 1
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(BUCKETS) + 1)
+            self.total = 0.0
+            self.count = 0
+
+    def quantile(self, q):
+        """Quantile estimate by linear interpolation inside the containing bucket"""
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for idx, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = BUCKETS[idx - 1] if idx > 0 else 0.0
+                upper = BUCKETS[idx] if idx < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return BUCKETS[-1]
+
+
+class MetricsRegistry:
+    """Named stage histograms and event counters for this process"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, Histogram())
+        return histogram
+
+    def observe(self, stage, seconds):
+        self.histogram(stage).observe(seconds)
+
+    def increment(self, event, amount=1):
+        with self._lock:
+            self.counters[event] += amount
+
+    def reset(self):
+        # Histograms are cleared in place because timed() holds on to them
+        with self._lock:
+            for histogram in self.histograms.values():
+                histogram.reset()
+            self.counters.clear()
+
+    def snapshot(self):
+        """JSON-serializable view with count, total and p50/p90/p99 per stage"""
+        stages = {}
+        for stage, histogram in sorted(self.histograms.items()):
+            stages[stage] = {
+                "count": histogram.count,
+                "total_seconds": histogram.total,
+                "mean_seconds": histogram.total / histogram.count if histogram.count else 0.0,
+                "p50_seconds": histogram.quantile(0.5),
+                "p90_seconds": histogram.quantile(0.9),
+                "p99_seconds": histogram.quantile(0.99),
+            }
+        return {"stages": stages, "counters": dict(self.counters)}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def prometheus_text(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = [
+            "# HELP survey_stage_seconds Time spent in an instrumented stage",
+            "# TYPE survey_stage_seconds histogram",
+        ]
+        for stage, histogram in sorted(self.histograms.items()):
+            label = stage.replace("\\", "\\\\").replace('"', '\\"')
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + (float("inf"),), histogram.counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'survey_stage_seconds_bucket{{stage="{label}",le="{le}"}} {cumulative}')
+            lines.append(f'survey_stage_seconds_sum{{stage="{label}"}} {histogram.total}')
+            lines.append(f'survey_stage_seconds_count{{stage="{label}"}} {histogram.count}')
+        lines.append("# HELP survey_events_total Count of instrumented events")
+        lines.append("# TYPE survey_events_total counter")
+        for event, value in sorted(self.counters.items()):
+            lines.append(f'survey_events_total{{event="{event}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def timed(stage, registry=REGISTRY):
+    """Decorator recording each call's wall time under ``stage``"""
+    def decorator(func):
+        histogram = registry.histogram(stage)
+        perf_counter = time.perf_counter
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def timer(stage, registry=REGISTRY):
+    """Context manager recording the wall time of a block under ``stage``"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(stage, time.perf_counter() - start)
+
+
+class SamplingProfiler:
+    """Background thread sampling every other thread's stack at a fixed interval.
+
+    Samples are kept as collapsed stacks (``file:function;...`` -> count),
+    which is the input format of flame graph tools. The sampler thread adds
+    to ``stacks`` under ``_lock``; readers copy it under the same lock.
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="survey-sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            samples = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                names = []
+                while frame is not None and len(names) < self.max_depth:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                samples.append(";".join(reversed(names)))
+            with self._lock:
+                self.stacks.update(samples)
+
+    def snapshot(self):
+        """Copy of the collapsed stack counts, safe to read while sampling"""
+        with self._lock:
+            return self.stacks.copy()
+
+    def collapsed(self):
+        """Samples in collapsed-stack text format"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.snapshot().most_common())
+
+    def top_functions(self, n=15):
+        """Innermost functions by sample count"""
+        leaves = Counter()
+        for stack, count in self.snapshot().items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(n)
+
+
+def start_http_server(port, registry=REGISTRY, host="0.0.0.0"):
+    """Serve /metrics (Prometheus) and /metrics.json from a daemon thread"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = registry.prometheus_text(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = registry.to_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            payload = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="survey-metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,146 @@
+"""Low-overhead paradata capture: per-question timing, revisits, answer edits and device
+
+Events are fixed-size binary records (``RECORD``) packed into a preallocated
+ring buffer, so recording one costs a lock and a ``struct.pack_into`` with
+no per-event objects kept alive. A background thread drains the buffer and
+hands the records to a sink (``ResponseStore.save_paradata``) in batches.
+If the sink falls behind and the buffer fills, the oldest records are
+overwritten and counted in ``paradata_dropped``.
+
+Event codes:
+
+* ``ENTER``: question shown for the first time in a submission
+* ``REVISIT``: question shown again (via Previous or a branching loop)
+* ``LEAVE``: respondent left the question; ``duration_ms`` is the visit length
+* ``ANSWER``: answer set or changed during a question's first visit
+* ``EDIT``: answer changed on a revisit
+* ``COMPLETE``: submission completed on this question
+"""
+import re
+import struct
+import threading
+import time
+
+from survey_metrics import REGISTRY, timed
+
+
+ENTER, REVISIT, LEAVE, ANSWER, EDIT, COMPLETE = range(1, 7)
+EVENT_NAMES = {ENTER: "enter", REVISIT: "revisit", LEAVE: "leave", ANSWER: "answer", EDIT: "edit", COMPLETE: "complete"}
+
+# submission_id, recorded_at (epoch seconds), duration_ms, question_id, position, event: 27 bytes
+RECORD = struct.Struct("<qdIIHB")
+MAX_DURATION_MS = 2 ** 32 - 1
+
+MOBILE_PATTERN = re.compile(r"Mobi|iPhone|Android.+Mobile|Windows Phone", re.IGNORECASE)
+TABLET_PATTERN = re.compile(r"iPad|Tablet|Android(?!.+Mobile)|Silk", re.IGNORECASE)
+
+
+def device_type(user_agent):
+    """Coarse device class of a User-Agent header: mobile, tablet, desktop or unknown"""
+    if not user_agent:
+        return "unknown"
+    if MOBILE_PATTERN.search(user_agent):
+        return "mobile"
+    if TABLET_PATTERN.search(user_agent):
+        return "tablet"
+    return "desktop"
+
+
+class ParadataRecorder:
+    """Fixed-capacity ring buffer of paradata records with batched, background flushing.
+
+    ``record`` only packs into the buffer; ``flush`` (called by the flusher
+    thread every ``flush_interval`` seconds, or as soon as ``batch_size``
+    records are pending) copies the pending bytes out under the lock and
+    passes the decoded rows to ``sink`` outside it.
+    """
+
+    def __init__(self, sink, capacity=65536, batch_size=4096, flush_interval=1.0):
+        self.sink = sink
+        self.capacity = capacity
+        self.batch_size = min(batch_size, capacity)
+        self.flush_interval = flush_interval
+        self._buffer = bytearray(capacity * RECORD.size)
+        self._head = 0
+        self._pending = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def record(self, submission_id, question_id, position, event, duration_ms=0):
+        """Append one event; the hot path, kept to a lock and a pack_into"""
+        with self._lock:
+            if self._pending == self.capacity:
+                # Full: overwrite the oldest record rather than block the page
+                self._pending -= 1
+                self.dropped += 1
+            RECORD.pack_into(
+                self._buffer, self._head * RECORD.size,
+                submission_id, time.time(), min(duration_ms, MAX_DURATION_MS), question_id, position, event
+            )
+            self._head += 1
+            if self._head == self.capacity:
+                self._head = 0
+            self._pending += 1
+            if self._pending == self.batch_size:
+                self._wake.set()
+
+    def _drain(self):
+        """Pending records as one contiguous bytes copy, oldest first"""
+        with self._lock:
+            pending, head = self._pending, self._head
+            self._pending = 0
+            dropped, self.dropped = self.dropped, 0
+            tail = head - pending
+            if tail >= 0:
+                data = bytes(self._buffer[tail * RECORD.size:head * RECORD.size])
+            else:
+                data = bytes(self._buffer[(self.capacity + tail) * RECORD.size:]) + bytes(self._buffer[:head * RECORD.size])
+        if dropped:
+            REGISTRY.increment("paradata_dropped", dropped)
+        return data
+
+    @timed("paradata.flush")
+    def flush(self):
+        """Hand every pending record to the sink; returns the number flushed"""
+        with self._flush_lock:
+            data = self._drain()
+            if not data:
+                return 0
+            rows = list(RECORD.iter_unpack(data))
+            self.sink(rows)
+        REGISTRY.increment("paradata_flushed", len(rows))
+        return len(rows)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # The batch is lost, but the next one is tried again
+                REGISTRY.increment("paradata_flush_errors")
+
+    def start(self):
+        """Start the background flusher (idempotent)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="survey-paradata-flusher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the flusher and flush what is left"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
@@ -0,0 +1,123 @@
+"""Compact per-session survey answers
+
+A browser session keeps only the key of the shared compiled ``SurveySchema``
+and its answers in one typed array indexed by question position: ratings as
+their value, multiple-choice answers as their option index, ``MISSING``
+when unanswered and ``TEXT`` when the answer is free text. Free text itself
+lives in a small position -> str dict created on the first text answer;
+short texts go through a bounded, process-wide LRU table, so common replies
+("Good", "N/A") are shared by every session without being interned forever.
+The durable copy of every answer is in the response store.
+
+``SessionResponses`` is a mutable mapping of ``{question_id: value}`` so it
+drops in wherever the answers dict was used (rule checks, analysis keys).
+"""
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from survey_analysis import SURVEY_SCHEMAS, ResponseAggregator
+
+
+MISSING = -1
+TEXT = -2
+MAX_SHARED_TEXT = 64
+MAX_SHARED_TEXTS = 65536
+
+_shared_texts = OrderedDict()
+_shared_texts_lock = threading.Lock()
+
+
+def shared_text(text):
+    """One copy of a short text per process, from an LRU table of at most MAX_SHARED_TEXTS entries
+
+    Unlike ``sys.intern`` the table is bounded: evicted texts are freed once
+    no session holds them any more.
+    """
+    if len(text) > MAX_SHARED_TEXT:
+        return text
+    with _shared_texts_lock:
+        shared = _shared_texts.get(text)
+        if shared is not None:
+            _shared_texts.move_to_end(text)
+            return shared
+        _shared_texts[text] = text
+        if len(_shared_texts) > MAX_SHARED_TEXTS:
+            _shared_texts.popitem(last=False)
+    return text
+
+
+class SessionResponses(MutableMapping):
+    """One session's answers to one survey"""
+    __slots__ = ("survey_key", "values", "texts")
+
+    def __init__(self, survey_key):
+        self.survey_key = survey_key
+        self.values = array("h", [MISSING]) * len(SURVEY_SCHEMAS[survey_key])
+        self.texts = None
+
+    @property
+    def schema(self):
+        return SURVEY_SCHEMAS[self.survey_key]
+
+    def _question(self, question_id):
+        question = self.schema.question(question_id)
+        if question is None:
+            raise KeyError(question_id)
+        return question
+
+    def __getitem__(self, question_id):
+        question = self._question(question_id)
+        code = self.values[question.position]
+        if code == MISSING:
+            raise KeyError(question_id)
+        if code == TEXT:
+            return self.texts[question.position]
+        return question.options[code] if question.type == "multiple_choice" else code
+
+    def __setitem__(self, question_id, value):
+        question = self._question(question_id)
+        position = question.position
+        if question.type == "rating":
+            if not isinstance(value, int) or not 1 <= value <= question.scale:
+                raise ValueError(f"Question {question_id}: rating must be a whole number between 1 and {question.scale}")
+            self.values[position] = value
+        elif question.type == "multiple_choice":
+            if value not in question.option_index:
+                raise ValueError(f"Question {question_id}: {value!r} is not one of the options")
+            self.values[position] = question.option_index[value]
+        else:
+            if not isinstance(value, str):
+                raise ValueError(f"Question {question_id}: text answer must be a string")
+            if self.texts is None:
+                self.texts = {}
+            self.texts[position] = shared_text(value)
+            self.values[position] = TEXT
+
+    def __delitem__(self, question_id):
+        question = self._question(question_id)
+        if self.values[question.position] == MISSING:
+            raise KeyError(question_id)
+        self.values[question.position] = MISSING
+        if self.texts:
+            self.texts.pop(question.position, None)
+
+    def __iter__(self):
+        questions = self.schema.questions
+        for position, code in enumerate(self.values):
+            if code != MISSING:
+                yield questions[position].id
+
+    def __len__(self):
+        return len(self.values) - self.values.count(MISSING)
+
+    def __repr__(self):
+        return f"SessionResponses({self.survey_key!r}, {dict(self.items())!r})"
+
+    def snapshot(self):
+        """Session-scope analysis in the ``ai_analysis`` format, computed from the answers alone"""
+        aggregator = ResponseAggregator(self.schema, editable=False)
+        for question_id, value in self.items():
+            aggregator.update(question_id, value)
+        return aggregator.snapshot()
@@ -0,0 +1,350 @@
+"""Bounded-memory, mergeable sketches for streaming survey analytics
+
+Error bounds (documented defaults):
+
+* ``HyperLogLog(precision=14)``: 16 KiB of registers, relative standard error
+  1.04 / sqrt(2 ** precision) ~= 0.81% on distinct respondent counts.
+* ``CountMinSketch(width=2048, depth=5)``: never underestimates; overestimates
+  a count by more than e / width * N (~0.13% of the stream length N) with
+  probability at most e ** -depth (~0.7%).
+* ``TDigest(compression=100)``: at most ~compression centroids; quantile rank
+  error is smallest at the tails and roughly 1 / compression near the median.
+
+HyperLogLog and count-min merges are exact: merging the sketches of two streams
+gives the same sketch as one stream of both. Top-k candidates and t-digests
+merge into sketches with the same error bounds. Items are hashed with BLAKE2b
+rather than ``hash()`` so sketches built in different processes agree.
+"""
+import hashlib
+import math
+from array import array
+from collections import Counter
+
+from survey_analysis import SURVEY_SCHEMAS, AIAnalyzer
+
+
+def _hash64(item):
+    return int.from_bytes(hashlib.blake2b(str(item).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HyperLogLog:
+    """Distinct-count estimator over ``2 ** precision`` one-byte registers"""
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, item):
+        x = _hash64(item)
+        idx = x >> (64 - self.precision)
+        remaining = x & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+
+class CountMinSketch:
+    """Frequency estimates in a fixed ``depth x width`` counter table"""
+
+    def __init__(self, width=2048, depth=5):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.table = array("Q", bytes(8 * width * depth))
+
+    def _cells(self, item):
+        x = _hash64(item)
+        h1, h2 = x & 0xFFFFFFFF, (x >> 32) | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, item, count=1):
+        """Count an item; returns its updated estimate"""
+        table = self.table
+        estimate = None
+        for cell in self._cells(item):
+            table[cell] += count
+            if estimate is None or table[cell] < estimate:
+                estimate = table[cell]
+        self.total += count
+        return estimate
+
+    def estimate(self, item):
+        table = self.table
+        return min(table[cell] for cell in self._cells(item))
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge count-min sketches of different dimensions")
+        self.table = array("Q", (a + b for a, b in zip(self.table, other.table)))
+        self.total += other.total
+        return self
+
+    @property
+    def error_bound(self):
+        """Absolute overestimate bound (holds with probability 1 - e ** -depth)"""
+        return math.e / self.width * self.total
+
+
+class TopK:
+    """Heavy hitters: a count-min sketch plus the ``k`` items with the largest estimates"""
+
+    def __init__(self, k=10, width=2048, depth=5):
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self.candidates = {}
+
+    def add(self, item, count=1):
+        estimate = self.sketch.add(item, count)
+        if item in self.candidates or len(self.candidates) < self.k:
+            self.candidates[item] = estimate
+            return
+        weakest = min(self.candidates, key=self.candidates.get)
+        if estimate > self.candidates[weakest]:
+            del self.candidates[weakest]
+            self.candidates[item] = estimate
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        items = set(self.candidates) | set(other.candidates)
+        estimates = {item: self.sketch.estimate(item) for item in items}
+        self.candidates = dict(sorted(estimates.items(), key=lambda kv: kv[1], reverse=True)[:self.k])
+        return self
+
+    def most_common(self, n=None):
+        ranked = sorted(self.candidates.items(), key=lambda kv: kv[1], reverse=True)
+        return ranked[:n] if n is not None else ranked
+
+
+class TDigest:
+    """Merging t-digest of a numeric stream (Dunning & Ertl) with exact min/max"""
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.centroids = []
+        self.buffer = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, weight=1):
+        self.buffer.append((float(value), weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self.buffer) >= 5 * self.compression:
+            self._compress()
+
+    def _compress(self):
+        points = sorted(self.centroids + self.buffer)
+        self.buffer = []
+        if not points:
+            return
+        total = sum(weight for _, weight in points)
+        merged = []
+        cumulative = 0
+        mean, weight = points[0]
+        for point_mean, point_weight in points[1:]:
+            q = (cumulative + (weight + point_weight) / 2) / total
+            if weight + point_weight <= max(1, 4 * total * q * (1 - q) / self.compression):
+                weight += point_weight
+                mean += (point_mean - mean) * point_weight / weight
+            else:
+                merged.append((mean, weight))
+                cumulative += weight
+                mean, weight = point_mean, point_weight
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def merge(self, other):
+        self.buffer.extend(other.centroids + other.buffer)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        self._compress()
+        if not self.centroids:
+            return None
+        target = q * self.count
+        cumulative = 0
+        previous_mean, previous_center = self.min, 0.0
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - previous_center
+                fraction = (target - previous_center) / span if span else 0.0
+                return previous_mean + (mean - previous_mean) * fraction
+            previous_mean, previous_center = mean, center
+            cumulative += weight
+        span = self.count - previous_center
+        fraction = (target - previous_center) / span if span else 1.0
+        return previous_mean + (self.max - previous_mean) * fraction
+
+
+class SketchAggregator:
+    """Constant-memory counterpart of ResponseAggregator for very large collections.
+
+    Answers cannot be retracted, so every answer must be folded in exactly
+    once, in its final form: feed it completed submissions (as
+    ``SurveyAggregate`` does through ``CompletionCursor``), never answers
+    that may still be edited. Given that, sentiment, average rating, NPS and
+    themes are exact (they only need counters and hit-vector unions);
+    distinct respondents, rating quantiles and option/theme/keyword
+    frequencies come from sketches.
+    """
+
+    QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+    def __init__(self, schema, top_k=10, cms_width=2048, cms_depth=5, hll_precision=14, compression=100):
+        # Only the key is kept so sketches pickle for transfer between workers
+        self.survey_key = schema.key
+        self.total_responses = 0
+        self.respondents = HyperLogLog(hll_precision)
+        self.sentiment_counts = Counter()
+        self.rating_sum = 0
+        self.rating_count = 0
+        self.nps_counts = Counter()
+        self.theme_hits = dict.fromkeys(AIAnalyzer.THEME_KEYWORDS, 0)
+        self.hits = 0
+        self.recommendation_theme_hits = dict.fromkeys(AIAnalyzer.THEME_KEYWORDS, 0)
+        self.recommendation_hits = 0
+        self.digests = {question.id: TDigest(compression) for question in schema.rating_questions}
+        self.options = {
+            question.id: TopK(top_k, cms_width, cms_depth)
+            for question in schema.questions if question.type == "multiple_choice"
+        }
+        self.themes = TopK(top_k, cms_width, cms_depth)
+        self.keywords = TopK(top_k, cms_width, cms_depth)
+
+    def update(self, question_id, response, respondent_id=None):
+        """Fold one answer into the sketches"""
+        schema = self.schema
+        matcher = AIAnalyzer.matcher(schema.language)
+        question = schema.question(question_id)
+        self.total_responses += 1
+        if respondent_id is not None:
+            self.respondents.add(respondent_id)
+
+        if isinstance(response, (int, float)):
+            self.rating_sum += response
+            self.rating_count += 1
+            if question_id in self.digests:
+                self.digests[question_id].add(response)
+            if question and question.is_nps:
+                if response >= 9:
+                    self.nps_counts["promoters"] += 1
+                elif response <= 6:
+                    self.nps_counts["detractors"] += 1
+                self.nps_counts["total"] += 1
+                self.nps_counts["sum"] += response
+
+        elif isinstance(response, str):
+            if question_id in self.options:
+                self.options[question_id].add(response)
+            hits = matcher.hits(response)
+            if question and question.ai_analysis:
+                self.sentiment_counts[AIAnalyzer.analyze_sentiment(response, hits, schema.language)] += 1
+                self.hits |= hits
+                for theme in self.theme_hits:
+                    if hits & matcher.masks[theme]:
+                        self.theme_hits[theme] |= hits
+                        self.themes.add(theme)
+                vector = hits
+                while vector:
+                    bit = vector & -vector
+                    vector ^= bit
+                    self.keywords.add(matcher.keywords[bit.bit_length() - 1])
+            if len(response.strip()) > 10:
+                self.recommendation_hits |= hits
+                for theme in self.recommendation_theme_hits:
+                    if hits & matcher.masks[theme]:
+                        self.recommendation_theme_hits[theme] |= hits
+
+    def merge(self, other):
+        """Fold another worker's or district's sketches into this one"""
+        self.total_responses += other.total_responses
+        self.respondents.merge(other.respondents)
+        self.sentiment_counts += other.sentiment_counts
+        self.rating_sum += other.rating_sum
+        self.rating_count += other.rating_count
+        self.nps_counts += other.nps_counts
+        self.hits |= other.hits
+        self.recommendation_hits |= other.recommendation_hits
+        for theme in self.theme_hits:
+            self.theme_hits[theme] |= other.theme_hits[theme]
+            self.recommendation_theme_hits[theme] |= other.recommendation_theme_hits[theme]
+        for question_id, digest in self.digests.items():
+            digest.merge(other.digests[question_id])
+        for question_id, top_k in self.options.items():
+            top_k.merge(other.options[question_id])
+        self.themes.merge(other.themes)
+        self.keywords.merge(other.keywords)
+        return self
+
+    @property
+    def schema(self):
+        return SURVEY_SCHEMAS[self.survey_key]
+
+    def snapshot(self):
+        """``ai_analysis``-format dict plus sketch-only fields and their error bounds"""
+        total_sentiments = sum(self.sentiment_counts.values()) or 1
+        sentiment_dist = {
+            sentiment: (self.sentiment_counts.get(sentiment, 0) / total_sentiments) * 100
+            for sentiment in ("positive", "neutral", "negative")
+        }
+        avg_satisfaction = self.rating_sum / self.rating_count if self.rating_count else 0
+        matcher = AIAnalyzer.matcher(self.schema.language)
+        nps_score = 0
+        if self.nps_counts["total"]:
+            nps_score = ((self.nps_counts["promoters"] - self.nps_counts["detractors"]) / self.nps_counts["total"]) * 100
+        nps_mean = self.nps_counts["sum"] / self.nps_counts["total"] if self.nps_counts["total"] else None
+        recommendations = AIAnalyzer.recommendations_from_metrics(
+            avg_satisfaction,
+            AIAnalyzer.themes_from_hits(self.recommendation_hits, self.recommendation_theme_hits, matcher),
+            nps_mean,
+            self.schema.survey_type
+        )
+
+        return {
+            "sentiment_distribution": sentiment_dist,
+            "themes": AIAnalyzer.themes_from_hits(self.hits, self.theme_hits, matcher),
+            "avg_satisfaction": avg_satisfaction,
+            "nps_score": nps_score,
+            "recommendations": recommendations,
+            "total_responses": self.total_responses,
+            "distinct_respondents": self.respondents.count(),
+            "rating_quantiles": {
+                question_id: {q: digest.quantile(q) for q in self.QUANTILES}
+                for question_id, digest in self.digests.items() if digest.count
+            },
+            "option_counts": {question_id: top_k.most_common() for question_id, top_k in self.options.items()},
+            "theme_counts": self.themes.most_common(),
+            "top_keywords": self.keywords.most_common(),
+            "error_bounds": {
+                "distinct_respondents_relative": self.respondents.relative_error,
+                "theme_count_absolute": self.themes.sketch.error_bound,
+                "keyword_count_absolute": self.keywords.sketch.error_bound,
+            },
+        }
@@ -0,0 +1,289 @@
+"""Vectorized validation and consistency-rule engine
+
+Every rule compiles to a function from encoded answer columns to a NumPy
+boolean mask of violating rows, so the same rule set checks one live answer
+(a batch of one row) and millions of stored submissions in one pass.
+
+Columns are encoded per question: ratings as float64 (NaN when unanswered),
+multiple choice as the option index (``MISSING`` / ``INVALID`` otherwise) and
+free text as its length (``MISSING`` when unanswered).
+
+Violation codes:
+
+* ``out_of_range``: rating outside 1..scale, or not a whole number
+* ``invalid_option``: multiple-choice answer that is not one of the options
+* ``too_long``: text longer than ``MAX_TEXT_LENGTH`` characters
+* ``missing_required``: required question on the respondent's branch left unanswered
+* template ``validation`` codes: cross-question consistency rules, e.g.
+  ``inconsistent_satisfaction_nps``
+
+``error`` violations block a submission; ``warning`` ones are flagged for
+cleaning only.
+"""
+from survey_metrics import timed
+
+
+MAX_TEXT_LENGTH = 5000
+MISSING = -1
+INVALID = -2
+CONDITION_KEYS = {"answered", "equals", "in", "min", "max"}
+
+
+class Rule:
+    """One compiled rule: ``mask(columns)`` marks the violating rows"""
+    __slots__ = ("code", "severity", "message", "question_ids", "mask")
+
+    def __init__(self, code, severity, message, question_ids, mask):
+        self.code = code
+        self.severity = severity
+        self.message = message
+        self.question_ids = tuple(question_ids)
+        self.mask = mask
+
+    def __repr__(self):
+        return f"Rule(code={self.code!r}, questions={self.question_ids!r})"
+
+
+def encode(schema, submissions):
+    """Encode an iterable of ``{question_id: value}`` dicts into one column per question"""
+    import numpy as np
+
+    submissions = list(submissions)
+    columns = {}
+    for question in schema.questions:
+        values = [answers.get(question.id) for answers in submissions]
+        if question.type == "rating":
+            columns[question.id] = np.array(
+                [np.nan if value is None or value == "" else value if isinstance(value, (int, float)) else -1.0
+                 for value in values],
+                dtype=np.float64
+            )
+        elif question.type == "multiple_choice":
+            index = question.option_index
+            columns[question.id] = np.array(
+                [MISSING if value is None or value == "" else index.get(value, INVALID) for value in values],
+                dtype=np.int64
+            )
+        else:
+            columns[question.id] = np.array(
+                [len(value) if isinstance(value, str) and value else MISSING for value in values],
+                dtype=np.int64
+            )
+    return columns
+
+
+def _present(question, column):
+    import numpy as np
+
+    return ~np.isnan(column) if question.type == "rating" else column >= 0
+
+
+def _condition_mask(question, condition):
+    """Compile one declarative condition (the branching vocabulary) into a column mask"""
+    import numpy as np
+
+    unknown = set(condition) - CONDITION_KEYS
+    if unknown:
+        raise ValueError(f"Question {question.id}: unknown validation condition {sorted(unknown)}")
+    if question.type == "text" and set(condition) != {"answered"}:
+        raise ValueError(f"Question {question.id}: text questions can only be tested for 'answered'")
+
+    def encode_value(value):
+        return question.option_index.get(value, INVALID) if question.type == "multiple_choice" else value
+
+    def mask(column):
+        present = _present(question, column)
+        result = present.copy() if condition.get("answered", True) else ~present
+        if "equals" in condition:
+            result &= column == encode_value(condition["equals"])
+        if "in" in condition:
+            result &= np.isin(column, [encode_value(value) for value in condition["in"]])
+        if "min" in condition:
+            result &= column >= condition["min"]
+        if "max" in condition:
+            result &= column <= condition["max"]
+        return result
+
+    return mask
+
+
+class RuleSet:
+    """All validation rules of one survey, compiled once"""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.rules = []
+        for question in schema.questions:
+            self.rules.extend(self._question_rules(question))
+        for spec in schema.consistency_rules:
+            self.rules.append(self._consistency_rule(spec))
+        self.required = tuple(q for q in schema.questions if q.required)
+
+    @staticmethod
+    def _question_rules(question):
+        import numpy as np
+
+        if question.type == "rating":
+            scale = question.scale
+            yield Rule(
+                "out_of_range", "error", f"Rating must be a whole number between 1 and {scale}", [question.id],
+                lambda columns: ~np.isnan(columns[question.id]) & (
+                    (columns[question.id] < 1) | (columns[question.id] > scale) |
+                    (columns[question.id] != np.floor(columns[question.id]))
+                )
+            )
+        elif question.type == "multiple_choice":
+            yield Rule(
+                "invalid_option", "error", "Answer is not one of the options", [question.id],
+                lambda columns: columns[question.id] == INVALID
+            )
+        else:
+            yield Rule(
+                "too_long", "error", f"Text answers are limited to {MAX_TEXT_LENGTH} characters", [question.id],
+                lambda columns: columns[question.id] > MAX_TEXT_LENGTH
+            )
+
+    def _consistency_rule(self, spec):
+        parts = []
+        for condition in spec["when"]:
+            condition = dict(condition)
+            question = self.schema.question(condition.pop("question"))
+            if question is None:
+                raise ValueError(f"Validation rule {spec['code']!r} refers to an unknown question")
+            parts.append((question.id, _condition_mask(question, condition)))
+
+        def mask(columns):
+            result = None
+            for question_id, condition_mask in parts:
+                part = condition_mask(columns[question_id])
+                result = part if result is None else result & part
+            return result
+
+        return Rule(spec["code"], spec.get("severity", "warning"), spec.get("message", spec["code"]),
+                    [question_id for question_id, _ in parts], mask)
+
+    def _slots(self, question, column):
+        """Transition-table slot per row, matching Question.answer_slot"""
+        import numpy as np
+
+        if question.type == "rating":
+            valid = ~np.isnan(column) & (column >= 1) & (column <= question.scale)
+            return np.where(valid, np.nan_to_num(column), 0).astype(np.int64)
+        if question.type == "multiple_choice":
+            return np.where(column >= 0, column + 1, 0)
+        return (column > 0).astype(np.int64)
+
+    def reached(self, columns):
+        """Boolean (questions x rows) matrix of the questions on each row's branch
+
+        Positions are visited in order, so forward skips are followed and loops
+        back only revisit questions that are already marked.
+        """
+        import numpy as np
+
+        n_rows = len(next(iter(columns.values()))) if columns else 0
+        end = self.schema.end
+        reached = np.zeros((end, n_rows), dtype=bool)
+        if end:
+            reached[0] = True
+        for question in self.schema.questions:
+            rows = reached[question.position]
+            if not rows.any():
+                continue
+            targets = np.asarray(self.schema.transitions[question.position])[self._slots(question, columns[question.id])]
+            for target in np.unique(targets[rows]):
+                if question.position < target < end:
+                    reached[target] |= rows & (targets == target)
+        return reached
+
+    @timed("validation.evaluate")
+    def evaluate(self, columns, question_ids=None, require=True):
+        """``(rule, violation mask)`` for every rule that fires on at least one row
+
+        ``question_ids`` limits the check to rules touching those questions;
+        ``require`` adds one ``missing_required`` rule per required question,
+        applied only to rows whose branch reaches it.
+        """
+        wanted = None if question_ids is None else set(question_ids)
+        results = []
+        for rule in self.rules:
+            if wanted is not None and wanted.isdisjoint(rule.question_ids):
+                continue
+            mask = rule.mask(columns)
+            if mask.any():
+                results.append((rule, mask))
+
+        if require:
+            reached = self.reached(columns)
+            for question in self.required:
+                if wanted is not None and question.id not in wanted:
+                    continue
+                mask = reached[question.position] & ~_present(question, columns[question.id])
+                if mask.any():
+                    results.append((Rule("missing_required", "error", "This question is required!", [question.id], None), mask))
+        return results
+
+    def check(self, answers, question_ids=None, require=True):
+        """Violations of one submission as ``{"code", "severity", "message", "question_ids"}`` dicts"""
+        return [
+            {"code": rule.code, "severity": rule.severity, "message": rule.message, "question_ids": rule.question_ids}
+            for rule, _ in self.evaluate(encode(self.schema, [answers]), question_ids, require)
+        ]
+
+    def summarize(self, columns, row_ids=None, require=True, examples=20):
+        """Per-rule violation counts (and a few example row ids) for a batch"""
+        import numpy as np
+
+        summary = []
+        for rule, mask in self.evaluate(columns, require=require):
+            rows = np.flatnonzero(mask)
+            example_ids = rows[:examples] if row_ids is None else np.asarray(row_ids)[rows[:examples]]
+            summary.append({
+                "code": rule.code,
+                "severity": rule.severity,
+                "question_ids": rule.question_ids,
+                "message": rule.message,
+                "count": int(len(rows)),
+                "examples": example_ids.tolist(),
+            })
+        return summary
+
+
+_RULE_SETS = {}
+
+
+def rule_set(schema):
+    """Compiled (and cached) rule set of a survey schema"""
+    rules = _RULE_SETS.get(schema.key)
+    if rules is None:
+        rules = _RULE_SETS[schema.key] = RuleSet(schema)
+    return rules
+
+
+def validate_stored(store, schema, chunk_size=100000):
+    """Validate every completed submission of a survey, ``chunk_size`` submissions per vectorized pass"""
+    rules = rule_set(schema)
+    totals = {}
+    checked = 0
+
+    def flush(chunk_ids, chunk_answers):
+        for entry in rules.summarize(encode(schema, chunk_answers), chunk_ids):
+            key = (entry["code"], entry["question_ids"])
+            if key in totals:
+                totals[key]["count"] += entry["count"]
+                totals[key]["examples"] = (totals[key]["examples"] + entry["examples"])[:20]
+            else:
+                totals[key] = entry
+
+    chunk_ids, chunk_answers = [], []
+    for submission_id, _, _, answers in store.iter_completed_submissions(schema.key):
+        chunk_ids.append(submission_id)
+        chunk_answers.append(answers)
+        if len(chunk_ids) == chunk_size:
+            flush(chunk_ids, chunk_answers)
+            checked += len(chunk_ids)
+            chunk_ids, chunk_answers = [], []
+    if chunk_ids:
+        flush(chunk_ids, chunk_answers)
+        checked += len(chunk_ids)
+    return checked, sorted(totals.values(), key=lambda entry: entry["count"], reverse=True)
@@ -0,0 +1,29 @@
+"""Analysis cache keys and the bounded spill directory"""
+import os
+
+from analysis_cache import AnalysisCache, analysis_key
+from survey_analysis import SURVEY_SCHEMAS
+
+
+def test_key_follows_schema_responses_and_version():
+    schema, other = SURVEY_SCHEMAS["customer_satisfaction"], SURVEY_SCHEMAS["employee_feedback"]
+    key = analysis_key(schema, {1: 4, 3: "fast"}, "v1")
+    assert key == analysis_key(schema, {3: "fast", 1: 4}, "v1")
+    assert key != analysis_key(other, {1: 4, 3: "fast"}, "v1")
+    assert key != analysis_key(schema, {1: 5, 3: "fast"}, "v1")
+    assert key != analysis_key(schema, {1: 4, 3: "fast"}, "v2")
+
+
+def test_spill_directory_is_bounded(tmp_path):
+    value = {"text": "x" * 1000}
+    cache = AnalysisCache(max_entries=1, spill_dir=str(tmp_path), max_spill_bytes=5000)
+    for i in range(20):
+        cache.put(f"key{i}", value)
+    spilled = sorted(os.listdir(tmp_path))
+    assert sum(os.path.getsize(tmp_path / name) for name in spilled) <= 5000
+    assert "key18.json" in spilled and "key0.json" not in spilled
+    assert cache.get("key18") == value
+
+    # Reopening prunes what a previous, larger limit left behind
+    AnalysisCache(spill_dir=str(tmp_path), max_spill_bytes=2500)
+    assert len(os.listdir(tmp_path)) == 2
@@ -0,0 +1,58 @@
+"""Keyset pagination of the raw-answer explorer against the full ordered query"""
+import random
+
+import pytest
+
+from response_store import BROWSE_ORDERS, ResponseStore
+from survey_analysis import SURVEY_SCHEMAS
+from survey_benchmark import generate_submissions
+
+
+SCHEMA = SURVEY_SCHEMAS["customer_satisfaction"]
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    store = ResponseStore(str(tmp_path_factory.mktemp("store") / "responses.db"))
+    rng = random.Random(11)
+    for _, answers in generate_submissions(SCHEMA, 300, seed=4):
+        submission_id = store.start_submission(SCHEMA.key)
+        store.save_answers(submission_id, SCHEMA.key, answers)
+        if rng.random() < 0.7:
+            store.complete_submission(submission_id)
+    yield store
+    store.close()
+
+
+def _all_pages(store, limit, **query):
+    rows, cursor = store.browse_answers(SCHEMA.key, limit=limit, **query)
+    pages = [rows]
+    while cursor is not None:
+        rows, cursor = store.browse_answers(SCHEMA.key, after=cursor, limit=limit, **query)
+        assert rows
+        pages.append(rows)
+    assert all(len(page) == limit for page in pages[:-1])
+    return [row for page in pages for row in page]
+
+
+@pytest.mark.parametrize("order", list(BROWSE_ORDERS))
+@pytest.mark.parametrize("question_id", [1, 2, 3])
+@pytest.mark.parametrize("limit", [1, 7, 50])
+def test_pages_match_full_query(store, order, question_id, limit):
+    query = {"question_id": question_id, "order": order}
+    full, cursor = store.browse_answers(SCHEMA.key, limit=10 ** 9, **query)
+    assert cursor is None
+    assert _all_pages(store, limit, **query) == full
+
+
+@pytest.mark.parametrize("order", ["newest", "oldest"])
+def test_unfiltered_pages_match_full_query(store, order):
+    full, _ = store.browse_answers(SCHEMA.key, order=order, limit=10 ** 9)
+    assert _all_pages(store, 64, order=order) == full
+
+
+def test_value_filter_pages_match_full_query(store):
+    query = {"question_id": 2, "value": SCHEMA.question(2).options[0], "order": "value_desc"}
+    full, _ = store.browse_answers(SCHEMA.key, limit=10 ** 9, **query)
+    assert full
+    assert _all_pages(store, 5, **query) == full
@@ -0,0 +1,45 @@
+"""Exact equivalence of the vectorized batch analysis and the per-string analyzer"""
+import pytest
+
+from survey_analysis import SURVEY_SCHEMAS, AIAnalyzer
+from survey_benchmark import generate_texts
+
+
+SCHEMA = SURVEY_SCHEMAS["customer_satisfaction"]
+EDGE_TEXTS = [
+    None, 7, "", "  ", "ok", "GOOD, good; Good!", "bad_service", "price\x1fvalue", "price\x00value",
+    "Très bon service, excellent!", "ΣΊΣΥΦΟΣ awful", "line one\nline two great", "poor\tslow delivery",
+]
+
+
+@pytest.fixture(scope="module")
+def texts():
+    return list(generate_texts(SCHEMA, 3000, seed=7)) + EDGE_TEXTS
+
+
+@pytest.fixture(scope="module")
+def ascii_texts():
+    return list(generate_texts(SCHEMA, 3000, seed=8))
+
+
+@pytest.mark.parametrize("corpus", ["texts", "ascii_texts"])
+def test_hit_matrix_matches_hits(corpus, request):
+    texts = request.getfixturevalue(corpus)
+    matcher = AIAnalyzer.MATCHER
+    rows, cols = matcher.hit_matrix(texts)
+    vectors = [0] * len(texts)
+    for row, col in zip(rows.tolist(), cols.tolist()):
+        vectors[row] |= 1 << col
+    assert vectors == [matcher.hits(text) if isinstance(text, str) else 0 for text in texts]
+
+
+@pytest.mark.parametrize("corpus", ["texts", "ascii_texts"])
+def test_sentiment_batch_matches_per_string(corpus, request):
+    texts = request.getfixturevalue(corpus)
+    expected = [AIAnalyzer.analyze_sentiment(text) if isinstance(text, str) else "neutral" for text in texts]
+    assert list(AIAnalyzer.analyze_sentiment_batch(texts)) == expected
+
+
+def test_themes_batch_matches_per_string(texts):
+    strings = [text for text in texts if isinstance(text, str)]
+    assert AIAnalyzer.extract_themes_batch(texts) == AIAnalyzer.extract_themes(strings)
@@ -0,0 +1,41 @@
+"""Parallel chunked analysis against the serial analyzer"""
+from collections import Counter
+
+import pytest
+
+from survey_analysis import SURVEY_SCHEMAS, AIAnalyzer, AnalysisPartial
+from survey_benchmark import generate_texts
+
+
+SCHEMA = SURVEY_SCHEMAS["customer_satisfaction"]
+
+
+@pytest.fixture(scope="module")
+def ascii_texts():
+    return list(generate_texts(SCHEMA, 3000, seed=8))
+
+
+def _serial(texts):
+    sentiments = Counter(AIAnalyzer.analyze_sentiment(text) for text in texts)
+    return sentiments, AIAnalyzer.extract_themes(texts)
+
+
+@pytest.mark.parametrize("workers, chunk_size", [(1, 500), (2, 500), (3, 997), (2, 100000)])
+def test_parallel_matches_serial(ascii_texts, workers, chunk_size):
+    partial = AIAnalyzer.analyze_parallel(ascii_texts, workers=workers, chunk_size=chunk_size)
+    sentiments, themes = _serial(ascii_texts)
+    assert +partial.sentiment_counts == sentiments
+    assert partial.extract_themes() == themes
+    assert AIAnalyzer.extract_themes_parallel(ascii_texts, workers, chunk_size) == themes
+
+
+def test_partial_merge_is_order_independent(ascii_texts):
+    chunks = [AnalysisPartial.from_texts(ascii_texts[i:i + 400]) for i in range(0, len(ascii_texts), 400)]
+    forward = AnalysisPartial()
+    for chunk in chunks:
+        forward = forward.merge(chunk)
+    backward = AnalysisPartial()
+    for chunk in reversed(chunks):
+        backward = backward.merge(chunk)
+    assert forward.sentiment_counts == backward.sentiment_counts
+    assert forward.extract_themes() == backward.extract_themes()
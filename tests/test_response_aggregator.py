@@ -0,0 +1,44 @@
+"""Incremental ResponseAggregator updates against a full recomputation"""
+import random
+
+from survey_analysis import SURVEY_SCHEMAS, ResponseAggregator
+from survey_benchmark import generate_submissions
+
+
+SCHEMA = SURVEY_SCHEMAS["customer_satisfaction"]
+
+
+def _full(final_answers):
+    aggregator = ResponseAggregator(SCHEMA, editable=False)
+    for respondent_id, answers in final_answers.items():
+        for question_id, value in answers.items():
+            aggregator.update(question_id, value, respondent_id)
+    return aggregator.snapshot()
+
+
+def test_incremental_matches_full_recompute():
+    rng = random.Random(3)
+    submissions = dict(generate_submissions(SCHEMA, 400, seed=5))
+    replacements = dict(generate_submissions(SCHEMA, 400, seed=6))
+    incremental = ResponseAggregator(SCHEMA)
+    final = {respondent_id: {} for respondent_id in submissions}
+    for respondent_id, answers in submissions.items():
+        for question_id, value in answers.items():
+            incremental.update(question_id, value, respondent_id)
+            final[respondent_id][question_id] = value
+    # Edits, repeated identical saves and removals, in random order
+    for _ in range(1500):
+        respondent_id = rng.choice(list(submissions))
+        question_id = rng.choice([question.id for question in SCHEMA.questions])
+        action = rng.random()
+        if action < 0.6:
+            value = replacements[respondent_id][question_id]
+            incremental.update(question_id, value, respondent_id)
+            final[respondent_id][question_id] = value
+        elif action < 0.8 and question_id in final[respondent_id]:
+            incremental.update(question_id, final[respondent_id][question_id], respondent_id)
+        else:
+            incremental.remove(question_id, respondent_id)
+            final[respondent_id].pop(question_id, None)
+    assert incremental.snapshot() == _full(final)
+    assert incremental.total_responses == sum(len(answers) for answers in final.values())
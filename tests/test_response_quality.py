@@ -0,0 +1,29 @@
+"""Duplicate detection thresholds and bounded indexes"""
+from response_quality import DuplicateDetector
+from survey_analysis import SURVEY_SCHEMAS
+
+
+SCHEMA = SURVEY_SCHEMAS["customer_satisfaction"]
+TEXT = "the delivery was slow and the package arrived damaged twice this month"
+
+
+def test_shipped_templates_run_structured_checks():
+    for schema in SURVEY_SCHEMAS.values():
+        detector = DuplicateDetector(schema)
+        assert detector.check_patterns and detector.check_straight_lining
+    assert not DuplicateDetector(SCHEMA, check_patterns=False, check_straight_lining=False).check(
+        1, {1: 3, 2: "Pricing", 4: 3}
+    )
+
+
+def test_eviction_drops_signatures_and_buckets():
+    detector = DuplicateDetector(SCHEMA, max_indexed=3)
+    for submission_id in range(1, 6):
+        detector.check(submission_id, {1: 2, 2: "Pricing", 3: f"{TEXT} {submission_id}", 4: 7})
+    assert set(detector.text_signatures[3]) == set(detector.patterns) == {3, 4, 5}
+    for index in (detector.text_indexes[3], detector.pattern_index):
+        keys = {key for buckets in index.buckets for bucket in buckets.values() for key in bucket}
+        assert keys == {3, 4, 5}
+    flags = detector.check(6, {1: 2, 2: "Pricing", 3: f"{TEXT} 5", 4: 7}, add=False)
+    assert {flag["matches_submission"] for flag in flags} <= {3, 4, 5}
+    assert {flag["code"] for flag in flags} == {"duplicate_text", "duplicate_pattern"}
@@ -0,0 +1,64 @@
+"""Closing submissions, following completions and pooling connections in the response store"""
+import threading
+
+import pytest
+
+from response_store import COMPLETE_SUBMISSION, CompletionCursor, ResponseStore, SubmissionClosedError
+from survey_analysis import SURVEY_SCHEMAS
+
+
+SCHEMA = SURVEY_SCHEMAS["customer_satisfaction"]
+
+
+def test_closed_submission_rejects_answers_and_completion(tmp_path):
+    store = ResponseStore(str(tmp_path / "closed.db"))
+    submission_id = store.start_submission(SCHEMA.key)
+    record = (SCHEMA.key, None, submission_id, {1: 4}, True, "", "")
+    store.write_batch([record])
+    with pytest.raises(SubmissionClosedError):
+        store.write_batch([(SCHEMA.key, None, submission_id, {1: 2}, False, "", "")])
+    with pytest.raises(SubmissionClosedError):
+        store.write_batch([(SCHEMA.key, None, None, {1: 5}, True, "", ""), record])
+    with pytest.raises(SubmissionClosedError):
+        store.complete_submission(submission_id)
+    assert store.load_answers(submission_id) == {1: 4}
+    assert store.submission_counts(SCHEMA.key) == {"started": 1, "completed": 1}
+    assert [row[0] for row in CompletionCursor(store, SCHEMA.key).new_submissions()] == [submission_id]
+    store.close()
+
+
+def test_cursor_follows_commit_order_not_timestamps(tmp_path):
+    store = ResponseStore(str(tmp_path / "cursor.db"))
+    cursor = CompletionCursor(store, SCHEMA.key)
+    first, late = (store.start_submission(SCHEMA.key) for _ in range(2))
+    for submission_id in (first, late):
+        store.save_answers(submission_id, SCHEMA.key, {1: 3})
+    store.complete_submission(first)
+    assert [row[0] for row in cursor.new_submissions()] == [first]
+    # A writer that took its timestamp before ``first`` but committed after it
+    with store._transaction() as conn:
+        conn.execute(COMPLETE_SUBMISSION, ("2000-01-01T00:00:00", late))
+    assert [row[0] for row in cursor.new_submissions()] == [late]
+    assert list(cursor.new_submissions()) == []
+    store.close()
+
+
+def test_short_lived_threads_share_a_bounded_pool(tmp_path):
+    store = ResponseStore(str(tmp_path / "pool.db"), pool_size=2)
+    submission_id = store.start_submission(SCHEMA.key)
+    results = []
+
+    def rerun():
+        results.append(store.submission(submission_id)["survey"])
+        store.save_answers(submission_id, SCHEMA.key, {1: 3})
+
+    for _ in range(20):
+        thread = threading.Thread(target=rerun)
+        thread.start()
+        thread.join()
+    assert results == [SCHEMA.key] * 20
+    # A stream abandoned part way returns its connection too
+    next(store.answers_since(SCHEMA.key))
+    assert store._idle.qsize() <= 2
+    store.close()
+    assert store._idle.qsize() == 0
@@ -0,0 +1,58 @@
+"""Headless batch analysis: no UI or heavy imports, same analysis as the aggregator"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from survey_analysis import SURVEY_SCHEMAS, ResponseAggregator
+from survey_cli import main
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA = SURVEY_SCHEMAS["customer_satisfaction"]
+ROWS = [
+    {"submission_id": "1", "q_1": "5", "q_2": "Pricing", "q_3": "Great service, fast delivery", "q_4": "10"},
+    {"submission_id": "2", "q_1": "2", "q_2": "Other", "q_3": "Slow and expensive", "q_4": "3"},
+]
+
+
+def test_import_stays_headless():
+    # survey_analysis holds the analyzer core so the CLI never imports the Streamlit app
+    code = (
+        "import sys, survey_cli; "
+        "print([m for m in ('streamlit', 'plotly', 'pandas', 'numpy') if m in sys.modules])"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT)
+    assert result.stdout.strip() == "[]"
+
+
+def test_csv_analysis_matches_aggregator(tmp_path, capsys):
+    path = tmp_path / "responses.csv"
+    header = list(ROWS[0])
+    path.write_text(",".join(header) + "\n" + "".join(
+        ",".join(f'"{row[column]}"' for column in header) + "\n" for row in ROWS
+    ), encoding="utf-8")
+    assert main([str(path), "--survey", SCHEMA.key]) == 0
+    analysis = json.loads(capsys.readouterr().out)
+
+    aggregator = ResponseAggregator(SCHEMA, editable=False)
+    for row in ROWS:
+        for question in SCHEMA.questions:
+            value = row[f"q_{question.id}"]
+            aggregator.update(question.id, int(value) if question.type == "rating" else value, row["submission_id"])
+    expected = json.loads(json.dumps(aggregator.snapshot()))
+    assert analysis.pop("survey") == SCHEMA.key
+    assert analysis.pop("respondents") == len(ROWS)
+    assert analysis == expected
+
+
+def test_discover_themes_from_stdin_is_rejected_before_reading(monkeypatch):
+    def fail():
+        raise AssertionError("stdin was read")
+
+    monkeypatch.setattr(sys, "stdin", type("Stdin", (), {"readline": staticmethod(fail), "read": staticmethod(fail)})())
+    with pytest.raises(SystemExit) as exc_info:
+        main(["-", "--survey", SCHEMA.key, "--discover-themes", "4"])
+    assert exc_info.value.code == 2
@@ -0,0 +1,258 @@
+"""Offline theme discovery: hashed sparse TF-IDF + spherical mini-batch k-means
+
+Complements the fixed ``AIAnalyzer.THEME_KEYWORDS`` categories by clustering
+whatever respondents actually write. Everything is bounded by the number of
+hashed features, not by the corpus: document frequencies are a fixed-size
+array, batches are CSR arrays (``indptr``/``indices``/``data``) that are
+discarded after use, and centroids are a dense ``n_clusters x n_features``
+array. Corpora of any size are processed in batches with ``partial_fit``.
+Pure NumPy: no network access, GPU or extra packages needed.
+
+Texts are tokenised like the keyword matcher of their language, so Indic and
+Arabic-script answers cluster on whole words.
+
+Usage:
+    discovery = ThemeDiscovery(n_clusters=8, language="hi").fit(lambda: batches_of_texts())
+    themes = discovery.themes(batches_of_texts())   # same shape as extract_themes
+"""
+import zlib
+from collections import Counter
+
+from language_packs import tokenize
+from survey_analysis import AIAnalyzer
+from survey_metrics import timed
+
+
+STOP_WORDS = frozenset(
+    "the and for are but not you your our was were with this that have has had they them their "
+    "there what when where which who will would could should can all any more most some such "
+    "than too very just also about into from over only own same out get got its it's been being "
+    "does did doing because while then once here both each few other nor off again further "
+    "like make need want please really much many even still well".split()
+)
+MIN_TOKEN_LENGTH = 3
+MAX_CACHED_TOKENS = 2 ** 20
+
+
+class ThemeDiscovery:
+    """Clusters free-text answers and labels each cluster by its heaviest terms"""
+
+    def __init__(self, n_clusters=8, n_features=2 ** 17, top_terms=3, n_init=5, seed=0, language=None):
+        import numpy as np
+
+        self.matcher = AIAnalyzer.matcher(language)
+        self.n_clusters = n_clusters
+        self.n_features = n_features
+        self.top_terms = top_terms
+        self.n_init = n_init
+        self.rng = np.random.RandomState(seed)
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self.n_documents = 0
+        # First term seen for each hashed feature, used only for cluster labels
+        self.terms = {}
+        # token -> feature (None for stop words), bounded so long-tail vocabularies cannot grow it forever
+        self._token_features = {}
+        self.centers = None
+        self.cluster_counts = None
+
+    def _features(self, text):
+        features = []
+        cache = self._token_features
+        for token in tokenize(text, self.matcher.script):
+            if token in cache:
+                feature = cache[token]
+            else:
+                feature = None
+                if len(token) >= MIN_TOKEN_LENGTH and token not in STOP_WORDS and not token.isdigit():
+                    feature = zlib.crc32(token.encode("utf-8")) % self.n_features
+                    self.terms.setdefault(feature, token)
+                if len(cache) < MAX_CACHED_TOKENS:
+                    cache[token] = feature
+            if feature is not None:
+                features.append(feature)
+        return features
+
+    def _term_counts(self, texts):
+        """CSR term counts of the non-empty texts and the positions of those texts"""
+        import numpy as np
+
+        indptr, indices, counts, kept = [0], [], [], []
+        for position, text in enumerate(texts):
+            if not isinstance(text, str):
+                continue
+            tf = Counter(self._features(text))
+            if not tf:
+                continue
+            indices.extend(tf.keys())
+            counts.extend(tf.values())
+            indptr.append(len(indices))
+            kept.append(position)
+        return (
+            np.asarray(indptr, dtype=np.int64),
+            np.asarray(indices, dtype=np.int64),
+            np.asarray(counts, dtype=np.float64),
+            kept,
+        )
+
+    def count_terms(self, texts):
+        """First pass: accumulate document frequencies (the IDF statistics)"""
+        import numpy as np
+
+        indptr, indices, _, _ = self._term_counts(texts)
+        np.add.at(self.document_frequency, indices, 1)
+        self.n_documents += len(indptr) - 1
+
+    def transform(self, texts):
+        """L2-normalised TF-IDF rows (sublinear tf) in CSR form, plus the positions they came from"""
+        import numpy as np
+
+        indptr, indices, counts, kept = self._term_counts(texts)
+        if not kept:
+            return indptr, indices, counts, kept
+        idf = np.log((1 + self.n_documents) / (1 + self.document_frequency[indices])) + 1
+        data = (1 + np.log(counts)) * idf
+        norms = np.sqrt(np.add.reduceat(data * data, indptr[:-1]))
+        data /= np.repeat(norms, np.diff(indptr))
+        return indptr, indices, data, kept
+
+    def _similarities(self, indptr, indices, data):
+        """Cosine similarity of every CSR row to every centroid (rows x clusters)"""
+        import numpy as np
+
+        return np.add.reduceat(data[:, None] * self.centers[:, indices].T, indptr[:-1], axis=0)
+
+    def _init_centers(self, indptr, indices, data):
+        """Best of ``n_init`` k-means++ seedings (cosine distance) on the first batch"""
+        import numpy as np
+
+        n_rows = len(indptr) - 1
+        k = min(self.n_clusters, n_rows)
+        dense_row = lambda row: np.bincount(
+            indices[indptr[row]:indptr[row + 1]], weights=data[indptr[row]:indptr[row + 1]], minlength=self.n_features
+        )
+        best, best_score = None, -1.0
+        for _ in range(self.n_init):
+            self.centers = dense_row(self.rng.randint(n_rows))[None, :]
+            for _ in range(1, k):
+                distance = np.clip(1 - self._similarities(indptr, indices, data).max(axis=1), 0, None)
+                total = distance.sum()
+                row = self.rng.choice(n_rows, p=distance / total) if total > 0 else self.rng.randint(n_rows)
+                self.centers = np.vstack([self.centers, dense_row(row)])
+            # Score the seeding after one refinement step, as k-means++ seeds alone are noisy
+            labels = self._similarities(indptr, indices, data).argmax(axis=1)
+            sums = np.zeros_like(self.centers)
+            np.add.at(sums, (np.repeat(labels, np.diff(indptr)), indices), data)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            self.centers = np.where(norms > 0, sums / np.where(norms > 0, norms, 1), self.centers)
+            score = self._similarities(indptr, indices, data).max(axis=1).sum()
+            if score > best_score:
+                best, best_score = self.centers, score
+        self.centers = best
+        self.cluster_counts = np.zeros(k, dtype=np.int64)
+
+    @timed("themes.partial_fit")
+    def partial_fit(self, texts):
+        """One mini-batch k-means step over a batch of texts"""
+        import numpy as np
+
+        indptr, indices, data, kept = self.transform(texts)
+        if not kept:
+            return self
+        if self.centers is None:
+            self._init_centers(indptr, indices, data)
+
+        labels = self._similarities(indptr, indices, data).argmax(axis=1)
+        k = len(self.centers)
+        sums = np.zeros_like(self.centers)
+        np.add.at(sums, (np.repeat(labels, np.diff(indptr)), indices), data)
+        batch_counts = np.bincount(labels, minlength=k)
+        self.cluster_counts += batch_counts
+
+        # Per-centre learning rate = this batch's share of everything the centre has absorbed
+        rate = (batch_counts / np.maximum(self.cluster_counts, 1))[:, None]
+        means = sums / np.maximum(batch_counts, 1)[:, None]
+        self.centers = np.where(batch_counts[:, None] > 0, (1 - rate) * self.centers + rate * means, self.centers)
+        norms = np.linalg.norm(self.centers, axis=1, keepdims=True)
+        self.centers /= np.where(norms > 0, norms, 1)
+        return self
+
+    def fit(self, make_batches, epochs=1):
+        """Count document frequencies over the corpus, then run ``epochs`` clustering passes
+
+        ``make_batches`` returns a fresh iterable of text batches on every call,
+        so the corpus is streamed rather than held in memory.
+        """
+        for batch in make_batches():
+            self.count_terms(batch)
+        for _ in range(epochs):
+            for batch in make_batches():
+                self.partial_fit(batch)
+        return self
+
+    def predict(self, texts):
+        """Cluster index per text (-1 for texts with no usable terms)"""
+        import numpy as np
+
+        labels = np.full(len(texts), -1, dtype=np.int64)
+        indptr, indices, data, kept = self.transform(texts)
+        if kept and self.centers is not None:
+            labels[kept] = self._similarities(indptr, indices, data).argmax(axis=1)
+        return labels
+
+    def labels(self):
+        """Top-term label per cluster, e.g. ``"delivery / slow / late"``"""
+        import numpy as np
+
+        labels = []
+        for center in self.centers:
+            top = np.argsort(center)[::-1][:self.top_terms]
+            labels.append(" / ".join(self.terms.get(int(feature), "?") for feature in top if center[feature] > 0))
+        return labels
+
+    @timed("themes.discovered")
+    def themes(self, batches):
+        """Assign every text and return clusters in the ``extract_themes`` structure
+
+        ``mentions`` is the number of responses in a cluster; ``sentiment`` is
+        judged over the keywords of those responses, as in ``themes_from_hits``.
+        """
+        if self.centers is None:
+            return []
+        matcher = self.matcher
+        mentions = Counter()
+        cluster_hits = [0] * len(self.centers)
+        for batch in batches:
+            batch = list(batch)
+            for text, label in zip(batch, self.predict(batch)):
+                if label >= 0:
+                    mentions[label] += 1
+                    cluster_hits[label] |= matcher.hits(text)
+
+        names = self.labels()
+        themes = [
+            {"theme": names[label], "mentions": count, "sentiment": AIAnalyzer.sentiment_from_hits(cluster_hits[label], matcher)}
+            for label, count in mentions.items()
+        ]
+        return sorted(themes, key=lambda x: x["mentions"], reverse=True)
+
+
+def batched(texts, size):
+    """Split an iterable of texts into lists of ``size``"""
+    batch = []
+    for text in texts:
+        batch.append(text)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def discover_themes(make_texts, n_clusters=8, batch_size=4096, epochs=2, language=None):
+    """Fit a ThemeDiscovery over a re-iterable text source and return its themes
+
+    ``make_texts`` returns a fresh iterable of texts (in ``language``) on every call.
+    """
+    discovery = ThemeDiscovery(n_clusters, language=language)
+    discovery.fit(lambda: batched(make_texts(), batch_size), epochs)
+    return discovery.themes(batched(make_texts(), batch_size))